@@ -0,0 +1,257 @@
+"""
+Running LLM requests through the OpenAI Batch API.
+
+Bulk jobs, like documenting a whole repository, don't need answers right
+away. The Batch API runs them at half the price and without per-minute
+rate limits: the requests are written to a JSONL file, uploaded, and the
+results are downloaded once the batch is done, usually well within the
+24 hour completion window.
+
+Every request is identified by its LLMCache key, so results go straight
+into the cache and the usual (online) code path picks them up as cache
+hits. Submitted batches are recorded in a state file, so a restarted run
+polls the batches it already submitted instead of submitting them again.
+"""
+
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+from openai import OpenAI
+
+from common.llm import DEFAULT_MODEL, LLMCache
+
+
+BATCH_ENDPOINT = "/v1/responses"
+COMPLETION_WINDOW = "24h"
+
+# limits of a single batch input file
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+
+DEFAULT_POLL_INTERVAL = 30
+
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+@dataclass
+class BatchRequest:
+    """A single LLM call, identified by its cache key."""
+    key: str
+    instructions: str
+    content: str
+    model: str = DEFAULT_MODEL
+
+    def to_line(self) -> dict:
+        """The request as a line of a batch input file."""
+        return {
+            "custom_id": self.key,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": self.model,
+                "input": [
+                    {"role": "system", "content": self.instructions},
+                    {"role": "user", "content": self.content},
+                ],
+            },
+        }
+
+
+@dataclass
+class BatchRunResult:
+    """
+    What a batch run did.
+
+    Attributes:
+        cached: Requests skipped because their result was already cached
+        submitted: Requests sent in new batches by this run
+        resumed: Requests in batches submitted by an earlier run
+        completed: Results written to the cache
+        failed: Keys of requests that didn't produce a result
+    """
+    cached: int = 0
+    submitted: int = 0
+    resumed: int = 0
+    completed: int = 0
+    failed: list[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.completed} completed, {len(self.failed)} failed, "
+            f"{self.cached} already cached, {self.resumed} resumed"
+        )
+
+
+def output_text(body: dict) -> str:
+    """The text of a Responses API object, like `Response.output_text`."""
+    texts = []
+    for item in body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for part in item.get("content", []):
+            if part.get("type") == "output_text":
+                texts.append(part["text"])
+    return "".join(texts)
+
+
+def split_batches(
+        requests: list[BatchRequest],
+        max_requests: int = MAX_BATCH_REQUESTS,
+        max_bytes: int = MAX_BATCH_BYTES,
+) -> list[list[bytes]]:
+    """Encode requests as JSONL lines, grouped into batches within the input file limits."""
+    batches = []
+    current, size = [], 0
+    for request in requests:
+        line = json.dumps(request.to_line()).encode("utf-8") + b"\n"
+        if current and (len(current) >= max_requests or size + len(line) > max_bytes):
+            batches.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        batches.append(current)
+    return batches
+
+
+class LLMBatchRunner:
+    """
+    Submits uncached requests as batches, waits for them and caches the results.
+
+    The state file lists the batches that were submitted but whose results
+    haven't been collected yet, with the keys of their requests. It is
+    written right after a batch is created and after its results are
+    cached, so a run can be interrupted at any point.
+    """
+
+    def __init__(self,
+                client: OpenAI,
+                cache: LLMCache,
+                state_path: str | Path,
+                postprocess: Callable[[str], str] | None = None,
+                poll_interval: float = DEFAULT_POLL_INTERVAL,
+                max_requests: int = MAX_BATCH_REQUESTS,
+                max_bytes: int = MAX_BATCH_BYTES,
+        ):
+        """
+        Initialize the batch runner.
+
+        Args:
+            client: The OpenAI client
+            cache: Where results are stored, by request key
+            state_path: JSON file with the batches in progress
+            postprocess: Applied to every output text before it's cached
+            poll_interval: Seconds between batch status checks
+            max_requests: Maximum requests per batch
+            max_bytes: Maximum size of a batch input file
+        """
+        self.client = client
+        self.cache = cache
+        self.state_path = Path(state_path)
+        self.postprocess = postprocess
+        self.poll_interval = poll_interval
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+
+    def run(self, requests: Iterable[BatchRequest]) -> BatchRunResult:
+        """
+        Get the results of all requests into the cache.
+
+        Requests that are cached or already part of a pending batch are not
+        submitted again. Blocks until all pending batches are finished.
+
+        Returns:
+            What was submitted, completed and failed
+        """
+        result = BatchRunResult()
+        state = self._load_state()
+        pending_keys = {key for batch in state["batches"] for key in batch["keys"]}
+        result.resumed = len(pending_keys)
+
+        new_requests = {}
+        for request in requests:
+            if request.key in pending_keys or request.key in new_requests:
+                continue
+            if self.cache.contains(request.key):
+                result.cached += 1
+                continue
+            new_requests[request.key] = request
+
+        requests_list = list(new_requests.values())
+        for lines in split_batches(requests_list, self.max_requests, self.max_bytes):
+            keys = [json.loads(line)["custom_id"] for line in lines]
+            batch_id = self.submit(lines)
+            state["batches"].append({"id": batch_id, "keys": keys})
+            self._save_state(state)
+            result.submitted += len(keys)
+
+        while state["batches"]:
+            for entry in list(state["batches"]):
+                batch = self.client.batches.retrieve(entry["id"])
+                if batch.status not in FINISHED_STATUSES:
+                    continue
+
+                self._collect(batch, entry["keys"], result)
+                state["batches"].remove(entry)
+                self._save_state(state)
+
+            if state["batches"]:
+                time.sleep(self.poll_interval)
+
+        return result
+
+    def submit(self, lines: list[bytes]) -> str:
+        """Upload a batch input file and create the batch. Returns the batch id."""
+        with tempfile.TemporaryFile(suffix=".jsonl") as f_in:
+            f_in.writelines(lines)
+            f_in.seek(0)
+            input_file = self.client.files.create(file=("batch.jsonl", f_in), purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+        )
+        return batch.id
+
+    def _collect(self, batch, keys: list[str], result: BatchRunResult) -> None:
+        """Cache the results of a finished batch; keys without a result are failed."""
+        remaining = set(keys)
+
+        if batch.output_file_id is not None:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = record["custom_id"]
+                response = record.get("response") or {}
+                if key not in remaining or response.get("status_code") != 200:
+                    continue
+
+                text = output_text(response["body"])
+                if self.postprocess is not None:
+                    text = self.postprocess(text)
+                self.cache.set(key, text)
+                remaining.discard(key)
+                result.completed += 1
+
+        # errors, and requests left over in an expired or cancelled batch
+        result.failed.extend(key for key in keys if key in remaining)
+
+    def _load_state(self) -> dict:
+        if not self.state_path.exists():
+            return {"batches": []}
+        return json.loads(self.state_path.read_text(encoding="utf-8"))
+
+    def _save_state(self, state: dict) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f_out:
+            json.dump(state, f_out)
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,272 @@
+"""
+BM25 search engine built on a compact inverted index.
+
+The minsearch Index scores every document for every query. BM25Index keeps,
+for every term, a contiguous slice of document ids and precomputed BM25
+impacts (the saturated, length-normalized term frequency of each document),
+so a query only touches the postings of its own terms.
+
+Query terms are processed in order of their maximum possible contribution.
+Once the top-k results are known well enough that the remaining terms can't
+lift an unseen document above the current k-th score, the remaining terms
+only update documents that are already candidates (MaxScore-style early
+termination). The final top-k is selected with a heap.
+
+The per-document score and candidate arrays are allocated once per thread
+and reused by every query, which resets only the entries it touched.
+"""
+
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+
+from common.text import tokenize
+
+
+class BM25Index:
+    """
+    A BM25 search index with the same interface as the minsearch Index.
+
+    Supports text fields with per-field boosts, exact-match keyword filters
+    and `output_ids`, like minsearch. Scores of the text fields are summed,
+    weighted by their boost.
+
+    Attributes:
+        text_fields (list): List of text field names to index.
+        keyword_fields (list): List of keyword field names to index.
+        k1 (float): Term frequency saturation parameter.
+        b (float): Document length normalization parameter.
+        docs (list): List of documents indexed.
+    """
+
+    def __init__(self, text_fields, keyword_fields=None, k1: float = 1.2, b: float = 0.75):
+        """
+        Initializes the BM25Index with specified text and keyword fields.
+
+        Args:
+            text_fields (list): List of text field names to index.
+            keyword_fields (list, optional): List of keyword field names to index.
+            k1 (float, optional): Term frequency saturation. Defaults to 1.2.
+            b (float, optional): Length normalization. Defaults to 0.75.
+        """
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields if keyword_fields is not None else []
+        self.k1 = k1
+        self.b = b
+        self.docs = []
+
+        # per field: term -> term id, and postings for term t stored in
+        # doc_ids/impacts[offsets[t]:offsets[t + 1]]
+        self.vocabularies: Dict[str, Dict[str, int]] = {}
+        self.offsets: Dict[str, np.ndarray] = {}
+        self.doc_ids: Dict[str, np.ndarray] = {}
+        self.impacts: Dict[str, np.ndarray] = {}
+        self.idf: Dict[str, np.ndarray] = {}
+        self.max_impacts: Dict[str, np.ndarray] = {}
+        self.keyword_data: Dict[str, np.ndarray] = {}
+        self._filter_masks = {}
+        self._buffers = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_buffers']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffers = threading.local()
+
+    def _query_buffers(self) -> tuple[np.ndarray, np.ndarray]:
+        """Zeroed (scores, seen) arrays for this thread; a query must reset what it changes."""
+        scores = getattr(self._buffers, 'scores', None)
+        if scores is None or len(scores) != len(self.docs):
+            scores = np.zeros(len(self.docs), dtype=np.float64)
+            self._buffers.scores = scores
+            self._buffers.seen = np.zeros(len(self.docs), dtype=bool)
+        return scores, self._buffers.seen
+
+    def fit(self, docs):
+        """
+        Fits the index with the provided documents.
+
+        Args:
+            docs (list of dict): List of documents to index. Each document is a dictionary.
+        """
+        self.docs = docs
+        self._filter_masks = {}
+
+        for field in self.text_fields:
+            self._fit_field(field, docs)
+
+        for field in self.keyword_fields:
+            values = np.empty(len(docs), dtype=object)
+            values[:] = [doc.get(field) for doc in docs]
+            self.keyword_data[field] = values
+
+        return self
+
+    def _fit_field(self, field: str, docs) -> None:
+        n = len(docs)
+        postings: Dict[str, List[tuple]] = {}
+        lengths = np.zeros(n, dtype=np.float64)
+
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenize(doc.get(field, '') or '')
+            lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        vocabulary = {term: term_id for term_id, term in enumerate(postings)}
+        df = np.array([len(postings[term]) for term in vocabulary], dtype=np.float64)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(df)
+
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.float64)
+        for term, term_id in vocabulary.items():
+            term_postings = postings[term]
+            start = offsets[term_id]
+            doc_ids[start:start + len(term_postings)] = [d for d, _ in term_postings]
+            tfs[start:start + len(term_postings)] = [tf for _, tf in term_postings]
+
+        avgdl = lengths.mean() if n and lengths.mean() > 0 else 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+        impacts = tfs * (self.k1 + 1) / (tfs + length_norm[doc_ids])
+
+        self.vocabularies[field] = vocabulary
+        self.offsets[field] = offsets
+        self.doc_ids[field] = doc_ids
+        impacts = impacts.astype(np.float32)
+
+        self.impacts[field] = impacts
+        self.idf[field] = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        if len(vocabulary):
+            self.max_impacts[field] = np.maximum.reduceat(impacts, offsets[:-1]).astype(np.float64)
+        else:
+            self.max_impacts[field] = np.zeros(0)
+
+    def _allowed(self, filter_dict) -> np.ndarray | None:
+        """Boolean mask of documents passing the keyword filters, or None."""
+        mask = None
+        for field, value in filter_dict.items():
+            if field not in self.keyword_fields:
+                continue
+            try:
+                key = (field, value)
+                field_mask = self._filter_masks.get(key)
+            except TypeError:
+                key, field_mask = None, None
+            if field_mask is None:
+                values = self.keyword_data[field]
+                field_mask = np.array([v is None if value is None else v == value for v in values], dtype=bool)
+                if key is not None:
+                    self._filter_masks[key] = field_mask
+            mask = field_mask if mask is None else mask & field_mask
+        return mask
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10, output_ids=False):
+        """
+        Searches the index with the given query, filters, and boost parameters.
+
+        Args:
+            query (str): The search query string.
+            filter_dict (dict): Dictionary of keyword fields to filter by.
+            boost_dict (dict): Dictionary of boost scores for text fields.
+            num_results (int): The number of top results to return. Defaults to 10.
+            output_ids (bool): If True, adds an '_id' field to each document containing its index.
+
+        Returns:
+            list of dict: List of documents matching the search criteria, ranked by relevance.
+        """
+        if filter_dict is None:
+            filter_dict = {}
+        if boost_dict is None:
+            boost_dict = {}
+
+        if not self.docs or num_results <= 0:
+            return []
+
+        query_counts = Counter(tokenize(query))
+
+        # (upper bound, field, term id, weight) for every query term in every field
+        terms = []
+        for field in self.text_fields:
+            boost = boost_dict.get(field, 1)
+            if boost <= 0:
+                continue
+            vocabulary = self.vocabularies[field]
+            for term, qtf in query_counts.items():
+                term_id = vocabulary.get(term)
+                if term_id is None:
+                    continue
+                weight = boost * qtf * self.idf[field][term_id]
+                upper_bound = weight * self.max_impacts[field][term_id]
+                terms.append((upper_bound, field, term_id, weight))
+
+        if not terms:
+            return []
+
+        terms.sort(key=lambda t: t[0], reverse=True)
+
+        allowed = self._allowed(filter_dict)
+        scores, seen = self._query_buffers()
+        candidate_chunks = []
+        try:
+            top_ids = self._top_ids(terms, allowed, scores, seen, candidate_chunks, num_results)
+        finally:
+            # only candidates have scores or are marked as seen
+            for chunk in candidate_chunks:
+                scores[chunk] = 0.0
+                seen[chunk] = False
+
+        if output_ids:
+            return [{**self.docs[i], '_id': int(i)} for i in top_ids]
+        return [self.docs[i] for i in top_ids]
+
+    def _top_ids(self, terms, allowed, scores, seen, candidate_chunks, num_results) -> List[int]:
+        """Score the postings of the query terms and select the top documents."""
+        remaining = np.cumsum([t[0] for t in reversed(terms)])[::-1]
+        num_candidates = 0
+        threshold = 0.0
+
+        for i, (_, field, term_id, weight) in enumerate(terms):
+            start, end = self.offsets[field][term_id], self.offsets[field][term_id + 1]
+            ids = self.doc_ids[field][start:end]
+            contributions = self.impacts[field][start:end]
+
+            if allowed is not None:
+                keep = allowed[ids]
+                ids, contributions = ids[keep], contributions[keep]
+
+            if num_candidates >= num_results and remaining[i] < threshold:
+                # no unseen document can reach the current top-k any more
+                keep = seen[ids]
+                ids, contributions = ids[keep], contributions[keep]
+            else:
+                new_ids = ids[~seen[ids]]
+                seen[new_ids] = True
+                candidate_chunks.append(new_ids)
+                num_candidates += len(new_ids)
+
+            scores[ids] += weight * contributions
+
+            if num_candidates >= num_results and i + 1 < len(terms):
+                candidates = np.concatenate(candidate_chunks)
+                candidate_chunks[:] = [candidates]
+                threshold = np.partition(scores[candidates], -num_results)[-num_results]
+
+        if not candidate_chunks:
+            return []
+
+        candidates = np.concatenate(candidate_chunks)
+        best = heapq.nlargest(
+            num_results,
+            zip(scores[candidates].tolist(), (-candidates).tolist()),
+        )
+        return [-neg_id for score, neg_id in best if score > 0]
+
+    def __repr__(self) -> str:
+        return f"BM25Index(text_fields={self.text_fields}, docs={len(self.docs)})"
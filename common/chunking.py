@@ -4,9 +4,231 @@ Document chunking utilities for splitting large documents into smaller, overlapp
 This module provides functionality to break down documents into chunks using a sliding
 window approach, which is useful for processing large texts in smaller, manageable pieces
 while maintaining context through overlapping content.
+
+Two chunking modes are available:
+
+- 'sliding': fixed-size character windows (the default)
+- 'boundary': windows that end and start on paragraph, heading or sentence
+  boundaries where possible, so chunks don't cut through words and code blocks
 """
 
-from typing import Any, Dict, Iterable, List
+import re
+from bisect import bisect_right
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+def iter_window_offsets(
+        n: int,
+        size: int,
+        step: int
+    ) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) offsets of sliding windows over a sequence of length n.
+
+    Args:
+        n (int): The length of the sequence.
+        size (int): The size of each chunk/window.
+        step (int): The step size between consecutive windows.
+
+    Yields:
+        tuple: (start, end) positions of each window, end exclusive.
+
+    Raises:
+        ValueError: If size or step are not positive integers.
+    """
+    if size <= 0 or step <= 0:
+        raise ValueError("size and step must be positive")
+
+    for i in range(0, n, step):
+        yield i, min(i + size, n)
+        if i + size > n:
+            break
+
+
+# Strong breaks: blank lines (paragraphs), the start of a markdown heading
+# and the whitespace after a sentence end. The break position is match.end(),
+# i.e. the first character of the next paragraph/heading/sentence.
+_STRONG_BREAK_RE = re.compile(r'\n[ \t]*\n\s*|\n(?=#{1,6}\s)|(?<=[.!?])\s+')
+_WEAK_BREAK_RE = re.compile(r'\s+')
+_CODE_FENCE_RE = re.compile(r'^[ \t]*(```|~~~).*$\n?', re.MULTILINE)
+
+
+def _fenced_regions(text: str) -> List[Tuple[int, int]]:
+    """Return (start, end) spans of fenced code blocks in markdown text."""
+    regions = []
+    opening = None
+    for match in _CODE_FENCE_RE.finditer(text):
+        if opening is None:
+            opening = match.start()
+        else:
+            regions.append((opening, match.end()))
+            opening = None
+    if opening is not None:
+        regions.append((opening, len(text)))
+    return regions
+
+
+def build_break_index(text: str) -> Tuple[List[int], List[int]]:
+    """
+    Precompute candidate chunk boundaries for a text in a single regex pass.
+
+    Strong breaks inside fenced code blocks are dropped and replaced with
+    the boundaries of the code blocks themselves, so code blocks are only
+    split when they don't fit in a chunk.
+
+    Args:
+        text (str): The text to analyze.
+
+    Returns:
+        tuple: (strong, weak) sorted lists of break offsets. Strong breaks are
+            paragraph, heading, sentence and code block boundaries, weak
+            breaks are word boundaries.
+    """
+    strong = [m.end() for m in _STRONG_BREAK_RE.finditer(text)]
+    weak = [m.end() for m in _WEAK_BREAK_RE.finditer(text)]
+
+    regions = _fenced_regions(text)
+    if regions:
+        region_starts = [start for start, _ in regions]
+        filtered = []
+        for b in strong:
+            i = bisect_right(region_starts, b) - 1
+            if i >= 0 and regions[i][0] < b < regions[i][1]:
+                continue
+            filtered.append(b)
+        for start, end in regions:
+            filtered.append(start)
+            filtered.append(end)
+        strong = sorted(set(filtered))
+
+    return strong, weak
+
+
+def _last_break(breaks: List[int], lo: int, hi: int) -> int | None:
+    """Find the largest break b with lo < b <= hi using binary search."""
+    i = bisect_right(breaks, hi) - 1
+    if i >= 0 and breaks[i] > lo:
+        return breaks[i]
+    return None
+
+
+def iter_boundary_offsets(
+        text: str,
+        size: int,
+        step: int
+    ) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) offsets of chunks aligned to natural text boundaries.
+
+    Each chunk ends at the last strong break (paragraph, heading, sentence,
+    code block) that keeps it between size/2 and size characters long,
+    falling back to the last word boundary and finally to a hard cut.
+    Windows that would be fully contained in the previous chunk are skipped.
+    The next chunk starts at the last break at or before start + step,
+    so with step=size chunks are contiguous and don't overlap at all.
+
+    Args:
+        text (str): The text to be chunked.
+        size (int): The maximum size of each chunk.
+        step (int): The target distance between chunk starts.
+
+    Yields:
+        tuple: (start, end) positions of each chunk, end exclusive.
+
+    Raises:
+        ValueError: If size or step are not positive integers.
+    """
+    if size <= 0 or step <= 0:
+        raise ValueError("size and step must be positive")
+
+    n = len(text)
+    if n == 0:
+        return
+
+    strong, weak = build_break_index(text)
+
+    start = 0
+    prev_end = 0
+    while True:
+        limit = start + size
+        if limit >= n:
+            yield start, n
+            break
+
+        end = _last_break(strong, start + size // 2, limit)
+        if end is None:
+            end = _last_break(weak, start, limit) or limit
+
+        # a chunk that doesn't extend past the previous one is fully contained in it
+        if end > prev_end:
+            yield start, end
+            prev_end = end
+
+        target = start + step
+        if target >= end:
+            start = end
+            continue
+
+        next_start = _last_break(strong, start, target)
+        if next_start is None:
+            next_start = _last_break(weak, start, target) or target
+        start = next_start
+
+
+CHUNKING_MODES = ('sliding', 'boundary')
+
+
+def iter_offsets(
+        seq: Any,
+        size: int,
+        step: int,
+        mode: str = 'sliding'
+    ) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) chunk offsets for a sequence using the given chunking mode.
+
+    Args:
+        seq: The input sequence. The 'boundary' mode requires a string.
+        size (int): The size of each chunk.
+        step (int): The step size between chunks.
+        mode (str): One of CHUNKING_MODES. Defaults to 'sliding'.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode == 'sliding':
+        return iter_window_offsets(len(seq), size=size, step=step)
+    if mode == 'boundary':
+        return iter_boundary_offsets(seq, size=size, step=step)
+    raise ValueError(f"unknown chunking mode: {mode!r}, expected one of {CHUNKING_MODES}")
+
+
+def iter_sliding_window(
+        seq: Iterable[Any],
+        size: int,
+        step: int
+    ) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield overlapping chunks from a sequence using a sliding window approach.
+
+    This is the streaming counterpart of `sliding_window`: windows are produced one
+    at a time instead of being collected into a list.
+
+    Args:
+        seq: The input sequence (string or list) to be chunked.
+        size (int): The size of each chunk/window.
+        step (int): The step size between consecutive windows.
+
+    Yields:
+        dict: A dictionary with 'start' and 'content' for each window.
+
+    Raises:
+        ValueError: If size or step are not positive integers.
+    """
+    for start, end in iter_window_offsets(len(seq), size=size, step=step):
+        yield {'start': start, 'content': seq[start:end]}
 
 
 def sliding_window(
@@ -34,25 +256,54 @@ def sliding_window(
         >>> sliding_window("hello world", size=5, step=3)
         [{'start': 0, 'content': 'hello'}, {'start': 3, 'content': 'lo wo'}]
     """
-    if size <= 0 or step <= 0:
-        raise ValueError("size and step must be positive")
+    return list(iter_sliding_window(seq, size=size, step=step))
 
-    n = len(seq)
-    result = []
-    for i in range(0, n, step):
-        batch = seq[i:i+size]
-        result.append({'start': i, 'content': batch})
-        if i + size > n:
-            break
 
-    return result
+def iter_chunks(
+        documents: Iterable[Dict[str, str]],
+        size: int = 2000,
+        step: int = 1000,
+        content_field_name: str = 'content',
+        mode: str = 'sliding'
+) -> Iterator[Dict[str, str]]:
+    """
+    Stream chunks from a collection of documents, one chunk at a time.
+
+    Works with any iterable, including generators, and never holds more than one
+    document and one chunk in memory, so memory usage stays flat regardless of
+    corpus size. Chunks have the same shape as the ones returned by `chunk_documents`.
+
+    Args:
+        documents: An iterable of document dictionaries. Each document must have a content field.
+        size (int, optional): The maximum size of each chunk. Defaults to 2000.
+        step (int, optional): The step size between chunks. Defaults to 1000.
+        content_field_name (str, optional): The name of the field containing document content.
+                                          Defaults to 'content'.
+        mode (str, optional): Chunking mode, 'sliding' or 'boundary'. Defaults to 'sliding'.
+
+    Yields:
+        dict: A chunk with all original document fields except the content field,
+              plus 'start' and 'content'.
+
+    Example:
+        >>> for chunk in iter_chunks(read_documents(), size=100, step=50):
+        ...     process(chunk)
+    """
+    for doc in documents:
+        doc_copy = doc.copy()
+        doc_content = doc_copy.pop(content_field_name)
+        for start, end in iter_offsets(doc_content, size=size, step=step, mode=mode):
+            chunk = {'start': start, 'content': doc_content[start:end]}
+            chunk.update(doc_copy)
+            yield chunk
 
 
 def chunk_documents(
         documents: Iterable[Dict[str, str]],
         size: int = 2000,
         step: int = 1000,
-        content_field_name: str = 'content'
+        content_field_name: str = 'content',
+        mode: str = 'sliding'
 ) -> List[Dict[str, str]]:
     """
     Split a collection of documents into smaller chunks using sliding windows.
@@ -66,6 +317,9 @@ def chunk_documents(
         step (int, optional): The step size between chunks. Defaults to 1000.
         content_field_name (str, optional): The name of the field containing document content.
                                           Defaults to 'content'.
+        mode (str, optional): Chunking mode. 'sliding' uses fixed-size windows,
+                              'boundary' aligns chunks to paragraphs, headings and
+                              sentences. Defaults to 'sliding'.
 
     Returns:
         list: A list of chunk dictionaries. Each chunk contains:
@@ -80,14 +334,201 @@ def chunk_documents(
         >>> documents = [{'text': 'long text...', 'filename': 'doc.txt'}]
         >>> chunks = chunk_documents(documents, content_field_name='text')
     """
-    results = []
+    chunks = iter_chunks(
+        documents,
+        size=size,
+        step=step,
+        content_field_name=content_field_name,
+        mode=mode,
+    )
+    return list(chunks)
 
-    for doc in documents:
-        doc_copy = doc.copy()
-        doc_content = doc_copy.pop(content_field_name)
-        chunks = sliding_window(doc_content, size=size, step=step)
-        for chunk in chunks:
-            chunk.update(doc_copy)
-        results.extend(chunks)
 
-    return results
\ No newline at end of file
+class Chunk(Mapping):
+    """
+    A read-only, dict-like view of a single chunk of a document.
+
+    Stores only a reference to the source document and the chunk offsets.
+    The chunk content is sliced from the document on access, and metadata
+    fields are read from the source document instead of being copied.
+
+    The view exposes exactly the same keys and values as the dictionaries
+    produced by `chunk_documents`.
+    """
+
+    __slots__ = ('_doc', '_content_field', 'start', 'end')
+
+    def __init__(self, doc: Dict[str, Any], content_field: str, start: int, end: int):
+        self._doc = doc
+        self._content_field = content_field
+        self.start = start
+        self.end = end
+
+    @property
+    def content(self) -> str:
+        """Materialize the chunk content."""
+        return self._doc[self._content_field][self.start:self.end]
+
+    def __getitem__(self, key: str) -> Any:
+        # document fields take precedence, the same way dict.update does in chunk_documents
+        if key != self._content_field and key in self._doc:
+            return self._doc[key]
+        if key == 'start':
+            return self.start
+        if key == 'content':
+            return self.content
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in ('start', 'content'):
+            return True
+        return key != self._content_field and key in self._doc
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'start'
+        yield 'content'
+        for key in self._doc:
+            if key not in (self._content_field, 'start', 'content'):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"Chunk(start={self.start}, end={self.end}, keys={list(self)})"
+
+
+class ChunkedDocuments(Sequence):
+    """
+    A compact, array-backed collection of chunks.
+
+    Each chunk is stored as a (doc_id, start, end) triple in typed arrays,
+    and the source documents are kept by reference. Indexing returns a
+    lazy `Chunk` view, so chunk content is only materialized when it is
+    actually needed, e.g. when the chunk is indexed or displayed.
+
+    Attributes:
+        documents (list): The source documents.
+        content_field (str): The name of the field containing document content.
+        doc_ids (array): Position of the source document for each chunk.
+        starts (array): Start offset of each chunk.
+        ends (array): End offset (exclusive) of each chunk.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]], content_field: str = 'content'):
+        self.documents = documents
+        self.content_field = content_field
+        self.doc_ids = array('q')
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def append(self, doc_id: int, start: int, end: int) -> None:
+        """Add a chunk given its document position and offsets."""
+        self.doc_ids.append(doc_id)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def select(self, positions: Iterable[int]) -> 'ChunkedDocuments':
+        """
+        Create a new collection with only the chunks at the given positions.
+
+        The source documents are shared with this collection, not copied.
+        """
+        result = ChunkedDocuments(self.documents, self.content_field)
+        for i in positions:
+            result.append(self.doc_ids[i], self.starts[i], self.ends[i])
+        return result
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        doc = self.documents[self.doc_ids[i]]
+        return Chunk(doc, self.content_field, self.starts[i], self.ends[i])
+
+    def __iter__(self) -> Iterator[Chunk]:
+        documents = self.documents
+        content_field = self.content_field
+        for doc_id, start, end in zip(self.doc_ids, self.starts, self.ends):
+            yield Chunk(documents[doc_id], content_field, start, end)
+
+    def as_dicts(self) -> 'ChunkDicts':
+        """A view of this collection whose items are plain dicts, see `ChunkDicts`."""
+        return ChunkDicts(self)
+
+    def __repr__(self) -> str:
+        return f"ChunkedDocuments(documents={len(self.documents)}, chunks={len(self)})"
+
+
+class ChunkDicts(Sequence):
+    """
+    Chunks as plain dicts on access, still stored as offsets.
+
+    An index returns the items of its document collection as search
+    results, and callers expect dicts they can copy, modify or serialize
+    to JSON. Looking up a chunk by position creates that dict; iterating,
+    as fitting an index does, yields the lazy `Chunk` views, so the whole
+    collection is never materialized.
+
+    Attributes:
+        chunks (ChunkedDocuments): The underlying chunks.
+    """
+
+    def __init__(self, chunks: ChunkedDocuments):
+        self.chunks = chunks
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return dict(self.chunks[i])
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return iter(self.chunks)
+
+    def __repr__(self) -> str:
+        return f"ChunkDicts({self.chunks!r})"
+
+
+def chunk_offsets(
+        documents: Iterable[Dict[str, str]],
+        size: int = 2000,
+        step: int = 1000,
+        content_field_name: str = 'content',
+        mode: str = 'sliding'
+) -> ChunkedDocuments:
+    """
+    Split documents into chunks without copying their content.
+
+    Produces the same chunks as `chunk_documents`, but stores only the chunk
+    offsets. Peak memory is roughly the size of the corpus itself instead of
+    size/step copies of it plus a metadata copy per chunk.
+
+    Args:
+        documents: An iterable of document dictionaries. Each document must have a content field.
+        size (int, optional): The maximum size of each chunk. Defaults to 2000.
+        step (int, optional): The step size between chunks. Defaults to 1000.
+        content_field_name (str, optional): The name of the field containing document content.
+                                          Defaults to 'content'.
+        mode (str, optional): Chunking mode, 'sliding' or 'boundary'. Defaults to 'sliding'.
+
+    Returns:
+        ChunkedDocuments: A sequence of lazy `Chunk` views.
+
+    Example:
+        >>> chunks = chunk_offsets(documents, size=100, step=50)
+        >>> chunks[0]['content']  # materialized only here
+    """
+    documents = list(documents)
+    result = ChunkedDocuments(documents, content_field_name)
+
+    for doc_id, doc in enumerate(documents):
+        content = doc[content_field_name]
+        for start, end in iter_offsets(content, size=size, step=step, mode=mode):
+            result.append(doc_id, start, end)
+
+    return result
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Near-duplicate elimination for documents and chunks before indexing.
+
+Overlapping windows, FAQ entries copied across courses and notebooks that
+repeat code files produce many near-identical chunks. They inflate the index
+and crowd the top results with copies of the same text.
+
+Every chunk gets a MinHash signature of its word shingles. Signatures are
+split into bands and bucketed (locality-sensitive hashing), so only chunks
+that share a bucket are compared, which keeps deduplication roughly linear
+in the number of chunks. The first chunk of a group of near-duplicates is
+kept and the later ones are dropped. Chunks without any words (tables of
+numbers, punctuation) have no shingles to compare and are always kept.
+"""
+
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from common.chunking import ChunkedDocuments
+from common.text import tokenize
+
+
+# odd multiplier for combining token hashes into shingle hashes
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclass
+class DeduplicationStats:
+    """
+    Summary of a deduplication run.
+
+    Attributes:
+        total_chunks (int): Number of chunks before deduplication.
+        removed_chunks (int): Number of near-duplicate chunks dropped.
+        saved_bytes (int): UTF-8 size of the text that is no longer indexed.
+        duplicates (dict): Position of each dropped chunk -> position of the kept chunk it duplicates.
+    """
+    total_chunks: int = 0
+    removed_chunks: int = 0
+    saved_bytes: int = 0
+    duplicates: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def kept_chunks(self) -> int:
+        return self.total_chunks - self.removed_chunks
+
+    def __str__(self) -> str:
+        return (
+            f"removed {self.removed_chunks} of {self.total_chunks} chunks "
+            f"as near-duplicates, saved {self.saved_bytes / 1024:.1f} KiB"
+        )
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of word shingles.
+
+    Every token is hashed once, and shingle hashes are combined from the
+    token hashes with numpy. The hash functions are multiply-shift hashes
+    (`(a * x) >> 32` with odd `a`, in wrapping 64-bit arithmetic), so computing a
+    signature needs no modulo.
+
+    Attributes:
+        num_perm (int): Number of hash functions (signature length).
+        shingle_size (int): Number of consecutive words in a shingle.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """64-bit hashes of the distinct word shingles of a text, empty without words."""
+        tokens = tokenize(text)
+        if not tokens:
+            return np.zeros(0, dtype=np.uint64)
+        token_hashes = np.fromiter(
+            (zlib.crc32(token.encode('utf-8')) for token in tokens),
+            dtype=np.uint64,
+            count=len(tokens),
+        )
+
+        # texts shorter than a shingle are a single shingle
+        num_shingles = max(len(tokens) - self.shingle_size + 1, 1)
+        hashes = np.zeros(num_shingles, dtype=np.uint64)
+        for j in range(min(self.shingle_size, len(tokens))):
+            hashes = hashes * _SHINGLE_MULTIPLIER + token_hashes[j:j + num_shingles]
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> np.ndarray:
+        """The MinHash signature of a text."""
+        return self.minhash(self.shingles(text))
+
+    def minhash(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        The MinHash signature of a set of shingle hashes.
+
+        The signature of the empty set is all maximum values, which no
+        similarity check should rely on.
+        """
+        if not len(hashes):
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        permuted = self._a * hashes
+        permuted >>= np.uint64(32)
+        return permuted.min(axis=1)
+
+
+def _band_keys(signature: np.ndarray, bands: int) -> List[Tuple[int, bytes]]:
+    return [(band, chunk.tobytes()) for band, chunk in enumerate(np.split(signature, bands))]
+
+
+def find_duplicates(
+        texts: Iterable[str],
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+) -> Dict[int, int]:
+    """
+    Find near-duplicate texts.
+
+    Texts sharing at least one LSH bucket are compared by the fraction of
+    equal signature values, an estimate of the Jaccard similarity of their
+    shingles. A text is a duplicate if its similarity to an earlier kept
+    text is at least `threshold`. Texts without words have no shingles
+    and are never duplicates.
+
+    Args:
+        texts: The texts to compare.
+        threshold (float, optional): Minimum estimated Jaccard similarity. Defaults to 0.8.
+        num_perm (int, optional): Signature length. Defaults to 128.
+        bands (int, optional): Number of LSH bands; must divide num_perm. More bands
+                               find more candidates at lower similarities. Defaults to 32.
+        shingle_size (int, optional): Words per shingle. Defaults to 5.
+
+    Returns:
+        dict: Position of each duplicate text -> position of the text it duplicates.
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+
+    hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    signatures: Dict[int, np.ndarray] = {}
+    duplicates: Dict[int, int] = {}
+
+    for position, text in enumerate(texts):
+        hashes = hasher.shingles(text)
+        if not len(hashes):
+            continue
+
+        signature = hasher.minhash(hashes)
+        signatures[position] = signature
+        keys = _band_keys(signature, bands)
+
+        original = None
+        checked = set()
+        for key in keys:
+            for candidate in buckets.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if np.mean(signatures[candidate] == signature) >= threshold:
+                    original = candidate
+                    break
+            if original is not None:
+                break
+
+        if original is not None:
+            duplicates[position] = original
+            continue
+
+        # only kept texts are bucketed, so every duplicate points to a kept text
+        for key in keys:
+            buckets.setdefault(key, []).append(position)
+
+    return duplicates
+
+
+def deduplicate_documents(
+        documents: Sequence[Any],
+        content_field_name: str = 'content',
+        threshold: float = 0.8,
+        **params,
+) -> Tuple[Sequence[Any], DeduplicationStats]:
+    """
+    Drop near-duplicate documents or chunks, keeping the first of each group.
+
+    Args:
+        documents: Documents or chunks, e.g. a `ChunkedDocuments` collection.
+        content_field_name (str, optional): The field compared for duplicates.
+                                          Defaults to 'content'.
+        threshold (float, optional): Minimum estimated Jaccard similarity. Defaults to 0.8.
+        **params: Passed to `find_duplicates` (num_perm, bands, shingle_size).
+
+    Returns:
+        tuple: The kept documents (a `ChunkedDocuments` if one was given,
+               otherwise a list) and the `DeduplicationStats`.
+    """
+    if not isinstance(documents, ChunkedDocuments):
+        documents = list(documents)
+
+    def text(doc) -> str:
+        return doc.get(content_field_name, '') or ''
+
+    # chunk texts are materialized one at a time, not all at once
+    duplicates = find_duplicates((text(doc) for doc in documents), threshold=threshold, **params)
+
+    kept = [i for i in range(len(documents)) if i not in duplicates]
+    stats = DeduplicationStats(
+        total_chunks=len(documents),
+        removed_chunks=len(duplicates),
+        saved_bytes=sum(len(text(documents[i]).encode('utf-8')) for i in duplicates),
+        duplicates=duplicates,
+    )
+
+    if isinstance(documents, ChunkedDocuments):
+        return documents.select(kept), stats
+    return [documents[i] for i in kept], stats
@@ -0,0 +1,310 @@
+"""
+Incremental document index with add, update and remove operations.
+
+The minsearch Index has to be re-fitted on the full corpus whenever a single
+document changes. IncrementalIndex keeps per-term postings and per-document
+term frequencies, so adding, updating or removing documents only tokenizes
+the documents that changed.
+
+Scoring is the same TF-IDF cosine similarity that minsearch uses (smoothed
+idf, l2-normalized vectors, the scikit-learn default tokenizer). Idf values
+and document norms are reweighted lazily: small changes reuse the current
+weights, and a full reweight happens in a batch once enough of the corpus
+has changed, or when `reweight()` is called explicitly.
+"""
+
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from common.chunking import chunk_offsets
+from common.text import tokenize
+
+
+class IncrementalIndex:
+    """
+    A TF-IDF search index that supports incremental updates.
+
+    Documents are keyed by `id_field` (by default 'filename'). When chunking
+    is enabled, all chunks of a document share its id, so updating or removing
+    a document replaces or removes all of its chunks.
+
+    Attributes:
+        text_fields (list): List of text field names to index.
+        keyword_fields (list): List of keyword field names to index.
+        id_field (str): Field used as the document id.
+        version (int): Incremented on every change, useful for invalidating caches.
+    """
+
+    def __init__(
+            self,
+            text_fields,
+            keyword_fields=None,
+            id_field: str = 'filename',
+            chunk: bool = False,
+            chunking_params=None,
+            reweight_threshold: float = 0.1,
+    ):
+        """
+        Initialize an empty incremental index.
+
+        Args:
+            text_fields (list): List of text field names to index.
+            keyword_fields (list, optional): List of keyword field names to index.
+            id_field (str, optional): Field used as the document id. Defaults to 'filename'.
+            chunk (bool, optional): Whether to chunk documents before indexing.
+            chunking_params (dict, optional): Parameters for document chunking.
+                                        Defaults to {'size': 2000, 'step': 1000}.
+            reweight_threshold (float, optional): Fraction of the index that has to change
+                                        before idf values and norms are recomputed.
+                                        Use 0 to always keep weights exact.
+        """
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields if keyword_fields is not None else []
+        self.id_field = id_field
+        self.chunk = chunk
+        if chunk and chunking_params is None:
+            chunking_params = {'size': 2000, 'step': 1000}
+        self.chunking_params = chunking_params
+        self.reweight_threshold = reweight_threshold
+        self.version = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slots: List[Any] = []
+        self._free_slots: List[int] = []
+        self._slots_by_id: Dict[Any, List[int]] = {}
+        self._keywords = {field: [] for field in self.keyword_fields}
+
+        # term -> {slot: term frequency}
+        self._postings = {field: {} for field in self.text_fields}
+        # slot -> {term: term frequency}
+        self._doc_terms = {field: [] for field in self.text_fields}
+        self._idf = {field: {} for field in self.text_fields}
+        self._norms = {field: np.zeros(0) for field in self.text_fields}
+        self._pending_changes = 0
+
+    @property
+    def docs(self) -> List[Any]:
+        """The currently indexed documents (or chunks)."""
+        return [doc for doc in self._slots if doc is not None]
+
+    def __len__(self) -> int:
+        return len(self._slots) - len(self._free_slots)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._slots_by_id
+
+    def fit(self, docs: Iterable[Dict[str, Any]]) -> 'IncrementalIndex':
+        """
+        Replace the contents of the index with the given documents.
+
+        Args:
+            docs: Documents to index.
+        """
+        self._reset()
+        self.add(docs)
+        self.reweight()
+        return self
+
+    def add(self, docs: Iterable[Dict[str, Any]]) -> 'IncrementalIndex':
+        """
+        Add new documents to the index.
+
+        Args:
+            docs: Documents to add.
+
+        Raises:
+            ValueError: If a document with the same id is already indexed.
+        """
+        for doc in docs:
+            doc_id = doc[self.id_field]
+            if doc_id in self._slots_by_id:
+                raise ValueError(f"document {doc_id!r} is already indexed, use update()")
+            self._insert(doc_id, doc)
+        return self
+
+    def update(self, docs: Iterable[Dict[str, Any]]) -> 'IncrementalIndex':
+        """
+        Add or replace documents, matching them by id.
+
+        Args:
+            docs: Documents to add or replace.
+        """
+        for doc in docs:
+            doc_id = doc[self.id_field]
+            if doc_id in self._slots_by_id:
+                self._delete(doc_id)
+            self._insert(doc_id, doc)
+        return self
+
+    def remove(self, doc_ids: Iterable[Any]) -> 'IncrementalIndex':
+        """
+        Remove documents from the index. Unknown ids are ignored.
+
+        Args:
+            doc_ids: Ids of the documents to remove.
+        """
+        for doc_id in doc_ids:
+            if doc_id in self._slots_by_id:
+                self._delete(doc_id)
+        return self
+
+    def _insert(self, doc_id, doc: Dict[str, Any]) -> None:
+        if self.chunk:
+            entries = chunk_offsets([doc], **self.chunking_params)
+        else:
+            entries = [doc]
+
+        slots = []
+        for entry in entries:
+            slot = self._allocate_slot()
+            self._slots[slot] = entry
+            for field in self.keyword_fields:
+                self._keywords[field][slot] = entry.get(field)
+            for field in self.text_fields:
+                self._index_field(field, slot, entry.get(field, '') or '')
+            slots.append(slot)
+
+        self._slots_by_id[doc_id] = slots
+        self._touch(len(slots))
+
+    def _delete(self, doc_id) -> None:
+        slots = self._slots_by_id.pop(doc_id)
+        for slot in slots:
+            for field in self.text_fields:
+                postings = self._postings[field]
+                for term in self._doc_terms[field][slot]:
+                    term_postings = postings[term]
+                    del term_postings[slot]
+                    if not term_postings:
+                        del postings[term]
+                        del self._idf[field][term]
+                self._doc_terms[field][slot] = {}
+                self._norms[field][slot] = 0.0
+            for field in self.keyword_fields:
+                self._keywords[field][slot] = None
+            self._slots[slot] = None
+            self._free_slots.append(slot)
+        self._touch(len(slots))
+
+    def _allocate_slot(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+
+        slot = len(self._slots)
+        self._slots.append(None)
+        for field in self.keyword_fields:
+            self._keywords[field].append(None)
+        for field in self.text_fields:
+            self._doc_terms[field].append({})
+            norms = self._norms[field]
+            if slot >= len(norms):
+                self._norms[field] = np.concatenate([norms, np.zeros(max(16, len(norms)))])
+        return slot
+
+    def _index_field(self, field: str, slot: int, text: str) -> None:
+        term_counts = Counter(tokenize(text))
+        self._doc_terms[field][slot] = term_counts
+
+        postings = self._postings[field]
+        idf = self._idf[field]
+        for term, tf in term_counts.items():
+            postings.setdefault(term, {})[slot] = tf
+            if term not in idf:
+                idf[term] = self._compute_idf(len(postings[term]))
+
+        self._norms[field][slot] = self._doc_norm(field, term_counts)
+
+    def _compute_idf(self, df: int) -> float:
+        n = len(self)
+        return math.log((1 + n) / (1 + df)) + 1
+
+    def _doc_norm(self, field: str, term_counts: Dict[str, int]) -> float:
+        idf = self._idf[field]
+        return math.sqrt(sum((tf * idf[term]) ** 2 for term, tf in term_counts.items()))
+
+    def _touch(self, num_changes: int) -> None:
+        self.version += 1
+        self._pending_changes += num_changes
+
+    def reweight(self) -> None:
+        """Recompute idf values and document norms for the whole index."""
+        for field in self.text_fields:
+            self._idf[field] = {
+                term: self._compute_idf(len(postings))
+                for term, postings in self._postings[field].items()
+            }
+            norms = self._norms[field]
+            for slot, term_counts in enumerate(self._doc_terms[field]):
+                if term_counts:
+                    norms[slot] = self._doc_norm(field, term_counts)
+        self._pending_changes = 0
+
+    def _maybe_reweight(self) -> None:
+        if self._pending_changes == 0:
+            return
+        if self._pending_changes > self.reweight_threshold * len(self):
+            self.reweight()
+
+    def _field_scores(self, field: str, query_tokens: List[str], scores: Dict[int, float], boost: float) -> None:
+        postings = self._postings[field]
+        idf = self._idf[field]
+        norms = self._norms[field]
+
+        query_weights = {
+            term: tf * idf[term]
+            for term, tf in Counter(query_tokens).items()
+            if term in postings
+        }
+        query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+        if query_norm == 0:
+            return
+
+        for term, weight in query_weights.items():
+            term_weight = boost * weight * idf[term] / query_norm
+            for slot, tf in postings[term].items():
+                scores[slot] = scores.get(slot, 0.0) + term_weight * tf / norms[slot]
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10, output_ids=False):
+        """
+        Searches the index with the given query, filters, and boost parameters.
+
+        Args:
+            query (str): The search query string.
+            filter_dict (dict): Dictionary of keyword fields to filter by.
+            boost_dict (dict): Dictionary of boost scores for text fields.
+            num_results (int): The number of top results to return. Defaults to 10.
+            output_ids (bool): If True, adds an '_id' field with the internal slot of each document.
+
+        Returns:
+            list of dict: List of documents matching the search criteria, ranked by relevance.
+        """
+        if filter_dict is None:
+            filter_dict = {}
+        if boost_dict is None:
+            boost_dict = {}
+
+        self._maybe_reweight()
+
+        query_tokens = tokenize(query)
+        scores: Dict[int, float] = {}
+        for field in self.text_fields:
+            self._field_scores(field, query_tokens, scores, boost_dict.get(field, 1))
+
+        for field, value in filter_dict.items():
+            if field not in self.keyword_fields:
+                continue
+            values = self._keywords[field]
+            scores = {slot: score for slot, score in scores.items() if values[slot] == value}
+
+        ranked = sorted(
+            (slot for slot, score in scores.items() if score > 0),
+            key=lambda slot: (-scores[slot], slot),
+        )[:num_results]
+
+        if output_ids:
+            return [{**self._slots[slot], '_id': slot} for slot in ranked]
+        return [self._slots[slot] for slot in ranked]
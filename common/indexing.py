@@ -2,15 +2,442 @@
 Document indexing utilities for creating searchable indexes from document collections.
 
 This module provides functionality to index documents using minsearch, with optional
-chunking support for handling large documents.
+chunking support for handling large documents, and on-disk snapshots of fitted
+indexes so that restarts don't have to re-chunk and re-fit the corpus.
 """
 
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
 from minsearch import Index
 
-from common.chunking import chunk_documents
+from common.bm25 import BM25Index
+from common.chunking import chunk_offsets
+from common.dedup import DeduplicationStats, deduplicate_documents
+
+
+# 2: chunked indexes store ChunkDicts instead of ChunkedDocuments
+SNAPSHOT_FORMAT_VERSION = 2
+
+# snapshots kept in a snapshot directory, the most recently used ones
+DEFAULT_KEEP_SNAPSHOTS = 3
+
+DEFAULT_TEXT_FIELDS = ["content", "filename"]
+
+SEARCH_ENGINES = ('minsearch', 'bm25')
+
+
+def documents_fingerprint(documents, **params) -> str:
+    """
+    Compute a stable fingerprint of a document collection and indexing parameters.
+
+    Args:
+        documents: A collection of document dictionaries.
+        **params: Any parameters that affect the resulting index,
+                  e.g. chunk=True, chunking_params={...}.
+
+    Returns:
+        str: A hex digest that changes whenever the documents or parameters change.
+    """
+    h = hashlib.sha256()
+
+    header = {'format_version': SNAPSHOT_FORMAT_VERSION, **params}
+    h.update(json.dumps(header, sort_keys=True, default=str).encode('utf-8'))
+
+    for doc in documents:
+        h.update(b'\x1e')
+        h.update(json.dumps(dict(doc), sort_keys=True, default=str).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+def save_index(index, path) -> None:
+    """
+    Save a fitted index to a snapshot directory.
+
+    For a minsearch Index, the TF-IDF matrices are stored as raw .npy arrays
+    so they can be memory-mapped on load. Vectorizers (vocabulary and idf),
+    keyword data and the document store are pickled. Other indexes (e.g.
+    BM25Index) are pickled as a whole. The snapshot is written to a
+    temporary directory first and then moved in place, so a partially
+    written snapshot is never picked up.
+
+    Args:
+        index: A fitted minsearch Index or BM25Index.
+        path: The snapshot directory. Replaced if it already exists.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+
+    try:
+        if isinstance(index, Index):
+            _save_minsearch(index, tmp_path)
+        else:
+            with open(tmp_path / "index.pkl", "wb") as f_out:
+                pickle.dump(index, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+            meta = {'format_version': SNAPSHOT_FORMAT_VERSION, 'engine': 'pickle'}
+            (tmp_path / "meta.json").write_text(json.dumps(meta, indent=2), encoding='utf-8')
+
+        if path.exists():
+            shutil.rmtree(path)
+        tmp_path.rename(path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def prune_snapshots(snapshot_dir, keep: int) -> list[Path]:
+    """
+    Remove all but the `keep` most recently used snapshots in a directory.
+
+    A snapshot counts as used when it's saved or loaded by `index_documents`.
+
+    Args:
+        snapshot_dir: The directory with one snapshot per fingerprint.
+        keep: The number of snapshots to keep.
+
+    Returns:
+        list: The removed snapshot directories.
+    """
+    snapshots = [
+        path for path in Path(snapshot_dir).iterdir()
+        if not path.name.startswith('.') and (path / "meta.json").exists()
+    ]
+    snapshots.sort(key=lambda path: path.stat().st_mtime_ns, reverse=True)
+
+    removed = snapshots[keep:]
+    for path in removed:
+        shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def _save_minsearch(index: Index, tmp_path: Path) -> None:
+    matrices = {}
+    for i, (field, matrix) in enumerate(index.text_matrices.items()):
+        matrix = csr_matrix(matrix)
+        name = f"field_{i}"
+        np.save(tmp_path / f"{name}.data.npy", matrix.data)
+        np.save(tmp_path / f"{name}.indices.npy", matrix.indices)
+        np.save(tmp_path / f"{name}.indptr.npy", matrix.indptr)
+        matrices[field] = {'name': name, 'shape': list(matrix.shape)}
+
+    with open(tmp_path / "vectorizers.pkl", "wb") as f_out:
+        pickle.dump(index.vectorizers, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+
+    with open(tmp_path / "keywords.pkl", "wb") as f_out:
+        pickle.dump(index.keyword_df, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+
+    with open(tmp_path / "docs.pkl", "wb") as f_out:
+        pickle.dump(index.docs, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+
+    meta = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'engine': 'minsearch',
+        'text_fields': index.text_fields,
+        'keyword_fields': index.keyword_fields,
+        'matrices': matrices,
+    }
+    stats = getattr(index, 'deduplication_stats', None)
+    if stats is not None:
+        meta['deduplication_stats'] = asdict(stats)
+    (tmp_path / "meta.json").write_text(json.dumps(meta, indent=2), encoding='utf-8')
+
+
+def load_index(path, mmap: bool = True):
+    """
+    Load an index from a snapshot directory created by `save_index`.
+
+    Args:
+        path: The snapshot directory.
+        mmap (bool, optional): Memory-map the TF-IDF matrices of a minsearch
+                               Index instead of reading them into memory.
+                               Defaults to True.
+
+    Returns:
+        A fitted index ready for searching.
+
+    Raises:
+        ValueError: If the snapshot was written with an incompatible format.
+    """
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text(encoding='utf-8'))
+
+    if meta['format_version'] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot format: {meta['format_version']}")
+
+    if meta['engine'] == 'pickle':
+        with open(path / "index.pkl", "rb") as f_in:
+            return pickle.load(f_in)
+
+    index = Index(
+        text_fields=meta['text_fields'],
+        keyword_fields=meta['keyword_fields'],
+    )
+
+    with open(path / "vectorizers.pkl", "rb") as f_in:
+        index.vectorizers = pickle.load(f_in)
+
+    with open(path / "keywords.pkl", "rb") as f_in:
+        index.keyword_df = pickle.load(f_in)
+
+    with open(path / "docs.pkl", "rb") as f_in:
+        index.docs = pickle.load(f_in)
+
+    mmap_mode = 'r' if mmap else None
+    for field, info in meta['matrices'].items():
+        name = info['name']
+        data = np.load(path / f"{name}.data.npy", mmap_mode=mmap_mode)
+        indices = np.load(path / f"{name}.indices.npy", mmap_mode=mmap_mode)
+        indptr = np.load(path / f"{name}.indptr.npy", mmap_mode=mmap_mode)
+        index.text_matrices[field] = csr_matrix(
+            (data, indices, indptr),
+            shape=tuple(info['shape']),
+            copy=False,
+        )
+
+    if 'deduplication_stats' in meta:
+        stats = meta['deduplication_stats']
+        stats['duplicates'] = {int(k): v for k, v in stats['duplicates'].items()}
+        index.deduplication_stats = DeduplicationStats(**stats)
+
+    return index
+
+
+def _filter_mask(index: Index, filter_dict) -> np.ndarray | None:
+    """Build a 0/1 mask of documents that pass the keyword filters, or None."""
+    mask = None
+    for field, value in (filter_dict or {}).items():
+        if field not in index.keyword_fields:
+            continue
+        if value is None:
+            field_mask = index.keyword_df[field].isna().to_numpy()
+        else:
+            field_mask = (index.keyword_df[field] == value).to_numpy()
+        mask = field_mask if mask is None else mask & field_mask
+    return None if mask is None else mask.astype(np.float64)
+
+
+def _field_similarity(index: Index, field: str, query: str) -> np.ndarray:
+    """Cosine similarity between a query and all documents for one text field."""
+    vectorizer = index.vectorizers[field]
+    query_vec = vectorizer.transform([query])
+    matrix = index.text_matrices[field]
 
+    if vectorizer.norm == 'l2':
+        # rows are already unit length, so cosine similarity is a plain dot
+        # product; this avoids re-normalizing a copy of the matrix per query
+        return matrix @ query_vec.toarray().ravel()
 
-def index_documents(documents, chunk: bool = False, chunking_params=None) -> Index:
+    return cosine_similarity(query_vec, matrix).ravel()
+
+
+def _batch_scores(index: Index, queries: List[str], filter_dict, boost_dict) -> csr_matrix:
+    """Score a batch of queries against all documents as a sparse (queries x docs) matrix."""
+    boost_dict = boost_dict or {}
+    scores = None
+
+    for field in index.text_fields:
+        vectorizer = index.vectorizers[field]
+        query_vecs = vectorizer.transform(queries)
+        matrix = index.text_matrices[field]
+
+        if vectorizer.norm == 'l2':
+            sim = (matrix @ query_vecs.T).T
+        else:
+            sim = csr_matrix(cosine_similarity(query_vecs, matrix))
+
+        sim = sim * boost_dict.get(field, 1)
+        scores = sim if scores is None else scores + sim
+
+    mask = _filter_mask(index, filter_dict)
+    if mask is not None:
+        scores = scores.multiply(mask[np.newaxis, :])
+
+    scores = csr_matrix(scores)
+    scores.sort_indices()
+    return scores
+
+
+def score_documents(index: Index, query: str, filter_dict=None, boost_dict=None) -> np.ndarray:
+    """
+    Compute relevance scores of all documents in a fitted minsearch Index.
+
+    Uses the same scoring as `Index.search` (boosted TF-IDF cosine similarity
+    with keyword filters), but returns the raw scores so that results from
+    several indexes can be merged.
+
+    Args:
+        index (Index): A fitted minsearch Index.
+        query (str): The search query string.
+        filter_dict (dict, optional): Keyword fields to filter by.
+        boost_dict (dict, optional): Boost scores for text fields.
+
+    Returns:
+        np.ndarray: One score per document; 0 means no match.
+    """
+    if boost_dict is None:
+        boost_dict = {}
+
+    scores = np.zeros(len(index.docs))
+    if not index.docs:
+        return scores
+
+    for field in index.text_fields:
+        scores += _field_similarity(index, field, query) * boost_dict.get(field, 1)
+
+    mask = _filter_mask(index, filter_dict)
+    if mask is not None:
+        scores = scores * mask
+
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Get the positions of the k highest non-zero scores, best first.
+
+    Uses argpartition, so only the selected scores are sorted.
+    """
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        part = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[part]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def rank_many(
+        index: Index,
+        queries: Iterable[str],
+        filter_dict=None,
+        boost_dict=None,
+        num_results: int = 10,
+        batch_size: int = 512,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Rank documents of a minsearch Index for many queries at once.
+
+    Queries are vectorized in batches into one sparse matrix per text field
+    and scored with a single sparse matrix product, so per-query overhead
+    is paid once per batch instead of once per query.
+
+    Args:
+        index (Index): A fitted minsearch Index.
+        queries: The search queries.
+        filter_dict (dict, optional): Keyword fields to filter by.
+        boost_dict (dict, optional): Boost scores for text fields.
+        num_results (int, optional): Number of results per query. Defaults to 10.
+        batch_size (int, optional): Number of queries scored together. Defaults to 512.
+
+    Yields:
+        tuple: (positions, scores) of the top documents for each query, best first.
+    """
+    queries = list(queries)
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0))
+
+    if not index.docs:
+        for _ in queries:
+            yield empty
+        return
+
+    for batch_start in range(0, len(queries), batch_size):
+        batch = queries[batch_start:batch_start + batch_size]
+        scores = _batch_scores(index, batch, filter_dict, boost_dict)
+
+        for row in range(len(batch)):
+            row_start, row_end = scores.indptr[row], scores.indptr[row + 1]
+            row_scores = scores.data[row_start:row_end]
+            row_positions = scores.indices[row_start:row_end]
+
+            best = top_k(row_scores, num_results)
+            yield row_positions[best], row_scores[best]
+
+
+def search_many(
+        index,
+        queries: Iterable[str],
+        filter_dict=None,
+        boost_dict=None,
+        num_results: int = 10,
+        output_ids: bool = False,
+        batch_size: int = 512,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run many search queries against an index in one go.
+
+    For a minsearch Index, all queries are scored with batched sparse matrix
+    products (see `rank_many`), which is much faster than calling
+    `index.search` in a loop. Indexes with their own `search_many` method
+    use it, and any other index falls back to one `search` call per query.
+
+    Args:
+        index: The index to search.
+        queries: The search queries.
+        filter_dict (dict, optional): Keyword fields to filter by.
+        boost_dict (dict, optional): Boost scores for text fields.
+        num_results (int, optional): Number of results per query. Defaults to 10.
+        output_ids (bool, optional): If True, adds an '_id' field to each document.
+        batch_size (int, optional): Number of queries scored together. Defaults to 512.
+
+    Returns:
+        list: One list of result documents per query, in the order of the queries.
+
+    Example:
+        >>> results = search_many(index, ["install docker", "run postgres"], num_results=5)
+    """
+    search_params = dict(
+        filter_dict=filter_dict,
+        boost_dict=boost_dict,
+        num_results=num_results,
+        output_ids=output_ids,
+    )
+
+    if hasattr(index, 'search_many'):
+        return index.search_many(queries, **search_params)
+
+    if not isinstance(index, Index):
+        return [index.search(query, **search_params) for query in queries]
+
+    ranked = rank_many(
+        index,
+        queries,
+        filter_dict=filter_dict,
+        boost_dict=boost_dict,
+        num_results=num_results,
+        batch_size=batch_size,
+    )
+
+    results = []
+    for positions, _ in ranked:
+        if output_ids:
+            results.append([{**index.docs[i], '_id': int(i)} for i in positions])
+        else:
+            results.append([index.docs[i] for i in positions])
+    return results
+
+
+def index_documents(
+        documents,
+        chunk: bool = False,
+        chunking_params=None,
+        snapshot_dir=None,
+        engine: str = 'minsearch',
+        deduplicate: bool = False,
+        deduplication_params=None,
+        keep_snapshots: int | None = DEFAULT_KEEP_SNAPSHOTS,
+):
     """
     Create a searchable index from a collection of documents.
 
@@ -21,24 +448,87 @@ def index_documents(documents, chunk: bool = False, chunking_params=None) -> Ind
                                Defaults to False.
         chunking_params (dict, optional): Parameters for document chunking.
                                         Defaults to {'size': 2000, 'step': 1000}.
+                                        Pass 'mode': 'boundary' to align chunks to
+                                        paragraphs, headings and sentences.
                                         Only used when chunk=True.
+        snapshot_dir (str or Path, optional): Directory for on-disk index snapshots.
+                                        When given, the fitted index is saved there
+                                        under a fingerprint of the documents and
+                                        parameters, and loaded back instead of
+                                        re-fitted when the same input is indexed again.
+                                        Use a separate directory per pipeline.
+        engine (str, optional): The search engine: 'minsearch' for TF-IDF cosine
+                                        similarity or 'bm25' for the inverted-index
+                                        BM25Index. Defaults to 'minsearch'.
+        deduplicate (bool, optional): Drop near-duplicate documents (or chunks) before
+                                        indexing. The `DeduplicationStats` are attached
+                                        to the index as `deduplication_stats`.
+                                        Defaults to False.
+        deduplication_params (dict, optional): Parameters for `deduplicate_documents`,
+                                        e.g. {'threshold': 0.8}. Only used when
+                                        deduplicate=True.
+        keep_snapshots (int, optional): After saving a new snapshot, remove all but
+                                        this many most recently used snapshots in
+                                        snapshot_dir. None keeps all of them.
+                                        Defaults to 3.
+
+    Chunks are stored as offsets into the original documents (see
+    `common.chunking.chunk_offsets`); search results are still plain dicts,
+    created for the returned chunks only (see `common.chunking.ChunkDicts`).
 
     Returns:
-        Index: A fitted minsearch Index object ready for searching.
+        A fitted minsearch Index (or BM25Index) ready for searching.
 
     Example:
         >>> docs = [{'content': 'Hello world', 'filename': 'doc1.txt'}]
         >>> index = index_documents(docs)
         >>> results = index.search('hello')
     """
+    if engine not in SEARCH_ENGINES:
+        raise ValueError(f"unknown search engine: {engine!r}, expected one of {SEARCH_ENGINES}")
+
+    if chunk and chunking_params is None:
+        chunking_params = {'size': 2000, 'step': 1000}
+
+    snapshot_path = None
+    if snapshot_dir is not None:
+        documents = list(documents)
+        fingerprint = documents_fingerprint(
+            documents,
+            chunk=chunk,
+            chunking_params=chunking_params if chunk else None,
+            text_fields=DEFAULT_TEXT_FIELDS,
+            engine=engine,
+            deduplication_params=(deduplication_params or {}) if deduplicate else None,
+        )
+        snapshot_path = Path(snapshot_dir) / fingerprint
+        if (snapshot_path / "meta.json").exists():
+            # mark it as used, so pruning keeps it
+            os.utime(snapshot_path)
+            return load_index(snapshot_path)
+
     if chunk:
-        if chunking_params is None:
-            chunking_params = {'size': 2000, 'step': 1000}
-        documents = chunk_documents(documents, **chunking_params)
+        documents = chunk_offsets(documents, **chunking_params)
 
-    index = Index(
-        text_fields=["content", "filename"],
-    )
+    stats = None
+    if deduplicate:
+        documents, stats = deduplicate_documents(documents, **(deduplication_params or {}))
+
+    if chunk:
+        documents = documents.as_dicts()
+
+    if engine == 'bm25':
+        index = BM25Index(text_fields=list(DEFAULT_TEXT_FIELDS))
+    else:
+        index = Index(text_fields=list(DEFAULT_TEXT_FIELDS))
 
     index.fit(documents)
+    if stats is not None:
+        index.deduplication_stats = stats
+
+    if snapshot_path is not None:
+        save_index(index, snapshot_path)
+        if keep_snapshots is not None:
+            prune_snapshots(snapshot_dir, keep_snapshots)
+
     return index
@@ -3,8 +3,11 @@ Interactive search utilities for creating question-based search interfaces.
 """
 
 import random
+import threading
+import time
 import traceback
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional
 from abc import ABC, abstractmethod
 
 from rich.console import Console
@@ -118,6 +121,90 @@ def display_results_with_navigation(
             return
 
 
+def _freeze(value: Any) -> Hashable:
+    """Convert dicts and lists into hashable tuples for use in cache keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class QueryCache:
+    """
+    A bounded LRU cache for search results with optional expiration.
+
+    Attributes:
+        max_size (int): Maximum number of cached queries.
+        ttl (float): Time to live of an entry in seconds, or None to never expire.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups not found in the cache.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, filter_dict=None, boost_dict=None, num_results: int = 10) -> Hashable:
+        """
+        Build a cache key from a query and its search parameters.
+
+        The query is normalized (lowercased, whitespace collapsed), since
+        the indexes are case-insensitive and ignore extra whitespace.
+        """
+        normalized = " ".join(query.lower().split())
+        return (normalized, _freeze(filter_dict or {}), _freeze(boost_dict or {}), num_results)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None if it's missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if the cache is full."""
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries. Hit and miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"QueryCache(size={len(self)}, hits={self.hits}, misses={self.misses})"
+
+
 class InteractiveSearch(ABC):
     """Base class for interactive search applications."""
     
@@ -129,6 +216,8 @@ class InteractiveSearch(ABC):
         console: Console = None,
         content_field: str = 'content',
         filename_field: str = 'filename',
+        cache_size: int = 256,
+        cache_ttl: Optional[float] = None,
     ):
         """Initialize the interactive search application.
         
@@ -139,11 +228,15 @@ class InteractiveSearch(ABC):
             console: Rich console for output (optional)
             content_field: The field name in results that contains the main content to display
             filename_field: The field name in results that contains the filename or title
+            cache_size: Maximum number of cached search results
+            cache_ttl: Time to live of cached results in seconds (optional)
         """
         self.app_title = app_title
         self.app_description = app_description
         self.sample_questions = sample_questions
         self.console = console or Console()
+        self.query_cache = QueryCache(max_size=cache_size, ttl=cache_ttl)
+        self._index_version = None
         self.index = None
         self.content_field = content_field
         self.filename_field = filename_field
@@ -153,9 +246,43 @@ class InteractiveSearch(ABC):
         """Load and return the search index/data. Must be implemented by subclasses."""
         pass
 
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Perform search and return results."""
-        return self.index.search(query)
+    @property
+    def index(self) -> Any:
+        """The search index. Setting a new index invalidates cached results."""
+        return self._index
+
+    @index.setter
+    def index(self, index: Any) -> None:
+        self._index = index
+        self._index_version = getattr(index, 'version', None)
+        self.query_cache.clear()
+
+    def search(
+        self,
+        query: str,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        boost_dict: Optional[Dict[str, float]] = None,
+        num_results: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Perform search and return results, using cached results for repeated queries."""
+        # indexes that can be updated in place (e.g. IncrementalIndex) expose a version
+        version = getattr(self._index, 'version', None)
+        if version != self._index_version:
+            self._index_version = version
+            self.query_cache.clear()
+
+        key = QueryCache.make_key(query, filter_dict, boost_dict, num_results)
+        results = self.query_cache.get(key)
+        if results is None:
+            results = self._index.search(
+                query,
+                filter_dict=filter_dict,
+                boost_dict=boost_dict,
+                num_results=num_results,
+            )
+            self.query_cache.set(key, results)
+
+        return list(results)
     
     def display_results(self, results: List[Dict[str, Any]], query: str) -> None:
         """Display search results. Can be overridden by subclasses."""
@@ -1,16 +1,33 @@
-from openai import OpenAI
+from dataclasses import dataclass
+from functools import lru_cache
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    OpenAI,
+    RateLimitError,
+)
 from pathlib import Path
-import inspect
+from typing import Optional
+import asyncio
+import hashlib
+import random
+import sys
+import threading
+import time
+
+
+DEFAULT_MODEL = 'gpt-4o-mini'
 
 
 class OpenAIResponsesWrapper:
     def __init__(self, client: OpenAI):
         self.client = client
 
-    def __call__(self, instructions, content, model='gpt-4o-mini'):
+    def __call__(self, instructions, content, model=DEFAULT_MODEL):
         return self.llm(instructions, content, model=model)
 
-    def llm(self, instructions, content, model='gpt-4o-mini'):
+    def llm(self, instructions, content, model=DEFAULT_MODEL):
         messages = [
             {"role": "system", "content": instructions},
             {"role": "user", "content": content}
@@ -24,18 +41,337 @@ class OpenAIResponsesWrapper:
         return response.output_text
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 characters per token for English text and code."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    An asyncio token bucket that refills at a fixed rate per minute.
+
+    Waiters are served in order, so a large request isn't starved by a
+    stream of small ones.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens, i.e. the largest burst.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        """
+        Args:
+            per_minute (float): Tokens added per minute.
+            capacity (float, optional): Largest burst. Defaults to 10 seconds' worth
+                                        of tokens (at least 1).
+        """
+        self.rate = per_minute / 60
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate * 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Wait until `amount` tokens are available and take them."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """
+        Take (or with a negative amount, return) tokens without waiting.
+
+        Used to correct an estimate once the actual usage is known; the
+        bucket can go into debt, which delays the next acquire.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AsyncOpenAIResponsesWrapper:
+    """
+    An asyncio version of OpenAIResponsesWrapper that stays within rate limits.
+
+    Every request takes one token from a requests-per-minute bucket and its
+    estimated token usage from a tokens-per-minute bucket, and at most
+    `max_concurrency` requests are in flight. Once a response arrives, the
+    estimate is corrected with the actual usage. Rate limit errors (429),
+    server errors (5xx), timeouts and connection errors are retried after
+    the delay the server asks for, or with exponential backoff.
+
+    The client should be created with max_retries=0, so retries are
+    handled here and count against the rate limits.
+
+    Attributes:
+        requests (int): Number of successful requests.
+        rate_limited (int): Number of 429 responses received.
+        failed_attempts (int): Number of server, timeout and connection errors.
+    """
+
+    def __init__(
+            self,
+            client: AsyncOpenAI,
+            requests_per_minute: float = 500,
+            tokens_per_minute: float = 200_000,
+            max_concurrency: int = 16,
+            max_retries: int = 6,
+    ):
+        """
+        Args:
+            client (AsyncOpenAI): The OpenAI client.
+            requests_per_minute (float, optional): Request rate limit. Defaults to 500.
+            tokens_per_minute (float, optional): Token rate limit. Defaults to 200,000.
+            max_concurrency (int, optional): Maximum requests in flight. Defaults to 16.
+            max_retries (int, optional): Retries of a request before giving up. Defaults to 6.
+        """
+        self.client = client
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.requests = 0
+        self.rate_limited = 0
+        self.failed_attempts = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __call__(self, instructions, content, model=DEFAULT_MODEL):
+        return await self.llm(instructions, content, model=model)
+
+    async def llm(self, instructions, content, model=DEFAULT_MODEL):
+        messages = [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": content}
+        ]
+
+        # the output is usually about as long as the content (e.g. documented code)
+        estimate = estimate_tokens(instructions) + 2 * estimate_tokens(content)
+
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire()
+            await self.token_bucket.acquire(estimate)
+
+            async with self._semaphore:
+                try:
+                    response = await self.client.responses.create(
+                        model=model,
+                        input=messages,
+                    )
+                except (RateLimitError, APIStatusError, APIConnectionError) as e:
+                    if not self._retryable(e):
+                        raise
+                    if isinstance(e, RateLimitError):
+                        self.rate_limited += 1
+                    else:
+                        self.failed_attempts += 1
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                else:
+                    self.requests += 1
+                    usage = getattr(response, 'usage', None)
+                    if usage is not None:
+                        self.token_bucket.adjust(usage.total_tokens - estimate)
+                    return response.output_text
+
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        """Rate limits, server errors (any 5xx), timeouts and connection errors."""
+        if isinstance(error, (RateLimitError, APIConnectionError)):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code >= 500
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """The delay the server asked for, or exponential backoff with jitter."""
+        response = getattr(error, 'response', None)
+        headers = response.headers if response is not None else {}
+        try:
+            if 'retry-after-ms' in headers:
+                return float(headers['retry-after-ms']) / 1000
+            if 'retry-after' in headers:
+                return float(headers['retry-after'])
+        except ValueError:
+            pass
+        return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class LLMCache:
+    """
+    A content-addressed cache for LLM results.
+
+    The key is a hash of the model, the instructions and the input content,
+    so it doesn't depend on where the input came from: a file that moves
+    keeps its cached result, an edited file (or an edited prompt) gets a new
+    one, and identical files in different repositories share one entry.
+
+    Attributes:
+        store: Any key-value store with `get` and `set`, e.g. PetCache or SQLiteCache.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to call the LLM.
+    """
+
+    KEY_PREFIX = 'llm:v2:'
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def make_key(cls, model: str, instructions: str, content: str) -> str:
+        """
+        The cache key for an LLM call.
+
+        `instructions` can be the prompt text or, cheaper for long prompts,
+        its hash (Prompt.sha256).
+        """
+        digest = hashlib.sha256()
+        for part in (model, instructions, content):
+            data = part.encode('utf-8')
+            # length-prefixed, so the parts can't run into each other
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return cls.KEY_PREFIX + digest.hexdigest()
+
+    def get(self, key: str, *fallback_keys: str) -> Optional[str]:
+        """
+        The cached result for a key, or for the first fallback key that has one.
+
+        Counts one hit or one miss, however many keys are looked up.
+        """
+        value = self.store.get(key)
+        for fallback_key in fallback_keys:
+            if value is not None:
+                break
+            value = self.store.get(fallback_key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.store.set(key, value)
+
+    def prefetch(self, keys) -> int:
+        """
+        Load many keys at once, if the store supports it (e.g. SQLiteCache).
+
+        Returns:
+            The number of keys found, 0 if the store can't prefetch
+        """
+        prefetch = getattr(self.store, 'prefetch', None)
+        return prefetch(keys) if prefetch is not None else 0
+
+    def contains(self, key: str) -> bool:
+        """Check for a result without counting a hit or a miss."""
+        return self.store.get(key) is not None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate)"
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """
+    A prompt file as it was loaded.
+
+    Attributes:
+        path (Path): The prompt file.
+        text (str): The prompt, stripped.
+        sha256 (str): Hash of the text, changes whenever the prompt changes.
+        mtime_ns (int), size (int): The file's state when it was read.
+    """
+    path: Path
+    text: str
+    sha256: str
+    mtime_ns: int
+    size: int
+
+
+class PromptRegistry:
+    """
+    Loads prompt files once and keeps them in memory.
+
+    A prompt is read again only when its modification time or size changes,
+    so edits to a prompt are picked up by a running process at the cost of
+    one stat call per lookup. With reload=False not even that is done.
+    """
+
+    def __init__(self, reload: bool = True):
+        self.reload = reload
+        self.loads = 0
+        self._prompts: dict[Path, Prompt] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str | Path) -> Prompt:
+        """The prompt in the given file, loaded now if it's new or has changed."""
+        path = Path(path)
+        prompt = self._prompts.get(path)
+        if prompt is not None and not self.reload:
+            return prompt
+
+        stat = path.stat()
+        if prompt is not None and (prompt.mtime_ns, prompt.size) == (stat.st_mtime_ns, stat.st_size):
+            return prompt
+
+        with self._lock:
+            text = path.read_text(encoding='utf-8').strip()
+            prompt = Prompt(
+                path=path,
+                text=text,
+                sha256=hashlib.sha256(text.encode('utf-8')).hexdigest(),
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+            )
+            self._prompts[path] = prompt
+            self.loads += 1
+        return prompt
+
+    def text(self, path: str | Path) -> str:
+        return self.get(path).text
+
+    def sha256(self, path: str | Path) -> str:
+        return self.get(path).sha256
+
+
+# shared by read_prompt and the pipelines
+PROMPTS = PromptRegistry()
+
+
+@lru_cache(maxsize=None)
+def _source_dir(filename: str) -> Path:
+    return Path(filename).resolve().parent
+
+
 def read_prompt(path: str) -> str:
     """
     Read a prompt file located relative to the caller's file.
 
+    Prompts are loaded through PROMPTS, so repeated calls don't touch the
+    file unless it changed.
+
     Args:
         path (str): Relative path to the prompt file.
     """
-    # a bit of magic to get the caller's directory
-    caller_frame = inspect.stack()[1]
-    caller_file = caller_frame.filename
-
-    caller_dir = Path(caller_file).resolve().parent
-    prompt_path = caller_dir / path
+    # the caller's frame, without building the whole stack like inspect.stack()
+    caller_file = sys._getframe(1).f_code.co_filename
+    prompt_path = _source_dir(caller_file) / path
 
-    return prompt_path.read_text(encoding='utf-8').strip()
\ No newline at end of file
+    return PROMPTS.text(prompt_path)
@@ -1,10 +1,29 @@
+import multiprocessing
+
 from tqdm.auto import tqdm
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
 from typing import Callable, Iterable, List, Optional, TypeVar
 
 T = TypeVar('T')
 R = TypeVar('R')
 
+
+def spawn_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    A process pool whose workers are started with spawn instead of fork.
+
+    Forking a process that already runs threads (search threads, a cache
+    writer, an HTTP connection pool) can deadlock the children, so every
+    process pool in this repository uses spawn. Functions sent to the
+    workers have to be defined at module level.
+
+    Args:
+        max_workers (Optional[int]): Number of worker processes, defaults to the number of CPUs.
+    """
+    mp_context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+
+
 class TqdmParallelProgress:
     """
     A helper class for parallel execution with progress tracking using tqdm.
@@ -28,7 +47,9 @@ class TqdmParallelProgress:
         Apply a function to each item in the sequence in parallel, showing a tqdm progress bar.
 
         Args:
-            sequence (Iterable[T]): The sequence of items to process.
+            sequence (Iterable[T]): The sequence of items to process. Iterables without
+                                    a length (e.g. generators) are consumed as they
+                                    are submitted; the progress bar then has no total.
             function (Callable[[T], R]): The function to apply to each item.
 
         Returns:
@@ -36,7 +57,9 @@ class TqdmParallelProgress:
         """
         results: List[R] = []
 
-        with tqdm(total=len(sequence)) as progress:
+        total = len(sequence) if hasattr(sequence, '__len__') else None
+
+        with tqdm(total=total) as progress:
             futures: List[Future] = []
 
             for el in sequence:
@@ -0,0 +1,231 @@
+"""
+Sharded search index with parallel fitting and query fan-out.
+
+A single minsearch Index scores every document for every query in one
+process. ShardedIndex splits the documents across several minsearch
+indexes by a hash of the 'filename' field, fits the shards in parallel in
+a process pool, and sends every query to all shards at once, merging the
+per-shard top results with a heap.
+"""
+
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from minsearch import Index
+
+from common.indexing import rank_many, score_documents, top_k
+from common.parallel import spawn_process_pool
+
+
+def shard_for(value: Any, num_shards: int) -> int:
+    """Get a stable shard number for a value (independent of PYTHONHASHSEED)."""
+    return zlib.crc32(str(value).encode('utf-8')) % num_shards
+
+
+def _fit_shard(text_fields, keyword_fields, vectorizer_params, docs) -> Index:
+    # runs in a worker process, so it has to be a module-level function
+    index = Index(
+        text_fields=text_fields,
+        keyword_fields=keyword_fields,
+        vectorizer_params=vectorizer_params,
+    )
+    index.fit(docs)
+    # the parent has the documents already, don't pickle them back
+    index.docs = []
+    return index
+
+
+class ShardedIndex:
+    """
+    A search index made of several minsearch indexes.
+
+    Presents the same `fit` and `search` interface as the minsearch Index.
+    Note that idf statistics are computed per shard, so scores can differ
+    slightly from a single index over the same documents.
+
+    Attributes:
+        text_fields (list): List of text field names to index.
+        keyword_fields (list): List of keyword field names to index.
+        num_shards (int): Number of shards.
+        shard_field (str): Field used to assign documents to shards.
+        shards (list): Fitted minsearch Index for each shard.
+        docs (list): All indexed documents.
+    """
+
+    def __init__(
+            self,
+            text_fields,
+            keyword_fields=None,
+            num_shards: int = 4,
+            shard_field: str = 'filename',
+            max_workers: int | None = None,
+            vectorizer_params=None,
+    ):
+        """
+        Initialize the sharded index.
+
+        Args:
+            text_fields (list): List of text field names to index.
+            keyword_fields (list, optional): List of keyword field names to index.
+            num_shards (int, optional): Number of shards. Defaults to 4.
+            shard_field (str, optional): Field whose hash selects the shard. Defaults to 'filename'.
+            max_workers (int, optional): Number of processes for fitting and threads for
+                                        searching. Defaults to num_shards.
+            vectorizer_params (dict, optional): Parameters passed to each shard's TfidfVectorizer.
+        """
+        if num_shards <= 0:
+            raise ValueError("num_shards must be positive")
+
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields if keyword_fields is not None else []
+        self.num_shards = num_shards
+        self.shard_field = shard_field
+        self.max_workers = max_workers or num_shards
+        self.vectorizer_params = vectorizer_params
+
+        self.shards: List[Index] = []
+        self.docs = []
+        # shard-local position -> global position, for each shard
+        self._positions: List[List[int]] = []
+        self._pool = None
+
+    def fit(self, docs) -> 'ShardedIndex':
+        """
+        Split the documents into shards and fit the shards in parallel.
+
+        Args:
+            docs (list of dict): List of documents to index.
+        """
+        self.docs = docs
+
+        shard_docs = [[] for _ in range(self.num_shards)]
+        self._positions = [[] for _ in range(self.num_shards)]
+        for i, doc in enumerate(docs):
+            shard = shard_for(doc.get(self.shard_field), self.num_shards)
+            shard_docs[shard].append(doc)
+            self._positions[shard].append(i)
+
+        n = self.num_shards
+        with spawn_process_pool(self.max_workers) as executor:
+            self.shards = list(executor.map(
+                _fit_shard,
+                [self.text_fields] * n,
+                [self.keyword_fields] * n,
+                [self.vectorizer_params] * n,
+                shard_docs,
+            ))
+
+        # the shards come back without their documents, point them at ours
+        for shard, local_docs in zip(self.shards, shard_docs):
+            shard.docs = local_docs
+
+        return self
+
+    def _search_shard(self, shard_id: int, query, filter_dict, boost_dict, num_results) -> List[tuple]:
+        scores = score_documents(
+            self.shards[shard_id],
+            query,
+            filter_dict=filter_dict,
+            boost_dict=boost_dict,
+        )
+        positions = self._positions[shard_id]
+        return [(float(scores[i]), -positions[i]) for i in top_k(scores, num_results)]
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10, output_ids=False):
+        """
+        Searches all shards in parallel and merges the results.
+
+        Args:
+            query (str): The search query string.
+            filter_dict (dict): Dictionary of keyword fields to filter by.
+            boost_dict (dict): Dictionary of boost scores for text fields.
+            num_results (int): The number of top results to return. Defaults to 10.
+            output_ids (bool): If True, adds an '_id' field with the position of each document.
+
+        Returns:
+            list of dict: List of documents matching the search criteria, ranked by relevance.
+        """
+        if not self.shards:
+            return []
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        futures = [
+            self._pool.submit(self._search_shard, shard_id, query, filter_dict, boost_dict, num_results)
+            for shard_id in range(self.num_shards)
+        ]
+        candidates = (hit for future in futures for hit in future.result())
+        return self._merge(candidates, num_results, output_ids)
+
+    def _rank_shard(self, shard_id: int, queries, filter_dict, boost_dict, num_results) -> List[List[tuple]]:
+        positions = self._positions[shard_id]
+        ranked = rank_many(
+            self.shards[shard_id],
+            queries,
+            filter_dict=filter_dict,
+            boost_dict=boost_dict,
+            num_results=num_results,
+        )
+        return [
+            [(float(score), -positions[i]) for i, score in zip(local_positions, scores)]
+            for local_positions, scores in ranked
+        ]
+
+    def search_many(self, queries, filter_dict=None, boost_dict=None, num_results=10, output_ids=False):
+        """
+        Run many queries against all shards with batched scoring and merge the results.
+
+        Args:
+            queries: The search queries.
+            filter_dict (dict): Dictionary of keyword fields to filter by.
+            boost_dict (dict): Dictionary of boost scores for text fields.
+            num_results (int): The number of top results per query. Defaults to 10.
+            output_ids (bool): If True, adds an '_id' field with the position of each document.
+
+        Returns:
+            list: One list of result documents per query.
+        """
+        queries = list(queries)
+        if not self.shards:
+            return [[] for _ in queries]
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        futures = [
+            self._pool.submit(self._rank_shard, shard_id, queries, filter_dict, boost_dict, num_results)
+            for shard_id in range(self.num_shards)
+        ]
+        per_shard = [future.result() for future in futures]
+
+        return [
+            self._merge(
+                (hit for shard_hits in per_shard for hit in shard_hits[q]),
+                num_results,
+                output_ids,
+            )
+            for q in range(len(queries))
+        ]
+
+    def _merge(self, candidates, num_results, output_ids):
+        # ties are broken by position, like a stable sort over a single index
+        best = heapq.nlargest(num_results, candidates)
+        positions = [-neg_position for _, neg_position in best]
+
+        if output_ids:
+            return [{**self.docs[i], '_id': i} for i in positions]
+        return [self.docs[i] for i in positions]
+
+    def shutdown(self) -> None:
+        """Shutdown the thread pool used for searching."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
@@ -0,0 +1,230 @@
+"""
+A SQLite key-value cache for pipeline results, built for many concurrent users.
+
+PetCache opens a connection and commits a transaction for every get and
+set, so parallel workers spend most of their time waiting for the database
+lock. SQLiteCache uses the same table, so existing cache files keep
+working with both, but:
+
+* the database is in WAL mode, readers don't block the writer or each other;
+* sets are queued and a single writer thread commits them in batches;
+* get_many reads many keys with one query, and prefetch keeps the results
+  in memory, so a run whose results are all cached doesn't query the
+  database per file.
+
+Values set in this process are visible to get right away, even before
+they are written.
+"""
+
+import queue
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+
+# keys per query in get_many, below SQLite's limit on query parameters
+GET_MANY_CHUNK_SIZE = 500
+
+# sets committed in one transaction
+DEFAULT_WRITE_BATCH_SIZE = 256
+
+_CLOSE = object()
+
+
+class SQLiteCache:
+    """
+    A thread-safe key-value cache with batched writes, compatible with PetCache.
+
+    Use it as a context manager, or call close() to write the queued sets.
+
+    Attributes:
+        write_transactions (int): Number of transactions committed by the writer.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = DEFAULT_WRITE_BATCH_SIZE):
+        """
+        Initialize the cache and start the writer thread.
+
+        Args:
+            db_path: Path to the SQLite database file
+            batch_size: Maximum number of sets committed in one transaction
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+
+        self._memory: dict[str, str] = {}
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Exception | None = None
+        self._closed = False
+        self.write_transactions = 0
+
+        self._init_db()
+
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-cache-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self) -> None:
+        """Create the PetCache schema if it doesn't exist and switch to WAL mode."""
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS update_timestamp
+                AFTER UPDATE ON cache
+                FOR EACH ROW
+                BEGIN
+                    UPDATE cache SET updated_at = CURRENT_TIMESTAMP
+                    WHERE key = NEW.key;
+                END
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        """A connection for the current thread, reused across reads."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a value, from memory if it was set or prefetched, otherwise from the database."""
+        with self._memory_lock:
+            value = self._memory.get(key)
+        if value is not None:
+            return value
+
+        row = self._reader().execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """
+        Get the values of many keys with as few queries as possible.
+
+        Returns:
+            key -> value for the keys that are in the cache
+        """
+        found = {}
+        missing = []
+        with self._memory_lock:
+            for key in dict.fromkeys(keys):
+                value = self._memory.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    found[key] = value
+
+        conn = self._reader()
+        for i in range(0, len(missing), GET_MANY_CHUNK_SIZE):
+            chunk = missing[i:i + GET_MANY_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, value FROM cache WHERE key IN ({placeholders})", chunk)
+            found.update(rows)
+
+        return found
+
+    def prefetch(self, keys: Iterable[str]) -> int:
+        """
+        Load the values of the given keys into memory, so later gets don't query.
+
+        Returns:
+            The number of keys found
+        """
+        found = self.get_many(keys)
+        with self._memory_lock:
+            self._memory.update(found)
+        return len(found)
+
+    def set(self, key: str, value: str) -> None:
+        """Set a value; it's visible to get at once and written by the writer thread."""
+        if self._closed:
+            raise RuntimeError(f"{self!r} is closed")
+        self._check()
+        with self._memory_lock:
+            self._memory[key] = value
+        self._queue.put((key, value))
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._reader().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def flush(self) -> None:
+        """Wait until all queued sets are written."""
+        self._queue.join()
+        self._check()
+
+    def close(self) -> None:
+        """Write the queued sets and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._writer.join()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        self._check()
+
+    def __enter__(self) -> "SQLiteCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"SQLiteCache(db_path='{self.db_path}')"
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"writing to {self.db_path} failed") from self._error
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                rows = [entry for entry in batch if entry is not _CLOSE]
+                try:
+                    if rows:
+                        with conn:
+                            conn.executemany("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", rows)
+                        self.write_transactions += 1
+                except sqlite3.Error as e:
+                    self._error = e
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+                if any(entry is _CLOSE for entry in batch):
+                    return
+        finally:
+            conn.close()
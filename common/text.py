@@ -0,0 +1,16 @@
+"""
+Text tokenization shared by the search indexes and deduplication.
+"""
+
+import re
+from typing import List
+
+
+TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize text the same way minsearch's TfidfVectorizer does."""
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
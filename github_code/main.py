@@ -1,27 +1,68 @@
 
-from typing import List, Dict, Any
+import asyncio
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, List, Dict, Any
 
 import frontmatter
-import nbformat
-from nbconvert import MarkdownExporter
-from nbconvert.preprocessors import ClearOutputPreprocessor
 
-
-from openai import OpenAI
-from petcache import PetCache
+from openai import AsyncOpenAI, OpenAI
 
 from rich.console import Console
 
-from common.llm import OpenAIResponsesWrapper, read_prompt
+from common.batch import BatchRequest, LLMBatchRunner
+from common.llm import (
+    DEFAULT_MODEL,
+    AsyncOpenAIResponsesWrapper,
+    PROMPTS,
+    LLMCache,
+    OpenAIResponsesWrapper,
+    Prompt,
+    PromptRegistry,
+    estimate_tokens,
+)
 from common.indexing import index_documents
+from common.sqlite_cache import SQLiteCache
 from common.interactive import InteractiveSearch
-from common.parallel import TqdmParallelProgress
+from tqdm.auto import tqdm
 
+from github_code.notebook import convert_notebooks, notebook_to_markdown
+from github_code.planning import TokenPlan, plan_code_files
+from github_code.packing import PACK_FILE_MAX_TOKENS, pack_sections, plan_packs, unpack_sections
 from github_docs.github import GithubRepositoryDataReader, RawRepositoryFile
 
 
 CONSOLE = Console()
 
+PROMPT_DIR = Path(__file__).resolve().parent
+
+# fitted indexes are cached here, keyed by a fingerprint of the documents;
+# a directory per pipeline, old snapshots are pruned
+INDEX_SNAPSHOT_DIR = ".index_snapshots/github_code"
+
+# LLM results, keyed by a hash of the input, prompt and model
+LLM_CACHE_PATH = "llm_cache.sqlite"
+
+# set LLM_BATCH=1 to process files with the Batch API: half the price, but
+# results can take hours; an interrupted run resumes the submitted batches
+USE_BATCH_API = os.environ.get("LLM_BATCH") == "1"
+LLM_BATCH_STATE_PATH = "llm_batches.json"
+
+# set LLM_DRY_RUN=1 to print the token plan and cost estimate without calling the LLM
+DRY_RUN = os.environ.get("LLM_DRY_RUN") == "1"
+
+# per-run budget for uncached code file requests; files that don't fit are indexed verbatim
+LLM_MAX_TOKENS_PER_RUN = 5_000_000
+LLM_MAX_COST_PER_RUN = 2.00
+
+# rate limits of the OpenAI account (tier 1 limits for gpt-4o-mini)
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 200_000
+LLM_MAX_CONCURRENCY = 16
+
+# downloaded repository archives, revalidated with ETags on every run
+ARCHIVE_CACHE_DIR = ".archive_cache"
+
 
 def strip_code_fence(text: str) -> str:
     """Remove markdown code fence markers from text."""
@@ -39,36 +80,61 @@ def strip_code_fence(text: str) -> str:
     return "\n".join(lines)
 
 
-class NotebookMarkdownFormatter:
-    """Converts Jupyter notebook content to markdown format."""
+class LLMCodeProcessor:
+    """
+    Turns notebooks and code into documentation with an LLM.
+
+    `llm` is either an OpenAIResponsesWrapper, used with process_notebooks
+    and process_code, or an AsyncOpenAIResponsesWrapper, used with
+    aprocess_notebooks and aprocess_code.
+    """
+
+    def __init__(
+            self,
+            llm: OpenAIResponsesWrapper | AsyncOpenAIResponsesWrapper,
+            model: str = DEFAULT_MODEL,
+            prompts: PromptRegistry = PROMPTS,
+    ):
+        self.llm = llm
+        self.model = model
+        self.prompts = prompts
+        self.packed_requests = 0
+        self.pack_fallbacks = 0
+        # cache key -> the request computing it, shared by concurrent callers
+        self._in_flight: dict[str, asyncio.Future] = {}
 
-    def __init__(self):
-        self.exporter = MarkdownExporter()
-        self.exporter.register_preprocessor(ClearOutputPreprocessor(), enabled=True)
+    # prompts are looked up on every use, so edited prompt files are picked up
 
-    def format(self, raw_notebook: str) -> str:
-        nb_parsed = nbformat.reads(
-            raw_notebook,
-            as_version=nbformat.NO_CONVERT,
-        )
-        md_body, _ = self.exporter.from_notebook_node(nb_parsed)
-        return md_body
+    @property
+    def notebook_prompt(self) -> Prompt:
+        return self.prompts.get(PROMPT_DIR / "_notebook_edit.md")
 
+    @property
+    def code_prompt(self) -> Prompt:
+        return self.prompts.get(PROMPT_DIR / "_code_doc.md")
 
-class LLMCodeProcessor:
+    @property
+    def packed_code_prompt(self) -> Prompt:
+        return self.prompts.get(PROMPT_DIR / "_code_doc_packed.md")
 
-    def __init__(self, llm: OpenAIResponsesWrapper):
-        self.llm = llm
+    @property
+    def notebook_instructions(self) -> str:
+        return self.notebook_prompt.text
+
+    @property
+    def code_instructions(self) -> str:
+        return self.code_prompt.text
+
+    @property
+    def packed_code_instructions(self) -> str:
+        return self.code_instructions + "\n\n" + self.packed_code_prompt.text
 
     def process_notebooks(self, raw_content: str) -> str:
         """Process a Jupyter notebook using LLM."""
 
-        instructions = read_prompt("_notebook_edit.md")
+        md_body = notebook_to_markdown(raw_content)
 
-        ipynb_formatter = NotebookMarkdownFormatter()
-        md_body = ipynb_formatter.format(raw_content)
-
-        new_content = self.llm(instructions, md_body)
+        new_content = self.llm(self.notebook_instructions, md_body, model=self.model)
         new_content = strip_code_fence(new_content)
 
         return new_content
@@ -76,13 +142,164 @@ class LLMCodeProcessor:
     def process_code(self, code: str) -> str:
         """Process code using LLM."""
 
-        instructions = read_prompt("_code_doc.md")
-
-        new_content = self.llm(instructions, code)
+        new_content = self.llm(self.code_instructions, code, model=self.model)
         new_content = strip_code_fence(new_content)
 
         return new_content
 
+    async def aprocess_notebooks(self, raw_content: str) -> str:
+        """Process a Jupyter notebook using an async LLM."""
+
+        md_body = notebook_to_markdown(raw_content)
+
+        new_content = await self.llm(self.notebook_instructions, md_body, model=self.model)
+        return strip_code_fence(new_content)
+
+    async def aprocess_code(self, code: str) -> str:
+        """Process code using an async LLM."""
+
+        new_content = await self.llm(self.code_instructions, code, model=self.model)
+        return strip_code_fence(new_content)
+
+    async def aprocess_code_packed(self, sections: list[tuple[str, str]]) -> list[str]:
+        """
+        Process several small code files with one LLM request.
+
+        Falls back to one request per file if the answer can't be split
+        into exactly one result per file.
+
+        Args:
+            sections: (filename, code) pairs
+
+        Returns:
+            The result for every file, in order
+        """
+        self.packed_requests += 1
+        content = pack_sections(sections)
+        new_content = await self.llm(self.packed_code_instructions, content, model=self.model)
+
+        try:
+            results = unpack_sections(strip_code_fence(new_content), len(sections))
+        except ValueError:
+            self.pack_fallbacks += 1
+            return list(await asyncio.gather(*(self.aprocess_code(code) for _, code in sections)))
+
+        return [strip_code_fence(result) for result in results]
+
+    def start_once(self, key: str, compute: Callable[[], Awaitable[str]]) -> asyncio.Future:
+        """
+        Start compute() for a cache key, unless a request for the key is already in flight.
+
+        All files are scheduled at once, so copies of the same content miss
+        the cache together; only the first one calls the LLM and the others
+        wait for its result.
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return future
+
+    async def once(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Await compute() for a cache key, or the request already in flight for it."""
+        # shielded, so a cancelled caller doesn't cancel the others' request
+        return await asyncio.shield(self.start_once(key, compute))
+
+    def cache_keys(self, files: Iterable[RawRepositoryFile]) -> list[str]:
+        """The cache keys of the results for notebooks and code files, single and packed."""
+        keys = []
+        for f in files:
+            ext = f.filename.split(".")[-1].lower()
+            if ext in NOTEBOOK_EXTENSIONS:
+                keys.append(self.notebook_cache_key(f.content))
+            elif ext in CODE_EXTENSIONS:
+                keys.append(self.code_cache_key(f.content))
+                keys.append(self.packed_code_cache_key(f.content))
+        return keys
+
+    def cached_code(self, cache: LLMCache, code: str) -> str | None:
+        """The cached result for code, from a single or a packed request."""
+        return cache.get(self.code_cache_key(code), self.packed_code_cache_key(code))
+
+    def is_code_cached(self, cache: LLMCache, code: str) -> bool:
+        return cache.contains(self.code_cache_key(code)) or cache.contains(self.packed_code_cache_key(code))
+
+    def plan(
+            self,
+            files: Iterable[RawRepositoryFile],
+            cache: LLMCache,
+            max_tokens: int | None = None,
+            max_cost: float | None = None,
+    ) -> TokenPlan:
+        """Plan the LLM requests for the code files, see github_code.planning."""
+        code_files = [
+            (f.filename, f.content) for f in files
+            if f.filename.split(".")[-1].lower() in CODE_EXTENSIONS
+        ]
+        return plan_code_files(
+            code_files,
+            self.code_instructions,
+            model=self.model,
+            is_cached=lambda section: self.is_code_cached(cache, section),
+            max_tokens=max_tokens,
+            max_cost=max_cost,
+        )
+
+    def batch_requests(
+            self,
+            f: RawRepositoryFile,
+            markdown: str | None = None,
+            plan: TokenPlan | None = None,
+    ) -> list[BatchRequest]:
+        """
+        The Batch API requests for a notebook or code file, none for other files.
+
+        The keys are the same ones aprocess_file uses, so batch results are
+        cache hits for the online code path. For notebooks, `markdown` can
+        be the already converted notebook. With a plan, a code file gets
+        one request per section, and none if the plan indexes it verbatim.
+        """
+        ext = f.filename.split(".")[-1].lower()
+
+        if ext in NOTEBOOK_EXTENSIONS:
+            md_body = markdown if markdown is not None else notebook_to_markdown(f.content)
+            return [BatchRequest(
+                key=self.notebook_cache_key(f.content),
+                instructions=self.notebook_instructions,
+                content=md_body,
+                model=self.model,
+            )]
+
+        if ext in CODE_EXTENSIONS:
+            file_plan = plan.files.get(f.filename) if plan is not None else None
+            if file_plan is not None and not file_plan.needs_llm:
+                return []
+
+            sections = file_plan.sections if file_plan is not None else [f.content]
+            return [
+                BatchRequest(
+                    key=self.code_cache_key(section),
+                    instructions=self.code_instructions,
+                    content=section,
+                    model=self.model,
+                )
+                for section in sections
+            ]
+
+        return []
+
+    def notebook_cache_key(self, raw_content: str) -> str:
+        return LLMCache.make_key(self.model, self.notebook_prompt.sha256, raw_content)
+
+    def code_cache_key(self, code: str) -> str:
+        return LLMCache.make_key(self.model, self.code_prompt.sha256, code)
+
+    def packed_code_cache_key(self, code: str) -> str:
+        """The key of a result from a packed request, which also depends on the packing prompt."""
+        prompt_hash = self.code_prompt.sha256 + self.packed_code_prompt.sha256
+        return LLMCache.make_key(self.model, prompt_hash, code)
+
 
 DOCUMENT_EXTENSIONS = {"md", "mdx"}
 NOTEBOOK_EXTENSIONS = {"ipynb"}
@@ -100,22 +317,26 @@ def read_github_data() -> List[RawRepositoryFile]:
     reader = GithubRepositoryDataReader(
         repo_owner,
         repo_name,
-        allowed_extensions=allowed_extensions
+        allowed_extensions=allowed_extensions,
+        cache_dir=ARCHIVE_CACHE_DIR,
     )
 
+    # not streamed: the token plan, its budget and the cache prefetch need
+    # every file up front, so the whole repository is read into memory
     return reader.read()
 
 
-def process_file(code_processor, cache: PetCache, f):
+def process_file(code_processor, cache: LLMCache, f):
     ext = f.filename.split(".")[-1].lower()
 
+    # LLM results are cached by content, model and prompt, not by filename
     if ext in NOTEBOOK_EXTENSIONS:
-        if f.filename in cache:
-            content = cache.get(f.filename)
-        else:
+        key = code_processor.notebook_cache_key(f.content)
+        content = cache.get(key)
+        if content is None:
             CONSOLE.print(f"Processing notebook file: {f.filename}")
             content = code_processor.process_notebooks(f.content)
-            cache.set(f.filename, content)
+            cache.set(key, content)
 
         return {
             'content': content,
@@ -123,12 +344,12 @@ def process_file(code_processor, cache: PetCache, f):
         }
 
     if ext in CODE_EXTENSIONS:
-        if f.filename in cache:
-            content = cache.get(f.filename)
-        else:
+        key = code_processor.code_cache_key(f.content)
+        content = cache.get(key)
+        if content is None:
             CONSOLE.print(f"Processing code file: {f.filename}") 
             content = code_processor.process_code(f.content)
-            cache.set(f.filename, content)
+            cache.set(key, content)
 
         return {
             'content': content,
@@ -143,24 +364,201 @@ def process_file(code_processor, cache: PetCache, f):
     return None
 
 
+async def aprocess_code_section(code_processor: LLMCodeProcessor, cache: LLMCache, filename: str, code: str) -> str:
+    content = code_processor.cached_code(cache, code)
+    if content is not None:
+        return content
+
+    key = code_processor.code_cache_key(code)
+
+    async def compute() -> str:
+        CONSOLE.print(f"Processing code file: {filename}")
+        content = await code_processor.aprocess_code(code)
+        cache.set(key, content)
+        return content
+
+    return await code_processor.once(key, compute)
+
+
+async def aprocess_file(code_processor: LLMCodeProcessor, cache: LLMCache, f, plan: TokenPlan | None = None):
+    """
+    The async version of process_file, for an LLMCodeProcessor with an async LLM.
 
-def process_data(data_raw: List[RawRepositoryFile]) -> List[Dict[str, Any]]:
+    With a plan, code files are indexed verbatim or documented section by
+    section as the plan says.
+    """
+    ext = f.filename.split(".")[-1].lower()
+
+    if ext in NOTEBOOK_EXTENSIONS:
+        key = code_processor.notebook_cache_key(f.content)
+        content = cache.get(key)
+        if content is None:
+            async def compute() -> str:
+                CONSOLE.print(f"Processing notebook file: {f.filename}")
+                content = await code_processor.aprocess_notebooks(f.content)
+                cache.set(key, content)
+                return content
+
+            content = await code_processor.once(key, compute)
+
+        return {
+            'content': content,
+            'filename': f.filename
+        }
+
+    if ext in CODE_EXTENSIONS:
+        file_plan = plan.files.get(f.filename) if plan is not None else None
+        if file_plan is not None and not file_plan.needs_llm:
+            return {
+                'content': f.content,
+                'filename': f.filename
+            }
+
+        sections = file_plan.sections if file_plan is not None else [f.content]
+        results = await asyncio.gather(*(
+            aprocess_code_section(code_processor, cache, f.filename, section)
+            for section in sections
+        ))
+
+        return {
+            'content': "\n\n".join(results),
+            'filename': f.filename
+        }
+
+    # no LLM call needed
+    return process_file(code_processor, cache, f)
+
+
+async def aprocess_small_code_files(
+        files: list[RawRepositoryFile],
+        code_processor: LLMCodeProcessor,
+        cache: LLMCache,
+        plan: TokenPlan | None = None,
+) -> None:
+    """
+    Process small uncached code files in packed requests and cache the results.
+
+    The results are stored under packed_code_cache_key, which aprocess_file
+    looks up when there is no single-file result. While a pack is in flight,
+    aprocess_file waits for it instead of requesting a packed file again.
+    With a plan, only files the plan sends to the LLM in one piece are packed.
+    """
+    small = {}
+    for f in files:
+        ext = f.filename.split(".")[-1].lower()
+        if ext not in CODE_EXTENSIONS or estimate_tokens(f.content) > PACK_FILE_MAX_TOKENS:
+            continue
+        file_plan = plan.files.get(f.filename) if plan is not None else None
+        if file_plan is not None and not (file_plan.needs_llm and len(file_plan.sections) == 1):
+            continue
+        key = code_processor.packed_code_cache_key(f.content)
+        if key not in small and not code_processor.is_code_cached(cache, f.content):
+            small[key] = f
+
+    packs = plan_packs((key, f.content) for key, f in small.items())
+    if not packs:
+        return
+
+    CONSOLE.print(f"Processing {len(small)} small code files in {len(packs)} requests")
+
+    async def process(keys: list[str]) -> list[str]:
+        sections = [(small[key].filename, small[key].content) for key in keys]
+        results = await code_processor.aprocess_code_packed(sections)
+        for key, content in zip(keys, results):
+            cache.set(key, content)
+        return results
+
+    async def result(pack: asyncio.Future, i: int) -> str:
+        return (await pack)[i]
+
+    requests = []
+    for keys in packs:
+        pack = asyncio.ensure_future(process(keys))
+        requests.append(pack)
+        # registered under the single-file keys that aprocess_file coalesces on
+        for i, key in enumerate(keys):
+            code_key = code_processor.code_cache_key(small[key].content)
+            code_processor.start_once(code_key, lambda pack=pack, i=i: result(pack, i))
+
+    await asyncio.gather(*requests)
+
+
+async def aprocess_data(
+        data_raw: Iterable[RawRepositoryFile],
+        code_processor: LLMCodeProcessor,
+        cache: LLMCache,
+        pack_small_files: bool = True,
+        plan: TokenPlan | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Process all files concurrently.
+
+    The number of requests in flight and their rate are limited by the
+    processor's AsyncOpenAIResponsesWrapper, so every file can be
+    scheduled at once. Small code files are first processed a few at a
+    time in packed requests, unless `pack_small_files` is False. Code
+    files are handled according to the token plan, if there is one.
+    """
+    files = list(data_raw)
+
+    if pack_small_files:
+        await aprocess_small_code_files(files, code_processor, cache, plan=plan)
+
+    with tqdm(total=len(files)) as progress:
+        async def process(f: RawRepositoryFile):
+            result = await aprocess_file(code_processor, cache, f, plan=plan)
+            progress.update()
+            return result
+
+        return await asyncio.gather(*(process(f) for f in files))
+
+
+def process_data(data_raw: Iterable[RawRepositoryFile]) -> List[Dict[str, Any]]:
+    """
+    Process all files with the async LLM client.
+
+    The files are materialized first: the cache is prefetched and the
+    token plan is made for the whole run before the first request.
+    """
     CONSOLE.print("📄 [bold blue]Parsing documents...[/bold blue]")
 
-    openai_client = OpenAI()
-    llm = OpenAIResponsesWrapper(openai_client)
+    # retries are done by the wrapper, so they count against the rate limits
+    openai_client = AsyncOpenAI(max_retries=0)
+    llm = AsyncOpenAIResponsesWrapper(
+        openai_client,
+        requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+    )
     code_processor = LLMCodeProcessor(llm)
 
-    cache = PetCache("llm_cache.sqlite")
+    files = list(data_raw)
+
+    # shared by all repositories: identical files are processed once;
+    # the results of the whole run are loaded with a few queries up front
+    with SQLiteCache(LLM_CACHE_PATH) as store:
+        cache = LLMCache(store)
+        cache.prefetch(code_processor.cache_keys(files))
+
+        plan = code_processor.plan(
+            files,
+            cache,
+            max_tokens=LLM_MAX_TOKENS_PER_RUN,
+            max_cost=LLM_MAX_COST_PER_RUN,
+        )
+        CONSOLE.print(plan.report())
 
-    def process(record: RawRepositoryFile):
-        return process_file(code_processor, cache, record)
+        processed_records = asyncio.run(aprocess_data(files, code_processor, cache, plan=plan))
 
-    # this code runs "process_file" in a loop -
-    # but it uses thread pool executor, so it's 6x faster
-    mapper = TqdmParallelProgress()
-    processed_records = mapper.map_progress(data_raw, process)
-    mapper.shutdown()
+    CONSOLE.print(f"LLM cache: {cache}")
+    CONSOLE.print(
+        f"LLM requests: {llm.requests}, rate limited: {llm.rate_limited}, "
+        f"retried errors: {llm.failed_attempts}"
+    )
+    CONSOLE.print(
+        f"Packed requests: {code_processor.packed_requests}, "
+        f"fell back to single files: {code_processor.pack_fallbacks}"
+    )
 
     # removing None values
     processed_records = [item for item in processed_records if item]
@@ -168,21 +566,97 @@ def process_data(data_raw: List[RawRepositoryFile]) -> List[Dict[str, Any]]:
     return processed_records
 
 
+def process_data_batch(data_raw: Iterable[RawRepositoryFile]) -> List[Dict[str, Any]]:
+    """
+    Process the files with the Batch API, then assemble the documents.
+
+    All results the batches produce end up in the LLM cache, so the online
+    pass afterwards only calls the LLM for requests that failed in the batch.
+    """
+    CONSOLE.print("📦 [bold blue]Processing files with the Batch API...[/bold blue]")
+
+    files = list(data_raw)
+
+    openai_client = OpenAI()
+    code_processor = LLMCodeProcessor(OpenAIResponsesWrapper(openai_client))
+
+    # all notebooks at once, in worker processes if there are many
+    notebooks = list({f.content for f in files if f.filename.split(".")[-1].lower() in NOTEBOOK_EXTENSIONS})
+    markdown = dict(zip(notebooks, convert_notebooks(notebooks)))
+
+    with SQLiteCache(LLM_CACHE_PATH) as store:
+        cache = LLMCache(store)
+        cache.prefetch(code_processor.cache_keys(files))
+
+        # the same plan as the online pass: tiny and over budget files are
+        # not submitted, large ones are submitted section by section
+        plan = code_processor.plan(
+            files,
+            cache,
+            max_tokens=LLM_MAX_TOKENS_PER_RUN,
+            max_cost=LLM_MAX_COST_PER_RUN,
+        )
+        CONSOLE.print(plan.report())
+
+        runner = LLMBatchRunner(
+            openai_client,
+            cache,
+            LLM_BATCH_STATE_PATH,
+            postprocess=strip_code_fence,
+        )
+        result = runner.run(
+            request
+            for f in files
+            for request in code_processor.batch_requests(f, markdown.get(f.content), plan=plan)
+        )
+
+    CONSOLE.print(f"Batch API: {result}")
+
+    return process_data(files)
+
+
+def plan_de_zoomcamp_data() -> TokenPlan:
+    """Download the repository and report the token plan, without calling the LLM."""
+    files = read_github_data()
+
+    code_processor = LLMCodeProcessor(llm=None)
+
+    with SQLiteCache(LLM_CACHE_PATH) as store:
+        cache = LLMCache(store)
+        cache.prefetch(code_processor.cache_keys(files))
+
+        plan = code_processor.plan(
+            files,
+            cache,
+            max_tokens=LLM_MAX_TOKENS_PER_RUN,
+            max_cost=LLM_MAX_COST_PER_RUN,
+        )
+    CONSOLE.print("🧮 [bold blue]Dry run, no LLM calls[/bold blue]")
+    CONSOLE.print(plan.report())
+    return plan
+
+
 def index_de_zoomcamp_data() -> None:
     # Download and read repository data
     CONSOLE.print("Downloading repository data...")
 
     raw_data = read_github_data()
-    CONSOLE.print(f"Downloaded {len(raw_data)} files")
 
     # Process and parse the data
-    data = process_data(raw_data)
+    if USE_BATCH_API:
+        data = process_data_batch(raw_data)
+    else:
+        data = process_data(raw_data)
+    CONSOLE.print(f"Processed {len(data)} documents")
 
     index = index_documents(
         data,
         chunk=True,
-        chunking_params={"size": 2000, "step": 1000}
+        chunking_params={"size": 2000, "step": 1000},
+        snapshot_dir=INDEX_SNAPSHOT_DIR,
+        deduplicate=True,
     )
+    CONSOLE.print(f"🧹 Deduplication: {index.deduplication_stats}")
 
     return index
 
@@ -200,6 +674,10 @@ class GitHubDEZoomcampSearch(InteractiveSearch):
 def main():
     """Main interactive DE Zoomcamp search application."""
 
+    if DRY_RUN:
+        plan_de_zoomcamp_data()
+        return
+
     app = GitHubDEZoomcampSearch(
         console=CONSOLE,
         app_title="DataTalks Club DE Zoomcamp Search",
@@ -0,0 +1,138 @@
+"""
+Converting Jupyter notebooks to markdown.
+
+nbconvert renders a notebook through nbformat validation, a preprocessor
+pipeline and Jinja templates, which is slow for hundreds of notebooks and
+holds the GIL the whole time. We only need the sources of the cells with
+the outputs stripped, so notebook_to_markdown walks the notebook JSON
+directly and produces the same text as nbconvert's MarkdownExporter with
+ClearOutputPreprocessor.
+
+Notebooks older than format version 4 are rare; they are handed to
+nbconvert, which is only imported when needed.
+"""
+
+import json
+import os
+import re
+
+from common.parallel import spawn_process_pool
+
+
+# raw cells with these mimetypes are included by nbconvert's markdown exporter
+MARKDOWN_RAW_MIMETYPES = {"", "text/markdown", "text/html"}
+
+# cell magics that nbconvert's HighlightMagicsPreprocessor turns into a fence language
+MAGIC_LANGUAGES = {
+    "%%R": "r",
+    "%%bash": "bash",
+    "%%cython": "cython",
+    "%%javascript": "javascript",
+    "%%julia": "julia",
+    "%%latex": "latex",
+    "%%octave": "octave",
+    "%%perl": "perl",
+    "%%ruby": "ruby",
+    "%%sh": "sh",
+    "%%sql": "sql",
+}
+MAGIC_LANGUAGE_RE = re.compile(rf"^\s*({'|'.join(MAGIC_LANGUAGES)})\s+")
+
+# a conversion takes well under a millisecond, about as long as sending the
+# notebook to a worker process; only large batches on several CPUs gain
+PARALLEL_CONVERT_MIN_NOTEBOOKS = 256
+
+
+def _source(cell: dict) -> str:
+    source = cell.get("source", "")
+    return "".join(source) if isinstance(source, list) else source
+
+
+def _replace_attachments(cell: dict, source: str) -> str:
+    """Point `attachment:` links at the file names, as nbconvert's ExtractAttachmentsPreprocessor does."""
+    for name in cell.get("attachments", {}):
+        filename = os.path.basename(name)
+        if filename:
+            source = source.replace("attachment:" + name, filename)
+    return source
+
+
+def notebook_to_markdown(raw_notebook: str) -> str:
+    """
+    Convert a notebook to markdown: markdown cells as they are, code cells
+    as fenced code blocks, no outputs.
+
+    Args:
+        raw_notebook: The notebook JSON
+
+    Returns:
+        The same markdown nbconvert produces with cleared outputs
+    """
+    nb = json.loads(raw_notebook)
+    if nb.get("nbformat", 0) < 4:
+        return nbconvert_to_markdown(raw_notebook)
+
+    language = nb.get("metadata", {}).get("language_info", {}).get("name", "")
+
+    parts = []
+    for cell in nb.get("cells", []):
+        metadata = cell.get("metadata", {})
+        if metadata.get("transient", {}).get("remove_source", False):
+            continue
+
+        cell_type = cell.get("cell_type")
+        if cell_type == "markdown":
+            parts.append(f"\n{_replace_attachments(cell, _source(cell))}\n")
+        elif cell_type == "code":
+            source = _source(cell)
+            magic = MAGIC_LANGUAGE_RE.match(source)
+            if magic is not None:
+                fence_language = MAGIC_LANGUAGES[magic.group(1)]
+            else:
+                fence_language = metadata.get("magics_language", language)
+            parts.append(f"\n\n```{fence_language}\n{source}\n```\n")
+        elif cell_type == "raw":
+            if metadata.get("raw_mimetype", "").lower() in MARKDOWN_RAW_MIMETYPES:
+                parts.append(_replace_attachments(cell, _source(cell)))
+
+    return "".join(parts).lstrip("\n")
+
+
+def nbconvert_to_markdown(raw_notebook: str) -> str:
+    """Convert a notebook to markdown with nbconvert, with the outputs cleared."""
+    import nbformat
+    from nbconvert import MarkdownExporter
+    from nbconvert.preprocessors import ClearOutputPreprocessor
+
+    exporter = MarkdownExporter()
+    exporter.register_preprocessor(ClearOutputPreprocessor(), enabled=True)
+
+    # the exporter expects cells at the top level, as in version 4
+    nb_parsed = nbformat.reads(raw_notebook, as_version=4)
+    md_body, _ = exporter.from_notebook_node(nb_parsed)
+    return md_body
+
+
+def convert_notebooks(
+        raw_notebooks: list[str],
+        max_workers: int | None = None,
+        min_parallel: int = PARALLEL_CONVERT_MIN_NOTEBOOKS,
+) -> list[str]:
+    """
+    Convert many notebooks, in worker processes for large batches.
+
+    Args:
+        raw_notebooks: Notebook JSON documents
+        max_workers: Number of worker processes, defaults to the number of CPUs
+        min_parallel: Smaller batches are converted in this process
+
+    Returns:
+        The markdown of every notebook, in order
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(raw_notebooks) < min_parallel:
+        return [notebook_to_markdown(raw) for raw in raw_notebooks]
+
+    with spawn_process_pool(workers) as executor:
+        chunksize = max(1, len(raw_notebooks) // (workers * 4))
+        return list(executor.map(notebook_to_markdown, raw_notebooks, chunksize=chunksize))
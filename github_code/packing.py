@@ -0,0 +1,101 @@
+"""
+Packing many small source files into a single LLM request.
+
+Most files in a repository are small, and documenting each one separately
+repeats the whole system prompt and pays a full round trip per file. Small
+files are grouped up to a token budget and sent together, each between
+numbered markers; the model answers with one numbered section per file.
+
+The answer is only accepted if it has exactly one non-empty section for
+every file, in order; otherwise the caller falls back to one request per
+file.
+"""
+
+import re
+from typing import Iterable, TypeVar
+
+from common.llm import estimate_tokens
+
+
+T = TypeVar("T")
+
+# files up to this size are packed
+PACK_FILE_MAX_TOKENS = 500
+
+# limits of a single packed request
+PACK_MAX_TOKENS = 4000
+PACK_MAX_FILES = 20
+
+DOC_SECTION_RE = re.compile(
+    r"^<<<DOC (\d+)>>>[ \t]*\n(.*?)^<<<END DOC \1>>>[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+def pack_sections(sections: list[tuple[str, str]]) -> str:
+    """
+    Combine files into the content of one request.
+
+    Args:
+        sections: (filename, code) pairs
+
+    Returns:
+        The files between numbered `<<<FILE n: filename>>>` and `<<<END FILE n>>>` markers
+    """
+    parts = []
+    for i, (filename, code) in enumerate(sections, start=1):
+        parts.append(f"<<<FILE {i}: {filename}>>>\n{code}\n<<<END FILE {i}>>>")
+    return "\n\n".join(parts)
+
+
+def unpack_sections(text: str, count: int) -> list[str]:
+    """
+    Split the answer to a packed request into per-file results.
+
+    Args:
+        text: The LLM output
+        count: The number of files in the request
+
+    Returns:
+        The text of every `<<<DOC n>>>` section, in file order
+
+    Raises:
+        ValueError: If a section is missing, repeated, out of order or empty
+    """
+    matches = DOC_SECTION_RE.findall(text)
+    numbers = [int(number) for number, _ in matches]
+    if numbers != list(range(1, count + 1)):
+        raise ValueError(f"expected sections 1..{count}, got {numbers}")
+
+    results = [body.strip() for _, body in matches]
+    if not all(results):
+        raise ValueError("empty section in packed response")
+    return results
+
+
+def plan_packs(
+        items: Iterable[tuple[T, str]],
+        max_tokens: int = PACK_MAX_TOKENS,
+        max_files: int = PACK_MAX_FILES,
+) -> list[list[T]]:
+    """
+    Group items into packs within the token and file limits, in input order.
+
+    Args:
+        items: (item, code) pairs; the code decides the size of the item
+
+    Returns:
+        Lists of items, one per request
+    """
+    packs = []
+    current, tokens = [], 0
+    for item, code in items:
+        size = estimate_tokens(code)
+        if current and (len(current) >= max_files or tokens + size > max_tokens):
+            packs.append(current)
+            current, tokens = [], 0
+        current.append(item)
+        tokens += size
+    if current:
+        packs.append(current)
+    return packs
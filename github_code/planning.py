@@ -0,0 +1,319 @@
+"""
+Planning which code files are sent to the LLM, and how.
+
+Before any LLM call, every code file is measured in tokens:
+
+* tiny files (an empty `__init__.py`, a one-line query) are indexed as they
+  are, documenting them costs a request and adds nothing;
+* files that are too large for one request (generated SQL, modules with
+  embedded data) are split at function and class boundaries, and every
+  section is documented separately;
+* everything else is one request.
+
+Uncached requests are charged against a per-run token and cost budget;
+files that don't fit are indexed verbatim instead. The plan can be printed
+as a dry-run report without calling the LLM at all.
+
+Tokens are counted with tiktoken if it's installed (the `tokens` extra),
+otherwise estimated from the text length; the report says which.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Iterable
+
+from common.llm import DEFAULT_MODEL, estimate_tokens
+
+
+# files up to this many tokens are indexed without an LLM call
+TINY_FILE_MAX_TOKENS = 40
+
+# larger files are split into sections of at most this many tokens
+MAX_SECTION_TOKENS = 8000
+
+# USD per million (input, output) tokens
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+VERBATIM = "verbatim"
+CACHED = "cached"
+LLM = "llm"
+OVER_BUDGET = "over budget"
+
+PYTHON_BOUNDARY_RE = re.compile(r"^(?:@|def |async def |class )")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def has_tokenizer(model: str = DEFAULT_MODEL) -> bool:
+    """Whether tokens are counted with tiktoken rather than estimated."""
+    return _encoding(model) is not None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Count tokens with tiktoken if it's installed, otherwise estimate them."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _boundaries(lines: list[str], extension: str) -> list[int]:
+    """Indices of the lines where a new section can start."""
+    if extension == "py":
+        # top-level definitions, with their decorators
+        return [
+            i for i, line in enumerate(lines)
+            if PYTHON_BOUNDARY_RE.match(line) and not (i > 0 and lines[i - 1].startswith("@"))
+        ]
+
+    if extension == "sql":
+        # after the end of a statement
+        return [i + 1 for i, line in enumerate(lines) if line.rstrip().endswith(";")]
+
+    # unindented lines after a blank line, e.g. Java classes and methods
+    return [
+        i for i, line in enumerate(lines)
+        if i > 0 and not lines[i - 1].strip() and line[:1] not in ("", " ", "\t")
+    ]
+
+
+def split_code(
+        code: str,
+        extension: str,
+        max_tokens: int = MAX_SECTION_TOKENS,
+        count: Callable[[str], int] = count_tokens,
+) -> list[str]:
+    """
+    Split code into sections of at most `max_tokens`, at definition boundaries.
+
+    Consecutive definitions are kept together as long as they fit. A single
+    definition that is larger than `max_tokens` is split between lines.
+
+    Args:
+        code: The source code
+        extension: The file extension, decides what counts as a boundary
+        max_tokens: The largest section
+        count: Counts the tokens of a piece of code
+
+    Returns:
+        The sections, which together are the whole code
+    """
+    return [section for section, _ in split_code_counted(code, extension, max_tokens, count)]
+
+
+def split_code_counted(
+        code: str,
+        extension: str,
+        max_tokens: int = MAX_SECTION_TOKENS,
+        count: Callable[[str], int] = count_tokens,
+        tokens: int | None = None,
+) -> list[tuple[str, int]]:
+    """
+    split_code, with the size of every section, without counting any text twice.
+
+    Args:
+        tokens: The size of the whole code, if it's already known
+
+    Returns:
+        (section, tokens) pairs; the size of a split section is the sum of
+        the sizes of its lines
+    """
+    if tokens is None:
+        tokens = count(code)
+    if tokens <= max_tokens:
+        return [(code, tokens)]
+
+    lines = code.splitlines(keepends=True)
+    starts = sorted({0, *_boundaries(lines, extension)} - {len(lines)})
+    ends = starts[1:] + [len(lines)]
+
+    # pieces between boundaries, with oversized ones cut between lines
+    pieces = []
+    for start, end in zip(starts, ends):
+        piece, tokens = [], 0
+        for line in lines[start:end]:
+            line_tokens = count(line)
+            if piece and tokens + line_tokens > max_tokens:
+                pieces.append(("".join(piece), tokens))
+                piece, tokens = [], 0
+            piece.append(line)
+            tokens += line_tokens
+        pieces.append(("".join(piece), tokens))
+
+    sections = []
+    current, tokens = [], 0
+    for piece, piece_tokens in pieces:
+        if current and tokens + piece_tokens > max_tokens:
+            sections.append(("".join(current), tokens))
+            current, tokens = [], 0
+        current.append(piece)
+        tokens += piece_tokens
+    sections.append(("".join(current), tokens))
+    return sections
+
+
+@dataclass
+class FilePlan:
+    """
+    What happens to one code file.
+
+    Attributes:
+        filename: The file
+        tokens: Its size in tokens
+        action: VERBATIM, CACHED, LLM or OVER_BUDGET
+        sections: The pieces sent to the LLM, one request each
+        input_tokens, output_tokens: Estimated usage of the uncached requests
+    """
+    filename: str
+    tokens: int
+    action: str
+    sections: list[str] = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def needs_llm(self) -> bool:
+        return self.action in (LLM, CACHED)
+
+
+@dataclass
+class TokenPlan:
+    """The plan for all code files of a run."""
+    model: str
+    files: dict[str, FilePlan] = field(default_factory=dict)
+    max_tokens: int | None = None
+    max_cost: float | None = None
+    # False if the token counts are estimates
+    tokenizer: bool = True
+
+    def count(self, action: str) -> int:
+        return sum(1 for f in self.files.values() if f.action == action)
+
+    @property
+    def requests(self) -> int:
+        return sum(len(f.sections) for f in self.files.values() if f.action == LLM)
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(f.input_tokens for f in self.files.values())
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(f.output_tokens for f in self.files.values())
+
+    @property
+    def cost(self) -> float:
+        return estimate_cost(self.model, self.input_tokens, self.output_tokens)
+
+    def report(self) -> str:
+        """A summary for a dry run."""
+        split = sum(1 for f in self.files.values() if len(f.sections) > 1)
+        lines = [
+            f"Code files: {len(self.files)}",
+            f"  indexed verbatim (tiny): {self.count(VERBATIM)}",
+            f"  cached: {self.count(CACHED)}",
+            f"  sent to the LLM: {self.count(LLM)} ({split} split into sections)",
+            f"  over budget, indexed verbatim: {self.count(OVER_BUDGET)}",
+            f"LLM requests: {self.requests}",
+            f"Estimated tokens: {self.input_tokens:,} in, {self.output_tokens:,} out",
+            "Token counts: " + ("tiktoken" if self.tokenizer else "estimated from text length, tiktoken is not installed"),
+            f"Estimated cost: ${self.cost:.2f} ({self.model})",
+        ]
+        if self.max_tokens is not None or self.max_cost is not None:
+            limits = []
+            if self.max_tokens is not None:
+                limits.append(f"{self.max_tokens:,} tokens")
+            if self.max_cost is not None:
+                limits.append(f"${self.max_cost:.2f}")
+            lines.append(f"Budget: {', '.join(limits)}")
+        return "\n".join(lines)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """The price of the tokens in USD, 0 for models without a known price."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def plan_code_files(
+        files: Iterable[tuple[str, str]],
+        instructions: str,
+        model: str = DEFAULT_MODEL,
+        is_cached: Callable[[str], bool] = lambda section: False,
+        max_tokens: int | None = None,
+        max_cost: float | None = None,
+        tiny_file_max_tokens: int = TINY_FILE_MAX_TOKENS,
+        max_section_tokens: int = MAX_SECTION_TOKENS,
+) -> TokenPlan:
+    """
+    Decide for every code file whether and how it's sent to the LLM.
+
+    The output of a request is estimated to be as long as its input code.
+    Files are charged against the budget in order; once a file doesn't fit,
+    it's indexed verbatim, and later, smaller files can still fit.
+
+    Args:
+        files: (filename, code) pairs
+        instructions: The system prompt, sent with every request
+        model: The model, for token counting and prices
+        is_cached: Whether the result for a section is already cached
+        max_tokens: Maximum input plus output tokens of uncached requests
+        max_cost: Maximum estimated cost of uncached requests, in USD
+        tiny_file_max_tokens: Files up to this size are indexed verbatim
+        max_section_tokens: Larger files are split into sections
+
+    Returns:
+        The plan, by filename
+    """
+    plan = TokenPlan(model=model, max_tokens=max_tokens, max_cost=max_cost, tokenizer=has_tokenizer(model))
+    instruction_tokens = count_tokens(instructions, model)
+    used_tokens, used_cost = 0, 0.0
+
+    def count(text: str) -> int:
+        return count_tokens(text, model)
+
+    for filename, code in files:
+        tokens = count(code)
+        if tokens <= tiny_file_max_tokens:
+            plan.files[filename] = FilePlan(filename, tokens, VERBATIM)
+            continue
+
+        extension = filename.rsplit(".", 1)[-1].lower()
+        counted = split_code_counted(code, extension, max_section_tokens, count=count, tokens=tokens)
+        sections = [section for section, _ in counted]
+        uncached = [section_size for section, section_size in counted if not is_cached(section)]
+        if not uncached:
+            plan.files[filename] = FilePlan(filename, tokens, CACHED, sections)
+            continue
+
+        section_tokens = sum(uncached)
+        input_tokens = len(uncached) * instruction_tokens + section_tokens
+        output_tokens = section_tokens
+        cost = estimate_cost(model, input_tokens, output_tokens)
+
+        over_tokens = max_tokens is not None and used_tokens + input_tokens + output_tokens > max_tokens
+        over_cost = max_cost is not None and used_cost + cost > max_cost
+        if over_tokens or over_cost:
+            plan.files[filename] = FilePlan(filename, tokens, OVER_BUDGET)
+            continue
+
+        used_tokens += input_tokens + output_tokens
+        used_cost += cost
+        plan.files[filename] = FilePlan(filename, tokens, LLM, sections, input_tokens, output_tokens)
+
+    return plan
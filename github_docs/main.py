@@ -1,5 +1,5 @@
 import frontmatter
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any
 
 from rich.console import Console
 from rich.progress import track
@@ -11,8 +11,15 @@ from common.interactive import InteractiveSearch
 
 CONSOLE = Console()
 
+# fitted indexes are cached here, keyed by a fingerprint of the documents;
+# a directory per pipeline, old snapshots are pruned
+INDEX_SNAPSHOT_DIR = ".index_snapshots/github_docs"
 
-def read_github_data(repo_owner: str, repo_name: str) -> List[RawRepositoryFile]:
+# downloaded repository archives, revalidated with ETags on every run
+ARCHIVE_CACHE_DIR = ".archive_cache"
+
+
+def read_github_data(repo_owner: str, repo_name: str) -> Iterator[RawRepositoryFile]:
     allowed_extensions = {"md", "mdx"}
 
     def only_de_zoomcamp(filepath: str) -> bool:
@@ -25,12 +32,14 @@ def read_github_data(repo_owner: str, repo_name: str) -> List[RawRepositoryFile]
         repo_name,
         allowed_extensions=allowed_extensions,
         filename_filter=only_de_zoomcamp,
+        cache_dir=ARCHIVE_CACHE_DIR,
     )
-    
-    return reader.read()
+
+    # files are streamed through parsing and decoded one at a time
+    return reader.iter_files(lazy=True)
 
 
-def parse_data(data_raw: List[RawRepositoryFile]) -> List[Dict[str, Any]]:
+def parse_data(data_raw: Iterable[RawRepositoryFile]) -> List[Dict[str, Any]]:
     CONSOLE.print("📄 [bold blue]Parsing documents...[/bold blue]")
 
     data_parsed = []
@@ -56,7 +65,10 @@ def index_faq_data():
         documents,
         chunk=True,
         chunking_params={"size": 2000, "step": 1000},
+        snapshot_dir=INDEX_SNAPSHOT_DIR,
+        deduplicate=True,
     )
+    CONSOLE.print(f"🧹 Deduplication: {index.deduplication_stats}")
 
     return index
 
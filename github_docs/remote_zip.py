@@ -0,0 +1,241 @@
+"""
+Reading selected members of a remote zip archive with HTTP range requests.
+
+A zip archive ends with a central directory that lists every member with
+its compressed size and the offset of its local header. Fetching only the
+end of the archive is enough to list it; the members we actually need can
+then be fetched with range requests and inflated locally, without
+downloading the rest of the archive.
+"""
+
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+
+# the end of central directory record is 22 bytes plus a comment of up to 64 KiB
+EOCD_SIGNATURE = b"PK\x05\x06"
+EOCD_STRUCT = struct.Struct("<4s4H2LH")
+TAIL_SIZE = EOCD_STRUCT.size + 0xFFFF
+
+CENTRAL_SIGNATURE = b"PK\x01\x02"
+CENTRAL_STRUCT = struct.Struct("<4s6H3L5H2L")
+
+LOCAL_SIGNATURE = b"PK\x03\x04"
+LOCAL_STRUCT = struct.Struct("<4s5H3L2H")
+
+# values that mean "see the zip64 extra field"
+ZIP64_LIMIT = 0xFFFFFFFF
+
+FLAG_ENCRYPTED = 0x1
+FLAG_UTF8 = 0x800
+
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+# ranges closer than this are fetched with one request
+DEFAULT_MAX_GAP = 64 * 1024
+
+
+class UnsupportedArchive(Exception):
+    """The archive uses a feature this reader doesn't handle (e.g. zip64)."""
+
+
+@dataclass
+class RemoteZipEntry:
+    """A member of a remote zip archive, as listed in its central directory."""
+    filename: str
+    flags: int
+    method: int
+    crc: int
+    compress_size: int
+    file_size: int
+    header_offset: int
+
+
+@dataclass
+class CentralDirectory:
+    """The listing of a remote archive."""
+    entries: list[RemoteZipEntry]
+    offset: int
+    size: int
+
+
+def parse_end_of_central_directory(tail: bytes) -> tuple[int, int]:
+    """
+    Find the central directory from the last bytes of an archive.
+
+    Args:
+        tail: The end of the archive, at least the end of central directory record
+
+    Returns:
+        (offset, size) of the central directory
+    """
+    position = tail.rfind(EOCD_SIGNATURE)
+    if position < 0 or len(tail) - position < EOCD_STRUCT.size:
+        raise UnsupportedArchive("end of central directory not found")
+
+    (_, _, _, _, entries, size, offset, _) = EOCD_STRUCT.unpack_from(tail, position)
+    if offset == ZIP64_LIMIT or size == ZIP64_LIMIT or entries == 0xFFFF:
+        raise UnsupportedArchive("zip64 archives are not supported")
+    return offset, size
+
+
+def parse_central_directory(data: bytes) -> list[RemoteZipEntry]:
+    """Parse the central directory records of an archive."""
+    entries = []
+    position = 0
+    while position + CENTRAL_STRUCT.size <= len(data):
+        fields = CENTRAL_STRUCT.unpack_from(data, position)
+        if fields[0] != CENTRAL_SIGNATURE:
+            break
+
+        (_, _, _, flags, method, _, _, crc, compress_size, file_size,
+         name_length, extra_length, comment_length, _, _, _, header_offset) = fields
+
+        if ZIP64_LIMIT in (compress_size, file_size, header_offset):
+            raise UnsupportedArchive("zip64 archives are not supported")
+
+        name_start = position + CENTRAL_STRUCT.size
+        raw_name = data[name_start:name_start + name_length]
+        # the same rule zipfile uses
+        filename = raw_name.decode("utf-8" if flags & FLAG_UTF8 else "cp437")
+
+        entries.append(RemoteZipEntry(
+            filename=filename,
+            flags=flags,
+            method=method,
+            crc=crc,
+            compress_size=compress_size,
+            file_size=file_size,
+            header_offset=header_offset,
+        ))
+        position = name_start + name_length + extra_length + comment_length
+
+    return entries
+
+
+def member_spans(entries: list[RemoteZipEntry], directory_offset: int) -> dict[int, tuple[int, int]]:
+    """
+    The byte range of every member: from its local header to the next member.
+
+    The local header can have a different extra field than the central
+    directory record, so the exact end of a member's data isn't known up
+    front; the span up to the next local header (or the central directory)
+    always contains the header, the data and an optional data descriptor.
+
+    Returns:
+        header offset -> (start, end) with an exclusive end
+    """
+    offsets = sorted({e.header_offset for e in entries})
+    ends = offsets[1:] + [directory_offset]
+    return dict(zip(offsets, zip(offsets, ends)))
+
+
+def coalesce(
+        entries: list[RemoteZipEntry],
+        spans: dict[int, tuple[int, int]],
+        max_gap: int = DEFAULT_MAX_GAP,
+) -> list[tuple[int, int, list[RemoteZipEntry]]]:
+    """
+    Group the spans of the given members into as few ranges as possible.
+
+    Spans separated by less than `max_gap` bytes are merged, trading a bit
+    of extra transfer for fewer requests.
+
+    Returns:
+        (start, end, entries) ranges in archive order
+    """
+    ranges = []
+    for entry in sorted(entries, key=lambda e: e.header_offset):
+        start, end = spans[entry.header_offset]
+        if ranges and start - ranges[-1][1] <= max_gap:
+            ranges[-1][1] = max(ranges[-1][1], end)
+            ranges[-1][2].append(entry)
+        else:
+            ranges.append([start, end, [entry]])
+    return [(start, end, members) for start, end, members in ranges]
+
+
+def extract_member(entry: RemoteZipEntry, data: bytes, position: int = 0) -> bytes:
+    """
+    Inflate a member from bytes that start at (or contain) its local header.
+
+    Args:
+        entry: The member to extract
+        data: Fetched archive bytes
+        position: Offset of the member's local header in `data`
+
+    Returns:
+        The uncompressed member
+
+    Raises:
+        ValueError: If the member is damaged, encrypted or uses an unsupported compression
+    """
+    fields = LOCAL_STRUCT.unpack_from(data, position)
+    if fields[0] != LOCAL_SIGNATURE:
+        raise ValueError(f"bad local header for {entry.filename}")
+    if entry.flags & FLAG_ENCRYPTED:
+        raise ValueError(f"{entry.filename} is encrypted")
+
+    name_length, extra_length = fields[-2:]
+    start = position + LOCAL_STRUCT.size + name_length + extra_length
+    compressed = data[start:start + entry.compress_size]
+
+    if entry.method == METHOD_STORED:
+        content = bytes(compressed)
+    elif entry.method == METHOD_DEFLATED:
+        content = zlib.decompressobj(-zlib.MAX_WBITS).decompress(compressed)
+    else:
+        raise ValueError(f"{entry.filename} uses unsupported compression method {entry.method}")
+
+    if zlib.crc32(content) != entry.crc:
+        raise ValueError(f"bad CRC-32 for {entry.filename}")
+    return content
+
+
+def read_central_directory(tail: bytes, total_size: int, fetch: Callable[[int, int], bytes]) -> CentralDirectory:
+    """
+    Read the central directory, fetching more bytes if it isn't in the tail.
+
+    Args:
+        tail: The last bytes of the archive
+        total_size: The size of the whole archive
+        fetch: Fetches the archive bytes in [start, end)
+
+    Returns:
+        The listing of the archive
+    """
+    offset, size = parse_end_of_central_directory(tail)
+    tail_start = total_size - len(tail)
+
+    if offset >= tail_start:
+        data = tail[offset - tail_start:offset - tail_start + size]
+    else:
+        data = fetch(offset, offset + size)
+
+    return CentralDirectory(entries=parse_central_directory(data), offset=offset, size=size)
+
+
+def iter_members(
+        directory: CentralDirectory,
+        entries: list[RemoteZipEntry],
+        fetch: Callable[[int, int], bytes],
+        max_gap: int = DEFAULT_MAX_GAP,
+) -> Iterator[tuple[RemoteZipEntry, bytes | Exception]]:
+    """
+    Fetch and inflate the given members with as few range requests as possible.
+
+    Yields:
+        (entry, content) in archive order, or (entry, error) for members
+        that could not be extracted
+    """
+    spans = member_spans(directory.entries, directory.offset)
+    for start, end, members in coalesce(entries, spans, max_gap=max_gap):
+        data = fetch(start, end)
+        for entry in members:
+            try:
+                yield entry, extract_member(entry, data, entry.header_offset - start)
+            except (ValueError, struct.error, zlib.error) as e:
+                yield entry, e
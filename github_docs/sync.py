@@ -0,0 +1,235 @@
+"""
+Incremental sync of a GitHub repository.
+
+Downloading the whole archive on every new commit is wasteful when only a
+few files changed. RepositorySync remembers the commit it synced last, asks
+the GitHub compare API which paths changed between that commit and the
+current head, and fetches only the added or modified files. Deleted (and
+renamed-away) paths are reported, so downstream caches and indexes can be
+updated in place, e.g. with `IncrementalIndex.update` and `remove`.
+
+The first sync, and any sync the compare API can't describe (a diff that is
+too large, a base commit that no longer exists, or a head that diverged from
+it after a force-push), falls back to reading the full archive at the new
+head commit.
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+
+from github_docs.github import (
+    DEFAULT_DOWNLOAD_WORKERS,
+    GithubRepositoryDataReader,
+    RawRepositoryFile,
+    make_session,
+)
+
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+
+# the compare API lists at most this many changed files
+COMPARE_MAX_FILES = 300
+
+
+@dataclass
+class SyncResult:
+    """
+    The changes found by a sync.
+
+    Attributes:
+        sha: The commit the repository is synced to now
+        previous_sha: The commit of the previous sync, or None for the first one
+        files: Added or modified files that pass the reader's filters
+        deleted: Paths of files that were removed (or renamed away)
+        full: True if all files were read from the archive instead of
+                only the changed ones; `files` is then the whole repository
+    """
+    sha: str
+    previous_sha: str | None
+    files: list[RawRepositoryFile] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    full: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.files or self.deleted or self.full)
+
+
+class RepositorySync:
+    """
+    Keeps a local copy of a repository up to date by fetching only changed files.
+
+    The reader defines the repository, ref and file filters, and is used to
+    read the full archive when an incremental sync isn't possible.
+    """
+
+    def __init__(self,
+                reader: GithubRepositoryDataReader,
+                state_path: str | Path,
+                api_url: str = GITHUB_API_URL,
+                raw_url: str = GITHUB_RAW_URL,
+                token: str | None = None,
+                max_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        ):
+        """
+        Initialize the repository sync.
+
+        Args:
+            reader: The reader for the repository to sync
+            state_path: JSON file where the last synced commit is stored
+            api_url: The GitHub REST API endpoint
+            raw_url: The server that serves raw file contents
+            token: Optional GitHub token, raises the API rate limit
+            max_workers: Number of changed files fetched at the same time
+        """
+        self.reader = reader
+        self.state_path = Path(state_path)
+        self.api_url = api_url.rstrip("/")
+        self.raw_url = raw_url.rstrip("/")
+        self.max_workers = max_workers
+        self.session = reader.session if reader.session is not None else make_session(max_workers)
+
+        self.headers = {"Accept": "application/vnd.github+json"}
+        if token is not None:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    @property
+    def repo_path(self) -> str:
+        return f"{self.reader.repo_owner}/{self.reader.repo_name}"
+
+    def sync(self) -> SyncResult:
+        """
+        Bring the local copy up to date with the head of the reader's ref.
+
+        The new commit is stored in the state file only after all changed
+        files have been fetched, so a failed sync is retried from the same
+        commit next time.
+
+        Returns:
+            The changes since the previous sync
+
+        Raises:
+            Exception: If a request to GitHub fails
+        """
+        head = self.head_sha()
+        previous = self.last_synced_sha()
+
+        if previous == head:
+            return SyncResult(sha=head, previous_sha=previous)
+
+        changes = self.compare(previous, head) if previous is not None else None
+        if changes is None:
+            result = SyncResult(
+                sha=head,
+                previous_sha=previous,
+                # the ref may have moved since head_sha()
+                files=self.reader.with_ref(head).read(),
+                full=True,
+            )
+        else:
+            changed, deleted = changes
+            result = SyncResult(
+                sha=head,
+                previous_sha=previous,
+                files=self._fetch_files(head, changed),
+                deleted=deleted,
+            )
+
+        self._save_state(head)
+        return result
+
+    def head_sha(self) -> str:
+        """The commit SHA the reader's ref points to."""
+        url = f"{self.api_url}/repos/{self.repo_path}/commits/{quote(self.reader.ref, safe='')}"
+        return self._get_json(url)["sha"]
+
+    def compare(self, base: str, head: str) -> tuple[list[str], list[str]] | None:
+        """
+        List the paths changed between two commits.
+
+        Args:
+            base: The older commit
+            head: The newer commit
+
+        Returns:
+            (added or modified paths, deleted paths), both filtered with the
+            reader's filters, or None if the compare API can't list all changes,
+            or if head isn't a descendant of base (a force-push or a branch
+            that was reset), when the diff doesn't describe the new tree
+        """
+        url = f"{self.api_url}/repos/{self.repo_path}/compare/{base}...{head}"
+        resp = self.session.get(url, headers=self.headers)
+        if resp.status_code == 404:
+            # the base commit is gone, e.g. after a force-push
+            return None
+        self._check(resp)
+
+        data = resp.json()
+        if data.get("status") not in ("ahead", "identical"):
+            return None
+
+        files = data.get("files")
+        if files is None or len(files) >= COMPARE_MAX_FILES:
+            return None
+
+        changed, deleted = [], []
+        for f in files:
+            if f["status"] == "removed":
+                deleted.append(f["filename"])
+                continue
+            if f["status"] == "renamed":
+                deleted.append(f["previous_filename"])
+            changed.append(f["filename"])
+
+        skip = self.reader._should_skip_file
+        return (
+            [path for path in changed if not skip(path)],
+            [path for path in deleted if not skip(path)],
+        )
+
+    def last_synced_sha(self) -> str | None:
+        """The commit of the previous sync of the same repository and ref, if any."""
+        if not self.state_path.exists():
+            return None
+
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        if state.get("repo") != self.repo_path or state.get("ref") != self.reader.ref:
+            return None
+        return state.get("sha")
+
+    def _save_state(self, sha: str) -> None:
+        state = {"repo": self.repo_path, "ref": self.reader.ref, "sha": sha}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f_out:
+            json.dump(state, f_out)
+        os.replace(tmp_path, self.state_path)
+
+    def _fetch_files(self, sha: str, paths: list[str]) -> list[RawRepositoryFile]:
+        """Fetch the contents of the given paths at a commit, in the given order."""
+        def fetch(path: str) -> RawRepositoryFile:
+            url = f"{self.raw_url}/{self.repo_path}/{sha}/{quote(path)}"
+            resp = self.session.get(url, headers=self.headers)
+            self._check(resp)
+            content = resp.content.decode("utf-8", errors="ignore").strip()
+            return RawRepositoryFile(filename=path, content=content)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fetch, paths))
+
+    def _get_json(self, url: str):
+        resp = self.session.get(url, headers=self.headers)
+        self._check(resp)
+        return resp.json()
+
+    def _check(self, resp: requests.Response) -> None:
+        if resp.status_code != 200:
+            raise Exception(f"GitHub request failed: {resp.url} {resp.status_code}")
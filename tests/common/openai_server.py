@@ -0,0 +1,101 @@
+"""
+A local HTTP server standing in for the OpenAI Responses API in tests.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_response(model, text, total_tokens):
+    """A minimal completed Responses API object."""
+    return {
+        "id": "resp_test",
+        "object": "response",
+        "created_at": 0,
+        "model": model,
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": "msg_test",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": {"input_tokens": total_tokens, "output_tokens": 0, "total_tokens": total_tokens},
+    }
+
+
+class FakeOpenAIServer:
+    """
+    Echoes the user content of every request back as "echo: <content>".
+
+    The first `rate_limited` requests get a 429 with a `retry_after` header,
+    the next ones get the error statuses in `failures`, one each, and
+    every response is delayed by `delay` seconds. The timestamps of all
+    requests and the largest number of requests in flight are recorded.
+    """
+
+    def __init__(self, delay=0.0, rate_limited=0, retry_after="0.1", total_tokens=10):
+        self.delay = delay
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.total_tokens = total_tokens
+        self.failures = []
+        self.times = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.times.append(time.monotonic())
+                    limited = len(server.times) <= server.rate_limited
+                    failure = server.failures.pop(0) if server.failures and not limited else None
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+                try:
+                    time.sleep(server.delay)
+                    if limited:
+                        data = {"error": {"message": "Rate limit reached", "type": "requests"}}
+                        self.respond(429, data, {"retry-after": server.retry_after})
+                    elif failure is not None:
+                        data = {"error": {"message": "Server error", "type": "server_error"}}
+                        self.respond(failure, data, {"retry-after": "0"})
+                    else:
+                        text = "echo: " + body["input"][1]["content"]
+                        self.respond(200, make_response(body["model"], text, server.total_tokens))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def respond(self, status, data, headers=None):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
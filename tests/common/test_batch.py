@@ -0,0 +1,234 @@
+"""
+Tests for common.batch module.
+
+This module contains unit tests for running LLM requests through the
+Batch API, using a fake client that stands in for the files and batches
+endpoints.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from petcache import PetCache
+
+from common.batch import (
+    BATCH_ENDPOINT,
+    BatchRequest,
+    LLMBatchRunner,
+    output_text,
+    split_batches,
+)
+from common.llm import LLMCache
+from tests.common.openai_server import make_response
+
+
+class FakeFiles:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, file, purpose):
+        name, f_in = file
+        assert purpose == "batch"
+        file_id = f"file-{len(self.client.files_data)}"
+        self.client.files_data[file_id] = f_in.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def content(self, file_id):
+        return SimpleNamespace(text=self.client.files_data[file_id])
+
+
+class FakeBatches:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, input_file_id, endpoint, completion_window):
+        assert endpoint == BATCH_ENDPOINT
+        batch_id = f"batch-{len(self.client.batches_data)}"
+        self.client.batches_data[batch_id] = {"input": input_file_id, "polls": 0}
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve(self, batch_id):
+        batch = self.client.batches_data[batch_id]
+        batch["polls"] += 1
+        if batch["polls"] < self.client.polls_to_complete:
+            return SimpleNamespace(id=batch_id, status="in_progress", output_file_id=None)
+        return SimpleNamespace(id=batch_id, status="completed", output_file_id=self.client.run(batch))
+
+
+class FakeBatchClient:
+    """
+    Completes every batch after a number of polls, echoing the user content.
+
+    Requests whose content is in `failing` get an error response.
+    """
+
+    def __init__(self, polls_to_complete=2, failing=()):
+        self.polls_to_complete = polls_to_complete
+        self.failing = set(failing)
+        self.files_data = {}
+        self.batches_data = {}
+        self.files = FakeFiles(self)
+        self.batches = FakeBatches(self)
+
+    def requests(self):
+        """All request lines of all submitted batches."""
+        return [
+            json.loads(line)
+            for batch in self.batches_data.values()
+            for line in self.files_data[batch["input"]].splitlines()
+        ]
+
+    def run(self, batch):
+        if "output" not in batch:
+            lines = []
+            for line in self.files_data[batch["input"]].splitlines():
+                request = json.loads(line)
+                content = request["body"]["input"][1]["content"]
+                if content in self.failing:
+                    response = {"status_code": 500, "body": {"error": {"message": "failed"}}}
+                else:
+                    body = make_response(request["body"]["model"], f"```\n{content}!\n```", 10)
+                    response = {"status_code": 200, "body": body}
+                lines.append(json.dumps({"custom_id": request["custom_id"], "response": response}))
+
+            batch["output"] = f"file-{len(self.files_data)}"
+            self.files_data[batch["output"]] = "\n".join(lines)
+        return batch["output"]
+
+
+def make_requests(*contents):
+    return [
+        BatchRequest(key=LLMCache.make_key("model", "prompt", c), instructions="prompt", content=c, model="model")
+        for c in contents
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+
+
+def make_runner(client, cache, tmp_path, **kwargs):
+    return LLMBatchRunner(
+        client,
+        cache,
+        tmp_path / "batches.json",
+        postprocess=lambda text: text.strip("`\n"),
+        poll_interval=0,
+        **kwargs,
+    )
+
+
+class TestLLMBatchRunner:
+    """Test cases for the LLMBatchRunner class."""
+
+    def test_results_are_cached_by_key(self, cache, tmp_path):
+        """Test that results are post-processed and stored under the request keys."""
+        client = FakeBatchClient()
+        requests = make_requests("a", "b")
+
+        result = make_runner(client, cache, tmp_path).run(requests)
+
+        assert (result.submitted, result.completed, result.failed) == (2, 2, [])
+        assert cache.get(requests[0].key) == "a!"
+        assert cache.get(requests[1].key) == "b!"
+
+        line = client.requests()[0]
+        assert line["custom_id"] == requests[0].key
+        assert line["url"] == BATCH_ENDPOINT
+        assert line["body"]["input"][0] == {"role": "system", "content": "prompt"}
+
+        # all batches are finished, nothing left to resume
+        assert json.loads((tmp_path / "batches.json").read_text()) == {"batches": []}
+
+    def test_cached_and_duplicate_requests_are_skipped(self, cache, tmp_path):
+        """Test that only uncached requests are submitted, once per key."""
+        requests = make_requests("a", "b", "a")
+        cache.set(requests[1].key, "cached")
+
+        client = FakeBatchClient()
+        result = make_runner(client, cache, tmp_path).run(requests)
+
+        assert [r["body"]["input"][1]["content"] for r in client.requests()] == ["a"]
+        assert (result.cached, result.submitted) == (1, 1)
+        # checking for cached results isn't a cache lookup of the pipeline
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_nothing_to_do(self, cache, tmp_path):
+        """Test that no batch is created when everything is cached."""
+        requests = make_requests("a")
+        cache.set(requests[0].key, "cached")
+
+        client = FakeBatchClient()
+        result = make_runner(client, cache, tmp_path).run(requests)
+
+        assert client.batches_data == {}
+        assert result.submitted == 0
+
+    def test_failed_requests(self, cache, tmp_path):
+        """Test that requests with an error response are reported and not cached."""
+        requests = make_requests("a", "b")
+        client = FakeBatchClient(failing={"b"})
+
+        result = make_runner(client, cache, tmp_path).run(requests)
+
+        assert result.completed == 1
+        assert result.failed == [requests[1].key]
+        assert cache.get(requests[1].key) is None
+
+    def test_requests_are_split_into_batches(self, cache, tmp_path):
+        """Test that a batch never has more than max_requests requests."""
+        client = FakeBatchClient()
+        requests = make_requests("a", "b", "c")
+
+        result = make_runner(client, cache, tmp_path, max_requests=2).run(requests)
+
+        assert len(client.batches_data) == 2
+        assert result.completed == 3
+
+    def test_resume_after_restart(self, cache, tmp_path):
+        """Test that a restarted run polls the submitted batch instead of resubmitting."""
+        client = FakeBatchClient(polls_to_complete=3)
+        requests = make_requests("a", "b")
+
+        class Interrupted(Exception):
+            pass
+
+        def interrupt(seconds):
+            raise Interrupted()
+
+        runner = make_runner(client, cache, tmp_path)
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("common.batch.time.sleep", interrupt)
+            with pytest.raises(Interrupted):
+                runner.run(requests)
+
+        state = json.loads((tmp_path / "batches.json").read_text())
+        assert state == {"batches": [{"id": "batch-0", "keys": [r.key for r in requests]}]}
+
+        result = make_runner(client, cache, tmp_path).run(requests)
+
+        assert len(client.batches_data) == 1
+        assert (result.submitted, result.resumed, result.completed) == (0, 2, 2)
+        assert cache.get(requests[0].key) == "a!"
+
+
+class TestHelpers:
+    """Test cases for the module helpers."""
+
+    def test_output_text(self):
+        """Test that only output text of messages is returned."""
+        body = make_response("model", "hello", 1)
+        body["output"].insert(0, {"type": "reasoning", "id": "rs", "summary": []})
+
+        assert output_text(body) == "hello"
+
+    def test_split_batches_by_size(self):
+        """Test that batches stay within the byte limit."""
+        requests = make_requests("a" * 100, "b" * 100, "c")
+        line_size = len(json.dumps(requests[0].to_line())) + 1
+
+        batches = split_batches(requests, max_bytes=2 * line_size - 50)
+
+        assert [len(batch) for batch in batches] == [1, 2]
@@ -0,0 +1,178 @@
+"""
+Tests for common.bm25 module.
+
+This module contains unit tests for the BM25 index, including ranking,
+filters, boosts, early termination and integration with index_documents.
+"""
+
+import math
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from common.bm25 import BM25Index
+from common.text import tokenize
+from common.indexing import index_documents, load_index, save_index
+
+
+def make_documents(num_docs=300, seed=1):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(200)]
+    return [
+        {
+            'content': ' '.join(rng.choices(words, k=rng.randint(5, 80))),
+            'filename': f'doc{i}.md',
+            'section': rng.choice(['faq', 'guide']),
+        }
+        for i in range(num_docs)
+    ]
+
+
+def brute_force(documents, text_fields, query, filter_dict=None, boost_dict=None, num_results=10, k1=1.2, b=0.75):
+    """Score every document with the textbook BM25 formula."""
+    filter_dict = filter_dict or {}
+    boost_dict = boost_dict or {}
+    query_counts = Counter(tokenize(query))
+    scores = [0.0] * len(documents)
+
+    for field in text_fields:
+        doc_tokens = [Counter(tokenize(doc.get(field, ''))) for doc in documents]
+        lengths = [sum(counts.values()) for counts in doc_tokens]
+        avgdl = sum(lengths) / len(lengths)
+        for term, qtf in query_counts.items():
+            df = sum(1 for counts in doc_tokens if term in counts)
+            if df == 0:
+                continue
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            for i, counts in enumerate(doc_tokens):
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = k1 * (1 - b + b * lengths[i] / avgdl)
+                    scores[i] += boost_dict.get(field, 1) * qtf * idf * tf * (k1 + 1) / (tf + norm)
+
+    ranked = [
+        i for i in sorted(range(len(documents)), key=lambda i: (-scores[i], i))
+        if scores[i] > 0 and all(documents[i].get(f) == v for f, v in filter_dict.items())
+    ]
+    return [documents[i]['filename'] for i in ranked[:num_results]]
+
+
+def result_names(results):
+    return [doc['filename'] for doc in results]
+
+
+class TestBM25Index:
+    """Test cases for the BM25Index class."""
+
+    def test_matches_brute_force(self):
+        """Test that early termination returns the exact BM25 top-k."""
+        documents = make_documents()
+        index = BM25Index(['content', 'filename'], keyword_fields=['section']).fit(documents)
+
+        queries = ['term1 term2', 'term50', 'doc7', 'term3 term3 term9 term120 term7 term8']
+        for query in queries:
+            for num_results in [1, 5, 20]:
+                assert result_names(index.search(query, num_results=num_results)) == \
+                    brute_force(documents, ['content', 'filename'], query, num_results=num_results)
+
+    def test_filters_and_boosts(self):
+        """Test keyword filters and field boosts."""
+        documents = make_documents()
+        index = BM25Index(['content', 'filename'], keyword_fields=['section']).fit(documents)
+
+        filter_dict = {'section': 'faq'}
+        boost_dict = {'content': 0.5, 'filename': 3}
+        query = 'term4 term5 doc11'
+        assert result_names(index.search(query, filter_dict=filter_dict, boost_dict=boost_dict)) == \
+            brute_force(documents, ['content', 'filename'], query, filter_dict=filter_dict, boost_dict=boost_dict)
+
+    def test_ranks_relevant_document_first(self):
+        """Test that the document matching the most query terms ranks first."""
+        index = BM25Index(['content']).fit([
+            {'content': 'install docker on linux', 'filename': 'a.md'},
+            {'content': 'docker compose networking', 'filename': 'b.md'},
+            {'content': 'postgres backups', 'filename': 'c.md'},
+        ])
+
+        assert result_names(index.search('docker compose')) == ['b.md', 'a.md']
+
+    def test_zero_boost_skips_field(self):
+        """Test that a field with zero boost doesn't contribute to the score."""
+        index = BM25Index(['content', 'filename']).fit([
+            {'content': 'docker', 'filename': 'a.md'},
+            {'content': 'text', 'filename': 'docker.md'},
+        ])
+
+        assert result_names(index.search('docker', boost_dict={'filename': 0})) == ['a.md']
+
+    def test_output_ids(self):
+        """Test that output_ids adds the document position."""
+        index = BM25Index(['content']).fit([
+            {'content': 'text', 'filename': 'a.md'},
+            {'content': 'other text', 'filename': 'b.md'},
+        ])
+
+        assert index.search('other', output_ids=True) == [
+            {'content': 'other text', 'filename': 'b.md', '_id': 1}
+        ]
+
+    def test_query_buffers_are_reset(self):
+        """Test that reused score buffers don't leak into later queries, also across threads."""
+        documents = make_documents()
+        index = BM25Index(['content', 'filename'], keyword_fields=['section']).fit(documents)
+        queries = ['term1 term2', 'term3 term3 term9 term120', 'doc7 term50']
+        expected = [brute_force(documents, ['content', 'filename'], query) for query in queries]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda q: result_names(index.search(q)), queries * 20))
+        assert results == expected * 20
+
+        scores, seen = index._query_buffers()
+        assert not scores.any() and not seen.any()
+
+    def test_empty_index_and_query(self):
+        """Test searching an empty index and queries without known terms."""
+        assert BM25Index(['content']).fit([]).search('anything') == []
+
+        index = BM25Index(['content']).fit([{'content': 'text', 'filename': 'a.md'}])
+        assert index.search('') == []
+        assert index.search('unknown') == []
+        assert index.search('text', num_results=0) == []
+
+
+class TestIndexDocumentsEngine:
+    """Test cases for selecting the search engine in index_documents."""
+
+    def test_bm25_engine(self):
+        """Test building a BM25 index through index_documents."""
+        index = index_documents(make_documents(20), engine='bm25')
+
+        assert isinstance(index, BM25Index)
+        assert index.search('doc3')[0]['filename'] == 'doc3.md'
+
+    def test_unknown_engine(self):
+        """Test that an unknown engine is rejected."""
+        with pytest.raises(ValueError, match="unknown search engine"):
+            index_documents([], engine='lucene')
+
+    def test_snapshot_roundtrip(self, tmp_path):
+        """Test that a BM25 index survives a snapshot roundtrip."""
+        documents = make_documents(50)
+        index = BM25Index(['content', 'filename'], keyword_fields=['section']).fit(documents)
+        save_index(index, tmp_path / 'bm25')
+
+        loaded = load_index(tmp_path / 'bm25')
+        for query in ['term1 term2', 'doc7']:
+            assert loaded.search(query, filter_dict={'section': 'faq'}) == \
+                index.search(query, filter_dict={'section': 'faq'})
+
+    def test_engine_is_part_of_snapshot_key(self, tmp_path):
+        """Test that switching the engine doesn't reuse a snapshot of the other engine."""
+        documents = make_documents(20)
+        index_documents(documents, snapshot_dir=tmp_path)
+        index = index_documents(documents, snapshot_dir=tmp_path, engine='bm25')
+
+        assert isinstance(index, BM25Index)
+        assert len(list(tmp_path.iterdir())) == 2
@@ -6,7 +6,20 @@ including sliding window operations and document chunking.
 """
 
 import pytest
-from common.chunking import sliding_window, chunk_documents
+import pickle
+import types
+
+from common.chunking import (
+    sliding_window,
+    iter_sliding_window,
+    chunk_documents,
+    iter_chunks,
+    chunk_offsets,
+    Chunk,
+    ChunkedDocuments,
+    build_break_index,
+    iter_boundary_offsets,
+)
 
 
 class TestSlidingWindow:
@@ -213,4 +226,198 @@ class TestChunkDocuments:
         second_doc_chunks = [chunk for chunk in result if chunk['id'] == 2]
         
         assert len(first_doc_chunks) == 3
-        assert len(second_doc_chunks) == 3
\ No newline at end of file
+        assert len(second_doc_chunks) == 3
+
+
+class TestIterChunks:
+    """Test cases for the streaming iter_chunks function."""
+
+    def test_iter_chunks_is_lazy(self):
+        """Test that iter_chunks returns a generator and consumes input lazily."""
+        consumed = []
+
+        def doc_generator():
+            for i in range(3):
+                consumed.append(i)
+                yield {'content': 'abcdef', 'id': i}
+
+        chunks = iter_chunks(doc_generator(), size=4, step=2)
+        assert isinstance(chunks, types.GeneratorType)
+        assert consumed == []
+
+        first = next(chunks)
+        assert first == {'start': 0, 'content': 'abcd', 'id': 0}
+        assert consumed == [0]
+
+    def test_iter_chunks_matches_chunk_documents(self):
+        """Test that streaming produces the same chunks as the list API."""
+        documents = [
+            {'content': 'hello world how are you', 'filename': 'doc1.txt'},
+            {'content': 'second doc text', 'filename': 'doc2.txt'}
+        ]
+        streamed = list(iter_chunks(documents, size=10, step=5))
+        assert streamed == chunk_documents(documents, size=10, step=5)
+
+    def test_iter_chunks_does_not_modify_input(self):
+        """Test that the original documents keep their content field."""
+        documents = [{'text': 'hello world', 'title': 'Doc'}]
+        list(iter_chunks(documents, size=5, step=5, content_field_name='text'))
+        assert documents == [{'text': 'hello world', 'title': 'Doc'}]
+
+    def test_iter_sliding_window_matches_sliding_window(self):
+        """Test that the streaming window matches the list version."""
+        assert list(iter_sliding_window("hello world", size=5, step=3)) == \
+            sliding_window("hello world", size=5, step=3)
+
+    def test_iter_sliding_window_invalid_params(self):
+        """Test that invalid parameters raise on first use."""
+        with pytest.raises(ValueError, match="size and step must be positive"):
+            next(iter_sliding_window("hello", size=0, step=1))
+
+
+
+class TestChunkOffsets:
+    """Test cases for the offset-based chunk_offsets function."""
+
+    def test_chunk_offsets_matches_chunk_documents(self):
+        """Test that lazy chunks expose the same data as the list API."""
+        documents = [
+            {'content': 'hello world how are you', 'filename': 'doc1.txt'},
+            {'content': 'second doc text', 'filename': 'doc2.txt', 'tags': ['a']}
+        ]
+        result = chunk_offsets(documents, size=10, step=5)
+
+        assert isinstance(result, ChunkedDocuments)
+        assert len(result) == 7
+        assert [dict(c) for c in result] == chunk_documents(documents, size=10, step=5)
+
+    def test_chunk_offsets_stores_only_offsets(self):
+        """Test that chunks reference the source documents instead of copying."""
+        documents = [{'content': 'abcdefgh', 'filename': 'doc.txt'}]
+        result = chunk_offsets(documents, size=4, step=2)
+
+        assert list(result.doc_ids) == [0, 0, 0, 0]
+        assert list(result.starts) == [0, 2, 4, 6]
+        assert list(result.ends) == [4, 6, 8, 8]
+        assert result.documents[0] is documents[0]
+
+    def test_chunk_is_mapping(self):
+        """Test that a Chunk behaves like the equivalent dict."""
+        documents = [{'text': 'hello world', 'title': 'Doc'}]
+        chunk = chunk_offsets(documents, size=5, step=5, content_field_name='text')[1]
+
+        assert isinstance(chunk, Chunk)
+        assert chunk == {'start': 5, 'content': ' worl', 'title': 'Doc'}
+        assert chunk.get('title') == 'Doc'
+        assert chunk.get('text') is None
+        assert 'content' in chunk
+        assert 'text' not in chunk
+        assert {**chunk, '_id': 1}['content'] == ' worl'
+
+    def test_chunk_dicts(self):
+        """Test that lookups return plain dicts and iteration lazy chunks."""
+        documents = [{'content': 'abcdefgh', 'filename': 'doc.txt'}]
+        chunks = chunk_offsets(documents, size=4, step=2)
+        dicts = chunks.as_dicts()
+
+        assert len(dicts) == 4
+        assert type(dicts[1]) is dict
+        assert dicts[1] == {'start': 2, 'content': 'cdef', 'filename': 'doc.txt'}
+        assert dicts[-2:] == [dict(chunks[2]), dict(chunks[3])]
+        assert all(isinstance(c, Chunk) for c in dicts)
+        assert pickle.loads(pickle.dumps(dicts))[0] == dicts[0]
+
+    def test_chunk_offsets_select(self):
+        """Test selecting a subset of chunks."""
+        documents = [{'content': 'abcdefgh', 'filename': 'doc.txt'}]
+        result = chunk_offsets(documents, size=4, step=2).select([1, 3])
+
+        assert [c['content'] for c in result] == ['cdef', 'gh']
+        assert result[-1]['start'] == 6
+
+    def test_chunk_offsets_pickle(self):
+        """Test that chunk collections can be pickled."""
+        documents = [{'content': 'abcdefgh', 'filename': 'doc.txt'}]
+        result = pickle.loads(pickle.dumps(chunk_offsets(documents, size=4, step=2)))
+
+        assert [c['content'] for c in result] == ['abcd', 'cdef', 'efgh', 'gh']
+
+    def test_chunk_offsets_empty(self):
+        """Test chunking an empty collection."""
+        assert len(chunk_offsets([])) == 0
+
+
+
+MARKDOWN_DOC = (
+    "# Title\n\n"
+    "First paragraph here. It has two sentences.\n\n"
+    "## Section\n\n"
+    "Some more text follows here! And more.\n\n"
+    "```python\ndef f():\n\n    return 1. \n```\n\n"
+    "After code."
+)
+
+
+class TestBoundaryChunking:
+    """Test cases for the boundary-aware chunking mode."""
+
+    def test_break_index_skips_code_blocks(self):
+        """Test that breaks inside fenced code blocks are not used."""
+        strong, weak = build_break_index(MARKDOWN_DOC)
+
+        fence_start = MARKDOWN_DOC.index("```python")
+        fence_end = MARKDOWN_DOC.index("```\n\n") + 4
+        assert fence_start in strong
+        assert fence_end in strong
+        assert not [b for b in strong if fence_start < b < fence_end]
+        assert MARKDOWN_DOC.index("## Section") in strong
+        assert weak == sorted(weak)
+
+    def test_chunks_end_on_boundaries(self):
+        """Test that chunks are aligned to paragraphs and code blocks."""
+        result = chunk_documents(
+            [{'content': MARKDOWN_DOC, 'filename': 'doc.md'}],
+            size=60,
+            step=60,
+            mode='boundary',
+        )
+
+        assert [c['content'] for c in result] == [
+            "# Title\n\nFirst paragraph here. It has two sentences.\n\n",
+            "## Section\n\nSome more text follows here! And more.\n\n",
+            "```python\ndef f():\n\n    return 1. \n```\n\nAfter code.",
+        ]
+        assert all(c['filename'] == 'doc.md' for c in result)
+        assert [c['start'] for c in result] == [0, 54, 106]
+
+    def test_chunks_cover_whole_text(self):
+        """Test that boundary chunks never leave gaps and respect the size."""
+        text = (MARKDOWN_DOC + "\n\n") * 50
+        covered = 0
+        for start, end in iter_boundary_offsets(text, size=200, step=100):
+            assert start <= covered
+            assert 0 < end - start <= 200
+            covered = max(covered, end)
+        assert covered == len(text)
+
+    def test_falls_back_to_word_boundaries(self):
+        """Test that text without sentence breaks is split between words."""
+        text = "word " * 20
+        result = list(iter_boundary_offsets(text, size=12, step=12))
+        assert all(text[end - 1] == " " for _, end in result[:-1])
+
+    def test_boundary_mode_with_chunk_offsets(self):
+        """Test that lazy chunking supports the boundary mode."""
+        documents = [{'content': MARKDOWN_DOC}]
+        lazy = chunk_offsets(documents, size=60, step=30, mode='boundary')
+        eager = chunk_documents(documents, size=60, step=30, mode='boundary')
+        assert [dict(c) for c in lazy] == eager
+
+    def test_boundary_mode_empty_text(self):
+        """Test chunking an empty document."""
+        assert chunk_documents([{'content': ''}], mode='boundary') == []
+
+    def test_unknown_mode(self):
+        """Test that an unknown chunking mode is rejected."""
+        with pytest.raises(ValueError, match="unknown chunking mode"):
+            chunk_documents([{'content': 'text'}], mode='paragraphs')
@@ -0,0 +1,147 @@
+"""
+Tests for common.dedup module.
+
+This module contains unit tests for MinHash signatures, LSH-based
+near-duplicate detection and deduplication before indexing.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from common.chunking import ChunkedDocuments, chunk_offsets
+from common.dedup import DeduplicationStats, MinHasher, deduplicate_documents, find_duplicates
+from common.indexing import index_documents
+
+
+def random_text(rng, num_words=300):
+    words = [f"word{i}" for i in range(2000)]
+    return ' '.join(rng.choices(words, k=num_words))
+
+
+def edit(text, every=50):
+    """Replace every n-th word, keeping the text mostly the same."""
+    words = text.split()
+    for i in range(0, len(words), every):
+        words[i] = f'edited{i}'
+    return ' '.join(words)
+
+
+class TestMinHasher:
+    """Test cases for the MinHasher class."""
+
+    def test_identical_texts_have_identical_signatures(self):
+        """Test that signatures are deterministic."""
+        text = random_text(random.Random(1))
+        assert np.array_equal(MinHasher().signature(text), MinHasher().signature(text))
+
+    def test_signature_estimates_jaccard_similarity(self):
+        """Test that signature agreement tracks shingle overlap."""
+        hasher = MinHasher(num_perm=256)
+        text = random_text(random.Random(1))
+
+        similar = np.mean(hasher.signature(text) == hasher.signature(edit(text)))
+        different = np.mean(hasher.signature(text) == hasher.signature(random_text(random.Random(2))))
+
+        assert 0.6 < similar < 0.95
+        assert different < 0.05
+
+    def test_short_and_empty_texts(self):
+        """Test texts shorter than a shingle."""
+        hasher = MinHasher()
+        assert np.array_equal(hasher.signature("hello world"), hasher.signature("Hello, world!"))
+        assert len(hasher.signature("")) == hasher.num_perm
+
+
+class TestFindDuplicates:
+    """Test cases for the find_duplicates function."""
+
+    def test_near_duplicates_point_to_first_copy(self):
+        """Test that later near-copies are mapped to the first one."""
+        rng = random.Random(1)
+        a, b = random_text(rng), random_text(rng)
+        texts = [a, b, edit(a, every=100), a, random_text(rng)]
+
+        assert find_duplicates(texts) == {2: 0, 3: 0}
+
+    def test_threshold(self):
+        """Test that a strict threshold only removes exact copies."""
+        a = random_text(random.Random(1))
+        assert find_duplicates([a, edit(a, every=100), a], threshold=1.0) == {2: 0}
+
+    def test_texts_without_words_are_kept(self):
+        """Test that texts without shingles are never duplicates of each other."""
+        texts = ['a b c', 'x', '!!!', '1 2 3', '| - |', '']
+
+        assert find_duplicates(texts) == {}
+        # texts with words next to them are still compared
+        assert find_duplicates(['alpha beta'] + texts + ['Alpha, beta!']) == {7: 0}
+
+    def test_bands_must_divide_signature(self):
+        """Test that an invalid LSH configuration is rejected."""
+        with pytest.raises(ValueError, match="must divide"):
+            find_duplicates(["text"], num_perm=100, bands=32)
+
+
+class TestDeduplicateDocuments:
+    """Test cases for the deduplicate_documents function."""
+
+    def test_deduplicate_chunks(self):
+        """Test that chunks of copied documents are removed."""
+        rng = random.Random(1)
+        documents = [{'content': random_text(rng, 600), 'filename': f'doc{i}.md'} for i in range(5)]
+        documents.append({**documents[0], 'filename': 'copy.md'})
+        chunks = chunk_offsets(documents, size=2000, step=1000)
+
+        kept, stats = deduplicate_documents(chunks)
+
+        assert isinstance(kept, ChunkedDocuments)
+        copies = sum(1 for chunk in chunks if chunk['filename'] == 'copy.md')
+        assert stats.removed_chunks == copies
+        assert stats.kept_chunks == len(kept) == len(chunks) - copies
+        assert all(chunk['filename'] != 'copy.md' for chunk in kept)
+        assert stats.saved_bytes == sum(
+            len(chunk['content'].encode('utf-8')) for chunk in chunks if chunk['filename'] == 'copy.md'
+        )
+
+    def test_deduplicate_plain_documents(self):
+        """Test deduplicating documents without chunking."""
+        documents = [
+            {'content': 'how do I install docker on windows', 'filename': 'a.md'},
+            {'content': 'How do I install Docker on Windows?', 'filename': 'b.md'},
+            {'content': 'postgres connection refused', 'filename': 'c.md'},
+        ]
+
+        kept, stats = deduplicate_documents(documents)
+
+        assert [doc['filename'] for doc in kept] == ['a.md', 'c.md']
+        assert stats.duplicates == {1: 0}
+        assert str(stats).startswith("removed 1 of 3 chunks")
+
+
+class TestIndexDocumentsDeduplication:
+    """Test cases for deduplication in index_documents."""
+
+    def make_documents(self):
+        rng = random.Random(3)
+        documents = [{'content': random_text(rng), 'filename': f'doc{i}.md'} for i in range(10)]
+        return documents + [{**doc, 'filename': f'copy{i}.md'} for i, doc in enumerate(documents[:4])]
+
+    def test_index_documents_deduplicate(self):
+        """Test that duplicates are dropped and stats are attached to the index."""
+        index = index_documents(self.make_documents(), deduplicate=True)
+
+        assert len(index.docs) == 10
+        assert index.deduplication_stats.removed_chunks == 4
+
+    @pytest.mark.parametrize("engine", ["minsearch", "bm25"])
+    def test_stats_survive_snapshots(self, tmp_path, engine):
+        """Test that a snapshot loaded from disk keeps its deduplication stats."""
+        documents = self.make_documents()
+        fitted = index_documents(documents, snapshot_dir=tmp_path, engine=engine, deduplicate=True)
+        loaded = index_documents(documents, snapshot_dir=tmp_path, engine=engine, deduplicate=True)
+
+        assert loaded is not fitted
+        assert loaded.deduplication_stats == fitted.deduplication_stats
+        assert isinstance(loaded.deduplication_stats, DeduplicationStats)
@@ -0,0 +1,139 @@
+"""
+Tests for common.incremental module.
+
+This module contains unit tests for the incremental index, including
+add/update/remove operations and parity with the minsearch Index.
+"""
+
+import random
+
+import pytest
+from minsearch import Index
+
+from common.incremental import IncrementalIndex
+
+
+def make_documents(num_docs=100, seed=1):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(200)]
+    return [
+        {
+            'content': ' '.join(rng.choices(words, k=40)),
+            'filename': f'doc{i}.md',
+            'section': rng.choice(['faq', 'guide']),
+        }
+        for i in range(num_docs)
+    ]
+
+
+def result_names(results):
+    return [doc['filename'] for doc in results]
+
+
+class TestIncrementalIndex:
+    """Test cases for the IncrementalIndex class."""
+
+    def test_fit_matches_minsearch(self):
+        """Test that a fitted index ranks documents like minsearch."""
+        documents = make_documents()
+        index = IncrementalIndex(['content', 'filename'], keyword_fields=['section']).fit(documents)
+        reference = Index(['content', 'filename'], keyword_fields=['section']).fit(documents)
+
+        for query in ['term1 term2', 'term50', 'doc7', 'term3 term3 term9']:
+            for filter_dict in [None, {'section': 'faq'}]:
+                assert result_names(index.search(query, filter_dict=filter_dict)) == \
+                    result_names(reference.search(query, filter_dict=filter_dict))
+
+    def test_incremental_changes_match_refit(self):
+        """Test that add/update/remove end up equivalent to a full refit."""
+        documents = make_documents()
+        index = IncrementalIndex(['content', 'filename'], reweight_threshold=0)
+        index.fit(documents[:80])
+
+        index.add(documents[80:])
+        index.remove(['doc5.md', 'doc6.md'])
+        changed = {**documents[10], 'content': 'term1 term2 brand new words'}
+        index.update([changed])
+
+        expected = [changed if d['filename'] == 'doc10.md' else d for d in documents]
+        expected = [d for d in expected if d['filename'] not in ('doc5.md', 'doc6.md')]
+        reference = Index(['content', 'filename']).fit(expected)
+
+        assert len(index) == len(expected)
+        for query in ['term1 term2', 'brand new', 'term120 term7', 'doc5']:
+            assert result_names(index.search(query)) == result_names(reference.search(query))
+
+    def test_add_existing_id_raises(self):
+        """Test that adding an already indexed document is rejected."""
+        index = IncrementalIndex(['content']).fit([{'content': 'text', 'filename': 'a.md'}])
+
+        with pytest.raises(ValueError, match="already indexed"):
+            index.add([{'content': 'other', 'filename': 'a.md'}])
+
+    def test_remove_unknown_id_is_ignored(self):
+        """Test that removing a missing document does nothing."""
+        index = IncrementalIndex(['content']).fit([{'content': 'text', 'filename': 'a.md'}])
+        index.remove(['missing.md'])
+        assert len(index) == 1
+
+    def test_removed_documents_are_not_returned(self):
+        """Test that removed documents disappear from results."""
+        index = IncrementalIndex(['content']).fit([
+            {'content': 'docker setup', 'filename': 'a.md'},
+            {'content': 'docker compose', 'filename': 'b.md'},
+        ])
+        index.remove(['a.md'])
+
+        assert result_names(index.search('docker')) == ['b.md']
+        assert 'a.md' not in index
+        assert result_names(index.docs) == ['b.md']
+
+    def test_update_replaces_all_chunks(self):
+        """Test that updating a chunked document replaces all of its chunks."""
+        index = IncrementalIndex(
+            ['content'],
+            chunk=True,
+            chunking_params={'size': 20, 'step': 10},
+        )
+        index.fit([{'content': 'postgres ' * 10, 'filename': 'a.md'}])
+        assert len(index) > 1
+
+        index.update([{'content': 'docker only', 'filename': 'a.md'}])
+
+        assert len(index) == 1
+        assert index.search('postgres') == []
+        assert index.search('docker')[0]['content'] == 'docker only'
+
+    def test_slots_are_reused(self):
+        """Test that removing and adding documents doesn't grow storage."""
+        index = IncrementalIndex(['content']).fit(make_documents(10))
+        for i in range(5):
+            index.update([{'content': f'version {i}', 'filename': 'doc1.md'}])
+
+        assert len(index._slots) == 10
+        assert result_names(index.search('version 4')) == ['doc1.md']
+
+    def test_version_changes_on_updates(self):
+        """Test that every change bumps the version."""
+        index = IncrementalIndex(['content'])
+        versions = [index.version]
+
+        index.add([{'content': 'text', 'filename': 'a.md'}])
+        versions.append(index.version)
+        index.update([{'content': 'new text', 'filename': 'a.md'}])
+        versions.append(index.version)
+        index.remove(['a.md'])
+        versions.append(index.version)
+
+        assert versions == sorted(set(versions))
+
+    def test_output_ids(self):
+        """Test that output_ids adds the internal document id."""
+        index = IncrementalIndex(['content']).fit([{'content': 'text', 'filename': 'a.md'}])
+        assert index.search('text', output_ids=True) == [
+            {'content': 'text', 'filename': 'a.md', '_id': 0}
+        ]
+
+    def test_empty_index(self):
+        """Test searching an empty index."""
+        assert IncrementalIndex(['content']).search('anything') == []
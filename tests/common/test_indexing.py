@@ -5,8 +5,23 @@ This module contains unit tests for the document indexing functionality,
 including minsearch integration and chunking support.
 """
 
+import json
+import os
+
+import numpy as np
+import pytest
 from minsearch import Index
-from common.indexing import index_documents
+from common.indexing import (
+    index_documents,
+    save_index,
+    load_index,
+    documents_fingerprint,
+    score_documents,
+    top_k,
+    rank_many,
+    search_many,
+)
+from common.incremental import IncrementalIndex
 
 
 class TestIndexDocuments:
@@ -54,6 +69,20 @@ class TestIndexDocuments:
         # Verify that chunks have start positions (indicating they were chunked)
         assert any('start' in doc for doc in search_results)
 
+    @pytest.mark.parametrize("engine", ['minsearch', 'bm25'])
+    def test_chunked_results_are_plain_dicts(self, engine):
+        """Test that results of a chunked index can be copied, modified and serialized."""
+        docs = [{'content': 'This is a very long document. ' * 100, 'filename': 'long_doc.txt'}]
+        index = index_documents(docs, chunk=True, chunking_params={'size': 100, 'step': 50}, engine=engine)
+
+        results = index.search('very long document', num_results=3)
+
+        assert all(type(doc) is dict for doc in results)
+        assert json.loads(json.dumps(results)) == results
+        results[0]['score'] = 1.0
+        assert 'score' not in index.search('very long document', num_results=3)[0]
+        assert json.dumps(search_many(index, ['long document'], output_ids=True))
+
     def test_index_documents_custom_chunking_params(self):
         """Test document indexing with custom chunking parameters."""
         documents = [{'content': 'Test content for custom chunking parameters', 'filename': 'test.txt'}]
@@ -207,4 +236,203 @@ class TestIndexDocuments:
             assert doc['filename'] == 'custom.txt'
             assert doc['title'] == 'Custom Field Test'
             # Should have start field from chunking
-            assert 'start' in doc
\ No newline at end of file
+            assert 'start' in doc
+
+    def test_index_documents_boundary_chunking(self):
+        """Test selecting the boundary chunking mode through chunking_params."""
+        documents = [{
+            'content': 'First sentence about docker. ' * 20 + '\n\n' + 'Postgres setup guide. ' * 20,
+            'filename': 'guide.md'
+        }]
+
+        chunking_params = {'size': 200, 'step': 200, 'mode': 'boundary'}
+        result = index_documents(documents, chunk=True, chunking_params=chunking_params)
+
+        search_results = result.search('postgres')
+        assert len(search_results) >= 1
+        assert all(doc['content'].startswith(('First', 'Postgres')) for doc in search_results)
+
+
+
+class TestScoreDocuments:
+    """Test cases for score_documents and top_k."""
+
+    documents = [
+        {'content': 'Python is a programming language', 'filename': 'python.txt', 'kind': 'a'},
+        {'content': 'Java is also a programming language', 'filename': 'java.txt', 'kind': 'b'},
+        {'content': 'JavaScript is used for web development', 'filename': 'js.txt', 'kind': 'a'}
+    ]
+
+    def test_scores_match_search_order(self):
+        """Test that ranking by scores gives the same results as Index.search."""
+        index = index_documents(self.documents)
+        for query in ['programming', 'python language', 'web', 'missing']:
+            positions = top_k(score_documents(index, query), 10)
+            assert [self.documents[i] for i in positions] == index.search(query)
+
+    def test_scores_with_filter_and_boost(self):
+        """Test that filters zero out scores and boosts scale them."""
+        index = Index(text_fields=['content', 'filename'], keyword_fields=['kind']).fit(self.documents)
+
+        scores = score_documents(index, 'programming', filter_dict={'kind': 'a'})
+        assert scores[0] > 0
+        assert scores[1] == 0
+
+        boosted = score_documents(index, 'programming', boost_dict={'content': 2, 'filename': 0})
+        plain = score_documents(index, 'programming', boost_dict={'filename': 0})
+        assert boosted == pytest.approx(plain * 2)
+
+    def test_top_k(self):
+        """Test selecting the best non-zero scores."""
+        scores = np.array([0.1, 0.0, 0.5, 0.3, 0.2])
+        assert list(top_k(scores, 2)) == [2, 3]
+        assert list(top_k(scores, 10)) == [2, 3, 4, 0]
+        assert list(top_k(scores, 0)) == []
+
+
+class TestSearchMany:
+    """Test cases for batched multi-query search."""
+
+    documents = [
+        {'content': 'Python is a programming language', 'filename': 'python.txt', 'kind': 'a'},
+        {'content': 'Java is also a programming language', 'filename': 'java.txt', 'kind': 'b'},
+        {'content': 'JavaScript is used for web development', 'filename': 'js.txt', 'kind': 'a'},
+        {'content': 'Docker runs containers for development', 'filename': 'docker.txt', 'kind': 'b'},
+    ]
+    queries = ['programming', 'web development', 'python docker', 'nothing', 'Language java']
+
+    def test_search_many_matches_search(self):
+        """Test that batched results are identical to one search per query."""
+        index = Index(text_fields=['content', 'filename'], keyword_fields=['kind']).fit(self.documents)
+
+        for params in [{}, {'filter_dict': {'kind': 'b'}}, {'boost_dict': {'filename': 3}}, {'num_results': 1}]:
+            expected = [index.search(q, **params) for q in self.queries]
+            assert search_many(index, self.queries, **params) == expected
+
+    def test_search_many_small_batches(self):
+        """Test that results don't depend on the batch size."""
+        index = index_documents(self.documents)
+        assert search_many(index, self.queries, batch_size=2) == search_many(index, self.queries)
+
+    def test_search_many_output_ids(self):
+        """Test that output_ids adds document positions."""
+        index = index_documents(self.documents)
+        results = search_many(index, ['docker'], output_ids=True)
+        assert results == [[{**self.documents[3], '_id': 3}]]
+
+    def test_search_many_other_indexes(self):
+        """Test the per-query fallback for indexes without batched scoring."""
+        index = IncrementalIndex(['content', 'filename']).fit(self.documents)
+        expected = [index.search(q) for q in self.queries]
+        assert search_many(index, self.queries) == expected
+
+    def test_search_many_empty(self):
+        """Test empty query lists and empty indexes."""
+        assert search_many(index_documents(self.documents), []) == []
+        assert search_many(index_documents([]), ['a', 'b']) == [[], []]
+
+    def test_rank_many_returns_scores(self):
+        """Test that rank_many yields positions with descending scores."""
+        index = index_documents(self.documents)
+        [(positions, scores)] = list(rank_many(index, ['development']))
+
+        assert sorted(positions) == [2, 3]
+        assert list(scores) == sorted(scores, reverse=True)
+
+
+class TestIndexSnapshots:
+    """Test cases for saving and loading index snapshots."""
+
+    documents = [
+        {'content': 'Python is a programming language', 'filename': 'python.txt'},
+        {'content': 'Java is also a programming language', 'filename': 'java.txt'},
+        {'content': 'JavaScript is used for web development', 'filename': 'js.txt'}
+    ]
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        """Test that a loaded index returns the same results."""
+        index = index_documents(self.documents)
+        save_index(index, tmp_path / "snapshot")
+
+        loaded = load_index(tmp_path / "snapshot")
+
+        assert isinstance(loaded, Index)
+        for query in ['programming', 'Python', 'web development', 'nothing']:
+            assert loaded.search(query) == index.search(query)
+
+    def test_load_memory_maps_matrices(self, tmp_path):
+        """Test that TF-IDF matrices are memory-mapped on load."""
+        save_index(index_documents(self.documents), tmp_path / "snapshot")
+
+        loaded = load_index(tmp_path / "snapshot")
+
+        matrix = loaded.text_matrices['content']
+        # read-only views over the mapped files, not in-memory copies
+        assert not matrix.data.flags.writeable
+        assert not matrix.indices.flags.writeable
+
+    def test_roundtrip_chunked_index(self, tmp_path):
+        """Test snapshots of indexes with lazy chunks."""
+        documents = [{'content': 'This is a very long document. ' * 20, 'filename': 'long.txt'}]
+        index = index_documents(documents, chunk=True, chunking_params={'size': 100, 'step': 50})
+        save_index(index, tmp_path / "snapshot")
+
+        loaded = load_index(tmp_path / "snapshot")
+
+        assert len(loaded.docs) == len(index.docs)
+        assert [dict(d) for d in loaded.search('long document')] == \
+            [dict(d) for d in index.search('long document')]
+
+    def test_index_documents_reuses_snapshot(self, tmp_path, monkeypatch):
+        """Test that indexing the same documents twice loads the snapshot."""
+        index_documents(self.documents, snapshot_dir=tmp_path)
+        assert len(list(tmp_path.iterdir())) == 1
+
+        def fail_fit(self, docs):
+            raise AssertionError("index should be loaded from the snapshot")
+
+        monkeypatch.setattr(Index, 'fit', fail_fit)
+        loaded = index_documents(self.documents, snapshot_dir=tmp_path)
+
+        assert loaded.search('Python')[0]['filename'] == 'python.txt'
+
+    def test_snapshot_key_depends_on_input(self, tmp_path):
+        """Test that changed documents or parameters create a new snapshot."""
+        index_documents(self.documents, snapshot_dir=tmp_path)
+        index_documents(self.documents[:2], snapshot_dir=tmp_path)
+        index_documents(self.documents, chunk=True, snapshot_dir=tmp_path)
+
+        assert len(list(tmp_path.iterdir())) == 3
+
+    def test_old_snapshots_are_pruned(self, tmp_path):
+        """Test that only the most recently used snapshots are kept."""
+        index_documents(self.documents, snapshot_dir=tmp_path, keep_snapshots=2)
+        [first] = tmp_path.iterdir()
+        index_documents(self.documents[:2], snapshot_dir=tmp_path, keep_snapshots=2)
+        [second] = set(tmp_path.iterdir()) - {first}
+
+        # loading the older one marks it as used
+        os.utime(first, ns=(0, 0))
+        os.utime(second, ns=(1, 1))
+        index_documents(self.documents, snapshot_dir=tmp_path, keep_snapshots=2)
+        index_documents(self.documents[:1], snapshot_dir=tmp_path, keep_snapshots=2)
+
+        remaining = set(tmp_path.iterdir())
+        assert len(remaining) == 2
+        assert first in remaining
+        assert second not in remaining
+
+    def test_keep_all_snapshots(self, tmp_path):
+        """Test that keep_snapshots=None never prunes."""
+        for n in range(1, 4):
+            index_documents(self.documents[:n], snapshot_dir=tmp_path, keep_snapshots=None)
+
+        assert len(list(tmp_path.iterdir())) == 3
+
+    def test_fingerprint_is_stable(self):
+        """Test that the fingerprint only depends on content, not key order."""
+        a = [{'content': 'text', 'filename': 'a.txt'}]
+        b = [{'filename': 'a.txt', 'content': 'text'}]
+
+        assert documents_fingerprint(a, chunk=False) == documents_fingerprint(b, chunk=False)
+        assert documents_fingerprint(a, chunk=False) != documents_fingerprint(a, chunk=True)
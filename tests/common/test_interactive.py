@@ -0,0 +1,150 @@
+"""
+Tests for common.interactive module.
+
+This module contains unit tests for the query result cache and the
+cached search of InteractiveSearch.
+"""
+
+import time
+
+from common.incremental import IncrementalIndex
+from common.interactive import InteractiveSearch, QueryCache
+
+
+class CountingIndex:
+    """A fake index that records every search call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10):
+        self.calls.append((query, filter_dict, boost_dict, num_results))
+        return [{'content': f'result for {query}', 'filename': 'doc.md'}]
+
+
+class DummySearch(InteractiveSearch):
+
+    def load_data(self):
+        return CountingIndex()
+
+
+def make_app(**kwargs):
+    app = DummySearch(
+        app_title="Test",
+        app_description="Test app",
+        sample_questions=["question"],
+        **kwargs,
+    )
+    app.index = app.load_data()
+    return app
+
+
+class TestQueryCache:
+    """Test cases for the QueryCache class."""
+
+    def test_make_key_normalizes_query(self):
+        """Test that case and whitespace don't change the key."""
+        assert QueryCache.make_key("How  to install Docker? ") == \
+            QueryCache.make_key("how to install docker?")
+
+    def test_make_key_includes_parameters(self):
+        """Test that filters, boosts and num_results are part of the key."""
+        base = QueryCache.make_key("docker")
+        assert QueryCache.make_key("docker", filter_dict={'course': 'de'}) != base
+        assert QueryCache.make_key("docker", boost_dict={'content': 2}) != base
+        assert QueryCache.make_key("docker", num_results=5) != base
+        assert QueryCache.make_key("docker", filter_dict={'a': 1, 'b': 2}) == \
+            QueryCache.make_key("docker", filter_dict={'b': 2, 'a': 1})
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = QueryCache(max_size=2)
+        cache.set('a', [1])
+        cache.set('b', [2])
+        cache.get('a')
+        cache.set('c', [3])
+
+        assert cache.get('a') == [1]
+        assert cache.get('b') is None
+        assert cache.get('c') == [3]
+
+    def test_ttl_expiration(self):
+        """Test that entries expire after the time to live."""
+        cache = QueryCache(ttl=0.01)
+        cache.set('a', [1])
+        assert cache.get('a') == [1]
+
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_hit_and_miss_counters(self):
+        """Test the hit/miss statistics."""
+        cache = QueryCache()
+        cache.get('a')
+        cache.set('a', [1])
+        cache.get('a')
+        cache.get('a')
+
+        assert cache.hits == 2
+        assert cache.misses == 1
+        assert cache.hit_rate == 2 / 3
+
+
+class TestInteractiveSearchCache:
+    """Test cases for cached searches in InteractiveSearch."""
+
+    def test_repeated_queries_are_cached(self):
+        """Test that the same query only reaches the index once."""
+        app = make_app()
+
+        first = app.search("How to install Docker?")
+        second = app.search("how to install  docker?")
+
+        assert first == second
+        assert len(app.index.calls) == 1
+        assert app.query_cache.hits == 1
+
+    def test_search_parameters_are_passed_through(self):
+        """Test that filters and boosts reach the index and split the cache."""
+        app = make_app()
+
+        app.search("docker", filter_dict={'course': 'de'}, boost_dict={'content': 2}, num_results=5)
+        app.search("docker")
+
+        assert app.index.calls == [
+            ("docker", {'course': 'de'}, {'content': 2}, 5),
+            ("docker", None, None, 10),
+        ]
+
+    def test_new_index_invalidates_cache(self):
+        """Test that replacing the index clears cached results."""
+        app = make_app()
+        app.search("docker")
+
+        app.index = CountingIndex()
+        app.search("docker")
+
+        assert len(app.index.calls) == 1
+
+    def test_index_update_invalidates_cache(self):
+        """Test that in-place updates of a versioned index clear cached results."""
+        app = make_app()
+        app.index = IncrementalIndex(['content']).fit([{'content': 'docker setup', 'filename': 'a.md'}])
+
+        assert len(app.search("docker")) == 1
+        app.index.add([{'content': 'docker compose', 'filename': 'b.md'}])
+
+        assert len(app.search("docker")) == 2
+
+    def test_cached_results_are_not_shared(self):
+        """Test that modifying returned results doesn't affect the cache."""
+        app = make_app()
+        app.search("docker").clear()
+        assert len(app.search("docker")) == 1
+
+    def test_cache_size_and_ttl_are_configurable(self):
+        """Test passing cache settings through the constructor."""
+        app = make_app(cache_size=5, cache_ttl=60)
+        assert app.query_cache.max_size == 5
+        assert app.query_cache.ttl == 60
@@ -0,0 +1,275 @@
+"""
+Tests for common.llm module.
+
+This module contains unit tests for the LLM helpers, including the
+content-addressed LLM result cache, the prompt registry and the
+rate-limited async client, which is tested against a local fake of the
+OpenAI API.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import pytest
+from openai import APIConnectionError, AsyncOpenAI, BadRequestError, RateLimitError
+from petcache import PetCache
+
+from common.llm import (
+    PROMPTS,
+    AsyncOpenAIResponsesWrapper,
+    LLMCache,
+    PromptRegistry,
+    TokenBucket,
+    read_prompt,
+)
+from tests.common.openai_server import FakeOpenAIServer
+
+
+class TestLLMCache:
+    """Test cases for the LLMCache class."""
+
+    def test_key_depends_on_model_prompt_and_content(self):
+        """Test that changing any part of the input changes the key."""
+        key = LLMCache.make_key("model", "prompt", "content")
+
+        assert key == LLMCache.make_key("model", "prompt", "content")
+        assert key != LLMCache.make_key("other", "prompt", "content")
+        assert key != LLMCache.make_key("model", "other", "content")
+        assert key != LLMCache.make_key("model", "prompt", "other")
+
+    def test_key_parts_are_separated(self):
+        """Test that moving text between parts changes the key."""
+        assert LLMCache.make_key("m", "ab", "c") != LLMCache.make_key("m", "a", "bc")
+
+    def test_hit_rate(self, tmp_path):
+        """Test that hits and misses are counted."""
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+        key = LLMCache.make_key("model", "prompt", "content")
+
+        assert cache.get(key) is None
+        cache.set(key, "result")
+        assert cache.get(key) == "result"
+        assert cache.get(key) == "result"
+
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert cache.hit_rate == 2 / 3
+        assert str(cache) == "2 hits, 1 misses (67% hit rate)"
+
+    def test_fallback_keys_count_once(self, tmp_path):
+        """Test that a lookup with fallback keys is one hit or one miss."""
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+        first, second = LLMCache.make_key("m", "a", "c"), LLMCache.make_key("m", "b", "c")
+
+        assert cache.get(first, second) is None
+        cache.set(second, "from second")
+        assert cache.get(first, second) == "from second"
+        cache.set(first, "from first")
+        assert cache.get(first, second) == "from first"
+
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_empty_hit_rate(self):
+        """Test the hit rate before any lookups."""
+        assert LLMCache(store=None).hit_rate == 0.0
+
+
+def make_llm(server, **kwargs):
+    client = AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+    return AsyncOpenAIResponsesWrapper(client, **kwargs)
+
+
+@pytest.fixture
+def openai_server():
+    server = FakeOpenAIServer()
+    yield server
+    server.close()
+
+
+class TestTokenBucket:
+    """Test cases for the TokenBucket class."""
+
+    def test_burst_then_rate(self):
+        """Test that a full bucket allows a burst and then refills at the rate."""
+        async def run():
+            bucket = TokenBucket(per_minute=600, capacity=2)
+            start = time.monotonic()
+            for _ in range(5):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        # 2 tokens right away, then 3 more at 10 per second
+        assert 0.25 <= asyncio.run(run()) < 1.0
+
+    def test_large_request_is_capped_at_capacity(self):
+        """Test that a request larger than the bucket doesn't wait forever."""
+        async def run():
+            bucket = TokenBucket(per_minute=60, capacity=5)
+            await asyncio.wait_for(bucket.acquire(100), timeout=1)
+            return bucket.tokens
+
+        assert asyncio.run(run()) < 1
+
+    def test_adjust(self):
+        """Test that adjusting refunds tokens up to the capacity and can go into debt."""
+        bucket = TokenBucket(per_minute=60, capacity=10)
+
+        bucket.adjust(-5)
+        assert bucket.tokens == 10
+
+        bucket.adjust(15)
+        assert bucket.tokens < 0
+
+
+class TestAsyncOpenAIResponsesWrapper:
+    """Test cases for AsyncOpenAIResponsesWrapper against a local fake endpoint."""
+
+    def test_returns_output_text(self, openai_server):
+        """Test a single request."""
+        llm = make_llm(openai_server)
+
+        assert asyncio.run(llm("instructions", "hello")) == "echo: hello"
+        assert llm.requests == 1
+
+    def test_concurrency_is_limited(self, openai_server):
+        """Test that no more than max_concurrency requests are in flight."""
+        openai_server.delay = 0.05
+        llm = make_llm(openai_server, requests_per_minute=60_000, max_concurrency=3)
+
+        async def run():
+            return await asyncio.gather(*(llm("i", str(n)) for n in range(12)))
+
+        results = asyncio.run(run())
+
+        assert results == [f"echo: {n}" for n in range(12)]
+        assert openai_server.max_in_flight == 3
+
+    def test_requests_per_minute(self, openai_server):
+        """Test that requests are spread out to stay within the request rate."""
+        # no burst, 1 request every 0.1 seconds
+        llm = make_llm(openai_server)
+        llm.request_bucket = TokenBucket(per_minute=600, capacity=1)
+
+        async def run():
+            await asyncio.gather(*(llm("i", str(n)) for n in range(4)))
+
+        asyncio.run(run())
+
+        times = openai_server.times
+        assert times[-1] - times[0] >= 0.25
+
+    def test_retries_after_rate_limit(self, openai_server):
+        """Test that a 429 is retried after the delay the server asks for."""
+        openai_server.rate_limited = 2
+        openai_server.retry_after = "0.2"
+        llm = make_llm(openai_server)
+
+        assert asyncio.run(llm("i", "hello")) == "echo: hello"
+        assert (llm.requests, llm.rate_limited) == (1, 2)
+
+        times = openai_server.times
+        assert times[1] - times[0] >= 0.2
+        assert times[2] - times[1] >= 0.2
+
+    def test_gives_up_after_max_retries(self, openai_server):
+        """Test that the rate limit error is raised once the retries are used up."""
+        openai_server.rate_limited = 10
+        openai_server.retry_after = "0"
+        llm = make_llm(openai_server, max_retries=2)
+
+        with pytest.raises(RateLimitError):
+            asyncio.run(llm("i", "hello"))
+        assert len(openai_server.times) == 3
+
+    def test_retries_server_errors(self, openai_server):
+        """Test that 5xx responses are retried like rate limits."""
+        openai_server.failures = [500, 503]
+        llm = make_llm(openai_server)
+
+        assert asyncio.run(llm("i", "hello")) == "echo: hello"
+        assert (llm.requests, llm.failed_attempts, llm.rate_limited) == (1, 2, 0)
+        assert len(openai_server.times) == 3
+
+    def test_retries_connection_errors(self):
+        """Test that a failed connection is retried and raised once the retries are used up."""
+        server = FakeOpenAIServer()
+        base_url = server.base_url
+        server.close()
+
+        client = AsyncOpenAI(base_url=base_url, api_key="test", max_retries=0)
+        llm = AsyncOpenAIResponsesWrapper(client, max_retries=1)
+        llm._retry_delay = lambda error, attempt: 0
+
+        with pytest.raises(APIConnectionError):
+            asyncio.run(llm("i", "hello"))
+        assert llm.failed_attempts == 2
+
+    def test_client_errors_are_not_retried(self, openai_server):
+        """Test that a 4xx other than 429 is raised at once."""
+        openai_server.failures = [400]
+        llm = make_llm(openai_server)
+
+        with pytest.raises(BadRequestError):
+            asyncio.run(llm("i", "hello"))
+        assert len(openai_server.times) == 1
+
+    def test_token_usage_is_reconciled(self, openai_server):
+        """Test that the token bucket is charged with the actual usage."""
+        openai_server.total_tokens = 1000
+        llm = make_llm(openai_server, tokens_per_minute=60_000)
+
+        asyncio.run(llm("i", "hello"))
+
+        # 10,000 tokens of capacity, 1,000 used by the response
+        assert 8900 < llm.token_bucket.tokens < 9100
+
+
+class TestPromptRegistry:
+    """Test cases for the PromptRegistry class."""
+
+    def test_loaded_once(self, tmp_path):
+        """Test that a prompt is read from disk only once."""
+        path = tmp_path / "prompt.md"
+        path.write_text("  Be concise.\n", encoding="utf-8")
+        registry = PromptRegistry()
+
+        prompt = registry.get(path)
+        assert registry.get(str(path)) is prompt
+
+        assert prompt.text == "Be concise."
+        assert prompt.sha256 == hashlib.sha256(b"Be concise.").hexdigest()
+        assert registry.loads == 1
+
+    def test_reloaded_when_changed(self, tmp_path):
+        """Test that an edited prompt is picked up, with a new hash."""
+        path = tmp_path / "prompt.md"
+        path.write_text("v1", encoding="utf-8")
+        registry = PromptRegistry()
+        first = registry.get(path)
+
+        path.write_text("v2", encoding="utf-8")
+        os.utime(path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+        second = registry.get(path)
+
+        assert second.text == "v2"
+        assert second.sha256 != first.sha256
+        assert registry.loads == 2
+
+    def test_no_reload(self, tmp_path):
+        """Test that with reload=False the file isn't checked again."""
+        path = tmp_path / "prompt.md"
+        path.write_text("v1", encoding="utf-8")
+        registry = PromptRegistry(reload=False)
+        registry.get(path)
+
+        path.unlink()
+        assert registry.text(path) == "v1"
+
+    def test_read_prompt_is_relative_to_caller(self):
+        """Test that read_prompt resolves paths from the calling file."""
+        text = read_prompt("../../github_code/_code_doc.md")
+
+        assert text.startswith("You are given a piece of source code.")
+        assert text == PROMPTS.text(Path(__file__).resolve().parents[2] / "github_code" / "_code_doc.md")
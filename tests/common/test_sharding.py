@@ -0,0 +1,106 @@
+"""
+Tests for common.sharding module.
+
+This module contains unit tests for the sharded index, including shard
+assignment, parallel fitting and merging of per-shard results.
+"""
+
+import pickle
+
+import pytest
+from minsearch import Index
+
+from common.sharding import ShardedIndex, shard_for
+
+
+DOCUMENTS = [
+    {'content': 'Python is a programming language', 'filename': 'python.txt', 'kind': 'lang'},
+    {'content': 'Java is also a programming language', 'filename': 'java.txt', 'kind': 'lang'},
+    {'content': 'JavaScript is used for web development', 'filename': 'js.txt', 'kind': 'web'},
+    {'content': 'Docker runs containers', 'filename': 'docker.txt', 'kind': 'tool'},
+    {'content': 'Postgres is a database', 'filename': 'postgres.txt', 'kind': 'tool'},
+    {'content': 'Programming with Docker and Python', 'filename': 'mix.txt', 'kind': 'tool'},
+]
+
+
+@pytest.fixture(scope="module")
+def sharded_index():
+    index = ShardedIndex(
+        text_fields=['content', 'filename'],
+        keyword_fields=['kind'],
+        num_shards=3,
+        max_workers=2,
+    ).fit(DOCUMENTS)
+    yield index
+    index.shutdown()
+
+
+class TestShardFor:
+    """Test cases for the shard_for function."""
+
+    def test_shard_for_is_stable(self):
+        """Test that shard assignment is deterministic and in range."""
+        assert shard_for('python.txt', 4) == shard_for('python.txt', 4)
+        assert all(0 <= shard_for(doc['filename'], 3) < 3 for doc in DOCUMENTS)
+
+
+class TestShardedIndex:
+    """Test cases for the ShardedIndex class."""
+
+    def test_documents_are_split_across_shards(self, sharded_index):
+        """Test that every document ends up in exactly one shard."""
+        assert len(sharded_index.shards) == 3
+        assert sum(len(shard.docs) for shard in sharded_index.shards) == len(DOCUMENTS)
+
+    def test_search_finds_documents_in_all_shards(self, sharded_index):
+        """Test that results from all shards are merged."""
+        results = sharded_index.search('programming', num_results=10)
+        assert {doc['filename'] for doc in results} == {'python.txt', 'java.txt', 'mix.txt'}
+
+    def test_search_respects_num_results(self, sharded_index):
+        """Test that the merged results are limited to num_results."""
+        assert len(sharded_index.search('programming', num_results=2)) == 2
+
+    def test_search_with_filter(self, sharded_index):
+        """Test keyword filters across shards."""
+        results = sharded_index.search('programming', filter_dict={'kind': 'tool'})
+        assert [doc['filename'] for doc in results] == ['mix.txt']
+
+    def test_search_output_ids(self, sharded_index):
+        """Test that '_id' is the position in the original document list."""
+        results = sharded_index.search('postgres', output_ids=True)
+        assert results[0]['_id'] == 4
+        assert results[0]['filename'] == 'postgres.txt'
+
+    def test_search_many_matches_search(self, sharded_index):
+        """Test that batched search gives the same results as single searches."""
+        queries = ['programming', 'python docker', 'database', 'nothing here']
+        expected = [sharded_index.search(q, num_results=3) for q in queries]
+
+        assert sharded_index.search_many(queries, num_results=3) == expected
+
+    def test_single_shard_matches_minsearch(self):
+        """Test that one shard gives the same results as a plain Index."""
+        sharded = ShardedIndex(['content', 'filename'], num_shards=1, max_workers=1).fit(DOCUMENTS)
+        reference = Index(['content', 'filename']).fit(DOCUMENTS)
+
+        for query in ['programming', 'python docker', 'database']:
+            assert sharded.search(query) == reference.search(query)
+        sharded.shutdown()
+
+    def test_empty_index(self):
+        """Test searching an index without documents."""
+        index = ShardedIndex(['content'], num_shards=2, max_workers=1).fit([])
+        assert index.search('anything') == []
+
+    def test_can_be_pickled(self, sharded_index):
+        """Test that a fitted index can be pickled after searching."""
+        sharded_index.search('python')
+        restored = pickle.loads(pickle.dumps(sharded_index))
+        assert restored.search('postgres')[0]['filename'] == 'postgres.txt'
+        restored.shutdown()
+
+    def test_invalid_num_shards(self):
+        """Test that the number of shards must be positive."""
+        with pytest.raises(ValueError, match="num_shards must be positive"):
+            ShardedIndex(['content'], num_shards=0)
@@ -0,0 +1,136 @@
+"""
+Tests for common.sqlite_cache module.
+
+This module contains unit tests for the SQLite cache with batched writes,
+including compatibility with PetCache databases.
+"""
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from petcache import PetCache
+
+from common.llm import LLMCache
+from common.sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+class TestSQLiteCache:
+    """Test cases for the SQLiteCache class."""
+
+    def test_set_and_get(self, db_path):
+        """Test that values are readable at once and persisted on close."""
+        with SQLiteCache(db_path) as cache:
+            cache.set("a", "1")
+            assert cache.get("a") == "1"
+            assert cache.get("missing") is None
+            assert "a" in cache
+
+        with SQLiteCache(db_path) as cache:
+            assert cache.get("a") == "1"
+            assert len(cache) == 1
+
+    def test_overwrite(self, db_path):
+        """Test that the latest value wins."""
+        with SQLiteCache(db_path) as cache:
+            cache.set("a", "1")
+            cache.flush()
+            cache.set("a", "2")
+
+        with SQLiteCache(db_path) as cache:
+            assert cache.get("a") == "2"
+
+    def test_wal_mode(self, db_path):
+        """Test that the database is switched to write-ahead logging."""
+        SQLiteCache(db_path).close()
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_writes_are_batched(self, db_path):
+        """Test that queued sets are committed together."""
+        with SQLiteCache(db_path, batch_size=1000) as cache:
+            for i in range(500):
+                cache.set(f"k{i}", str(i))
+            cache.flush()
+
+            # all values were written, in far fewer transactions than sets
+            with sqlite3.connect(db_path) as conn:
+                assert conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 500
+            assert 1 <= cache.write_transactions < 250
+
+    def test_get_many(self, db_path):
+        """Test bulk reads, across query chunks and including keys only in memory."""
+        with SQLiteCache(db_path) as cache:
+            for i in range(1200):
+                cache.set(f"k{i}", str(i))
+
+        with SQLiteCache(db_path) as cache:
+            cache.set("new", "value")
+            keys = [f"k{i}" for i in range(0, 1300, 3)] + ["new", "missing"]
+
+            found = cache.get_many(keys)
+
+            assert found["new"] == "value"
+            assert found["k3"] == "3"
+            assert "missing" not in found
+            assert len(found) == len(range(0, 1200, 3)) + 1
+
+    def test_prefetch(self, db_path):
+        """Test that prefetched keys are served from memory."""
+        with SQLiteCache(db_path) as cache:
+            cache.set("a", "1")
+
+        with SQLiteCache(db_path) as cache:
+            assert cache.prefetch(["a", "b"]) == 1
+
+            # a value changed by another process isn't read again
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("UPDATE cache SET value = 'changed' WHERE key = 'a'")
+            assert cache.get("a") == "1"
+
+    def test_concurrent_writers(self, db_path):
+        """Test that many threads can set and get at the same time."""
+        with SQLiteCache(db_path) as cache:
+            def work(i):
+                cache.set(f"k{i}", str(i))
+                return cache.get(f"k{i}")
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(work, range(1000)))
+
+        assert results == [str(i) for i in range(1000)]
+        with SQLiteCache(db_path) as cache:
+            assert len(cache) == 1000
+
+    def test_set_after_close(self, db_path):
+        cache = SQLiteCache(db_path)
+        cache.close()
+
+        with pytest.raises(RuntimeError):
+            cache.set("a", "1")
+
+    def test_compatible_with_petcache(self, db_path):
+        """Test that both caches read each other's databases."""
+        PetCache(db_path).set("from-petcache", "1")
+
+        with SQLiteCache(db_path) as cache:
+            assert cache.get("from-petcache") == "1"
+            cache.set("from-sqlite-cache", "2")
+
+        assert PetCache(db_path).get("from-sqlite-cache") == "2"
+
+    def test_llm_cache_prefetch(self, db_path):
+        """Test that LLMCache prefetches through the store."""
+        with SQLiteCache(db_path) as store:
+            store.set("a", "1")
+
+        with SQLiteCache(db_path) as store:
+            assert LLMCache(store).prefetch(["a", "b"]) == 1
+
+        assert LLMCache(PetCache(db_path)).prefetch(["a"]) == 0
@@ -0,0 +1,18 @@
+"""
+Tests for common.text module.
+"""
+
+from common.text import tokenize
+
+
+class TestTokenize:
+    """Test cases for the tokenize function."""
+
+    def test_tokenize_matches_vectorizer(self):
+        """Test that tokenization mirrors the sklearn default pattern."""
+        assert tokenize("Hello, World! a 42 x_y") == ['hello', 'world', '42', 'x_y']
+
+    def test_tokenize_empty(self):
+        """Test tokenizing empty and missing text."""
+        assert tokenize("") == []
+        assert tokenize(None) == []
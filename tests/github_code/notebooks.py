@@ -0,0 +1,91 @@
+"""
+A generated corpus of notebooks for comparing converters.
+"""
+
+import random
+
+import nbformat
+from nbformat.v4 import (
+    new_code_cell,
+    new_markdown_cell,
+    new_notebook,
+    new_output,
+    new_raw_cell,
+)
+
+
+WORDS = ["data", "pipeline", "spark", "kafka", "`code`", "**bold**", "ünïcode", "数据", "$x^2$", "|", "```"]
+
+
+def _text(rng, lines):
+    return "\n".join(" ".join(rng.choices(WORDS, k=rng.randint(0, 8))) for _ in range(lines))
+
+
+def _code_cell(rng):
+    source = rng.choice([
+        "import pandas as pd\ndf = pd.read_csv('data.csv')\ndf.head()",
+        "",
+        "%%bash\nls -la\n",
+        "  %%sql SELECT 1",
+        "%%R\nsummary(df)",
+        "%%bash",
+        "def f(x):\n    return x * 2\n\n\n",
+        "print('```')",
+        "  indented = True",
+    ])
+    outputs = rng.choice([
+        [],
+        [new_output("stream", name="stdout", text="hello\n")],
+        [new_output("execute_result", data={"text/plain": "42", "text/html": "<b>42</b>"}, execution_count=1)],
+        [new_output("display_data", data={"image/png": "iVBORw0KGgo="})],
+        [new_output("error", ename="ValueError", evalue="bad", traceback=["Traceback", "ValueError: bad"])],
+    ])
+    metadata = {}
+    if rng.random() < 0.1:
+        metadata["magics_language"] = "shell"
+    if rng.random() < 0.05:
+        metadata["transient"] = {"remove_source": True}
+    return new_code_cell(source, outputs=outputs, metadata=metadata, execution_count=rng.randint(1, 9))
+
+
+def _markdown_cell(rng):
+    source = _text(rng, rng.randint(0, 5)) + rng.choice(["", "\n", "\n\n"])
+    cell = new_markdown_cell(source)
+    if rng.random() < 0.2:
+        # pasted images; only the listed names lose their prefix
+        names = rng.sample(["image.png", "img/chart.png", "diagram.jpg"], k=rng.randint(1, 2))
+        links = " ".join(f"![{name}](attachment:{name})" for name in names)
+        cell.source = f"{source}\n{links} ![missing](attachment:missing.png)"
+        cell.attachments = {name: {"image/png": "iVBORw0KGgo="} for name in names}
+    return cell
+
+
+def _cell(rng):
+    kind = rng.random()
+    if kind < 0.45:
+        return _code_cell(rng)
+    if kind < 0.9:
+        return _markdown_cell(rng)
+    mimetype = rng.choice(["", "text/markdown", "text/html", "text/x-python", "text/restructuredtext", "TEXT/HTML"])
+    return new_raw_cell(_text(rng, 2), metadata={"raw_mimetype": mimetype} if mimetype else {})
+
+
+def make_notebook(seed):
+    """A random notebook in nbformat 4 JSON."""
+    rng = random.Random(seed)
+    nb = new_notebook(cells=[_cell(rng) for _ in range(rng.randint(0, 30))])
+
+    language = rng.choice([None, "python", "R", "scala"])
+    if language is not None:
+        nb.metadata["language_info"] = {"name": language}
+    nb.metadata["kernelspec"] = {"name": "python3", "display_name": "Python 3", "language": "python"}
+
+    raw = nbformat.writes(nb)
+    # notebooks saved by Jupyter store sources as lists of lines
+    if rng.random() < 0.5:
+        raw = raw.replace('"source": ""', '"source": []')
+    return raw
+
+
+def make_corpus(size=200, seed=0):
+    return [make_notebook(seed * 100_000 + i) for i in range(size)]
@@ -0,0 +1,314 @@
+"""
+Tests for github_code module.
+
+This module contains unit tests for processing repository files with an
+LLM, using a fake LLM instead of the OpenAI API.
+"""
+
+import asyncio
+import re
+
+from petcache import PetCache
+
+import github_code.main
+from common.llm import LLMCache, PromptRegistry
+from github_code.main import LLMCodeProcessor, aprocess_data, process_file
+from github_code.planning import plan_code_files
+from github_docs.github import RawRepositoryFile
+
+
+class FakeLLM:
+    """Records calls and returns a fixed answer."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, instructions, content, model="gpt-4o-mini"):
+        self.calls.append((instructions, content, model))
+        return f"```\ndocumented {content}\n```"
+
+
+class FakeAsyncLLM(FakeLLM):
+    """The async version of FakeLLM."""
+
+    async def __call__(self, instructions, content, model="gpt-4o-mini"):
+        await asyncio.sleep(0)
+        return super().__call__(instructions, content, model=model)
+
+
+class FakePackingLLM(FakeAsyncLLM):
+    """Answers packed requests with one section per file, or with `packed_answer`."""
+
+    def __init__(self, packed_answer=None):
+        super().__init__()
+        self.packed_answer = packed_answer
+
+    async def __call__(self, instructions, content, model="gpt-4o-mini"):
+        if not content.startswith("<<<FILE 1: "):
+            return await super().__call__(instructions, content, model=model)
+
+        self.calls.append((instructions, content, model))
+        if self.packed_answer is not None:
+            return self.packed_answer
+
+        files = re.findall(r"^<<<FILE (\d+): .*?>>>\n(.*?)\n<<<END FILE \1>>>$", content, re.M | re.S)
+        return "\n".join(f"<<<DOC {n}>>>\n```\ndocumented {code}\n```\n<<<END DOC {n}>>>" for n, code in files)
+
+
+class TestProcessFile:
+    """Test cases for process_file with the content-addressed cache."""
+
+    def make(self, tmp_path, model="gpt-4o-mini"):
+        llm = FakeLLM()
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+        return llm, LLMCodeProcessor(llm, model=model), cache
+
+    def test_identical_content_is_processed_once(self, tmp_path):
+        """Test that moved and copied files reuse the cached result."""
+        llm, processor, cache = self.make(tmp_path)
+
+        first = process_file(processor, cache, RawRepositoryFile("a/app.py", "print(1)"))
+        moved = process_file(processor, cache, RawRepositoryFile("b/app.py", "print(1)"))
+
+        assert len(llm.calls) == 1
+        assert first["content"] == moved["content"] == "documented print(1)"
+        assert moved["filename"] == "b/app.py"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_edited_file_is_processed_again(self, tmp_path):
+        """Test that changed content doesn't return a stale result."""
+        llm, processor, cache = self.make(tmp_path)
+
+        process_file(processor, cache, RawRepositoryFile("app.py", "print(1)"))
+        result = process_file(processor, cache, RawRepositoryFile("app.py", "print(2)"))
+
+        assert len(llm.calls) == 2
+        assert result["content"] == "documented print(2)"
+
+    def test_cache_is_shared_but_keyed_by_model(self, tmp_path):
+        """Test that a persistent cache is reused across runs with the same model only."""
+        llm, processor, cache = self.make(tmp_path)
+        process_file(processor, cache, RawRepositoryFile("app.py", "print(1)"))
+
+        llm2, processor2, cache2 = self.make(tmp_path)
+        process_file(processor2, cache2, RawRepositoryFile("vendored/app.py", "print(1)"))
+        assert llm2.calls == []
+
+        llm3, processor3, cache3 = self.make(tmp_path, model="gpt-4o")
+        process_file(processor3, cache3, RawRepositoryFile("app.py", "print(1)"))
+        assert llm3.calls[0][2] == "gpt-4o"
+
+
+class TestAsyncProcessData:
+    """Test cases for processing files concurrently with an async LLM."""
+
+    def test_results_are_in_order_and_cached(self, tmp_path):
+        """Test that results keep the input order and share the cache."""
+        llm = FakeAsyncLLM()
+        processor = LLMCodeProcessor(llm)
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+
+        files = [
+            RawRepositoryFile("a.py", "print(1)"),
+            RawRepositoryFile("b.sql", "select 1"),
+            RawRepositoryFile("c.txt", "ignored"),
+        ]
+        results = asyncio.run(aprocess_data(files, processor, cache, pack_small_files=False))
+
+        assert results == [
+            {"content": "documented print(1)", "filename": "a.py"},
+            {"content": "documented select 1", "filename": "b.sql"},
+            None,
+        ]
+
+        again = asyncio.run(aprocess_data([RawRepositoryFile("d.py", "print(1)")], processor, cache, pack_small_files=False))
+        assert again[0]["content"] == "documented print(1)"
+        assert len(llm.calls) == 2
+
+
+    def test_identical_contents_in_one_run_are_processed_once(self, tmp_path):
+        """Test that copies scheduled together share one request per cache key."""
+        llm = FakePackingLLM()
+        processor = LLMCodeProcessor(llm)
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+
+        big = "x = 1\n" * 1000
+        notebook = '{"nbformat": 4, "nbformat_minor": 5, "metadata": {}, "cells": []}'
+        files = [
+            RawRepositoryFile(f"{copy}/{name}", content)
+            for copy in ("a", "vendored", "b", "c")
+            for name, content in (("big.py", big), ("q.sql", "select 1"), ("nb.ipynb", notebook))
+        ]
+
+        for pack_small_files in (False, True):
+            llm.calls.clear()
+            cache = LLMCache(PetCache(str(tmp_path / f"cache-{pack_small_files}.sqlite")))
+            results = asyncio.run(aprocess_data(files, processor, cache, pack_small_files=pack_small_files))
+
+            # one request each for big.py, q.sql (packed or not) and the notebook
+            assert len(llm.calls) == 3
+            assert len({r["content"] for r in results}) == 3
+            assert processor._in_flight == {}
+
+
+class TestBatchRequests:
+    """Test cases for LLMCodeProcessor.batch_requests."""
+
+    def test_batch_results_are_cache_hits(self, tmp_path):
+        """Test that a result cached under the batch key is used by process_file."""
+        llm = FakeLLM()
+        processor = LLMCodeProcessor(llm)
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+        f = RawRepositoryFile("app.py", "print(1)")
+
+        [request] = processor.batch_requests(f)
+        assert (request.instructions, request.content) == (processor.code_instructions, "print(1)")
+
+        cache.set(request.key, "from batch")
+        assert process_file(processor, cache, f)["content"] == "from batch"
+        assert llm.calls == []
+
+    def test_other_files_have_no_request(self):
+        """Test that documents don't need an LLM request."""
+        processor = LLMCodeProcessor(FakeLLM())
+        assert processor.batch_requests(RawRepositoryFile("README.md", "# hi")) == []
+
+    def test_requests_follow_the_plan(self, tmp_path):
+        """Test that verbatim and over budget files are skipped and large files are split."""
+        llm = FakeAsyncLLM()
+        processor = LLMCodeProcessor(llm)
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+
+        big = "def a():\n    return 1\n\n" * 50 + "def b():\n    return 2\n"
+        files = [
+            RawRepositoryFile("__init__.py", "x = 1"),
+            RawRepositoryFile("big.py", big),
+            RawRepositoryFile("over.py", "z = 3\n" * 200),
+        ]
+        code_files = [(f.filename, f.content) for f in files]
+        unlimited = plan_code_files(code_files, processor.code_instructions, max_section_tokens=200)
+        big_plan = unlimited.files["big.py"]
+        plan = plan_code_files(
+            code_files,
+            processor.code_instructions,
+            max_tokens=big_plan.input_tokens + big_plan.output_tokens,
+            max_section_tokens=200,
+        )
+        assert [p.action for p in plan.files.values()] == ["verbatim", "llm", "over budget"]
+
+        requests = [r for f in files for r in processor.batch_requests(f, plan=plan)]
+
+        sections = plan.files["big.py"].sections
+        assert [r.content for r in requests] == sections
+        assert [r.key for r in requests] == [processor.code_cache_key(s) for s in sections]
+
+        # batch results are what the online pass looks up
+        for r in requests:
+            cache.set(r.key, f"batch {r.content}")
+        results = asyncio.run(aprocess_data(files, processor, cache, pack_small_files=False, plan=plan))
+        assert results[1]["content"] == "\n\n".join(f"batch {s}" for s in sections)
+        assert llm.calls == []
+
+
+class TestPackedRequests:
+    """Test cases for processing small code files in packed requests."""
+
+    def make(self, tmp_path, llm):
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+        return LLMCodeProcessor(llm), cache
+
+    def test_small_files_share_a_request(self, tmp_path):
+        """Test that small files are documented with one call and results match per-file keys."""
+        llm = FakePackingLLM()
+        processor, cache = self.make(tmp_path, llm)
+        files = [RawRepositoryFile(f"q{i}.sql", f"select {i}") for i in range(5)]
+        files.append(RawRepositoryFile("big.py", "x = 1\n" * 1000))
+
+        results = asyncio.run(aprocess_data(files, processor, cache))
+
+        assert [r["content"] for r in results[:5]] == [f"documented select {i}" for i in range(5)]
+        # one packed request for the small files, one for the big file
+        assert len(llm.calls) == 2
+        assert llm.calls[0][0] == processor.packed_code_instructions
+        assert (processor.packed_requests, processor.pack_fallbacks) == (1, 0)
+
+        # the results are stored under the packed keys, apart from single-file results
+        assert cache.contains(processor.packed_code_cache_key("select 3"))
+        assert not cache.contains(processor.code_cache_key("select 3"))
+
+        # and found on the next run, one hit per file
+        cache.hits = cache.misses = 0
+        again = asyncio.run(aprocess_data(files, processor, cache))
+        assert again == results
+        assert len(llm.calls) == 2
+        assert (cache.hits, cache.misses) == (6, 0)
+
+    def test_packed_key_depends_on_the_packing_prompt(self, tmp_path, monkeypatch):
+        """Test that editing the packing prompt invalidates packed results only."""
+        for name in ("_code_doc.md", "_code_doc_packed.md"):
+            (tmp_path / name).write_text(name, encoding="utf-8")
+        monkeypatch.setattr(github_code.main, "PROMPT_DIR", tmp_path)
+        processor = LLMCodeProcessor(FakeLLM(), prompts=PromptRegistry())
+
+        code_key = processor.code_cache_key("select 1")
+        packed_key = processor.packed_code_cache_key("select 1")
+        assert packed_key != code_key
+
+        (tmp_path / "_code_doc_packed.md").write_text("answer in <<<DOC n>>> sections", encoding="utf-8")
+        assert processor.code_cache_key("select 1") == code_key
+        assert processor.packed_code_cache_key("select 1") != packed_key
+
+    def test_fallback_when_the_answer_cannot_be_split(self, tmp_path):
+        """Test that a malformed packed answer falls back to one request per file."""
+        llm = FakePackingLLM(packed_answer="<<<DOC 1>>>\nonly one\n<<<END DOC 1>>>")
+        processor, cache = self.make(tmp_path, llm)
+        files = [RawRepositoryFile("a.sql", "select 1"), RawRepositoryFile("b.sql", "select 2")]
+
+        results = asyncio.run(aprocess_data(files, processor, cache))
+
+        assert [r["content"] for r in results] == ["documented select 1", "documented select 2"]
+        assert len(llm.calls) == 3
+        assert processor.pack_fallbacks == 1
+
+
+class TestTokenPlan:
+    """Test cases for processing code files according to a token plan."""
+
+    def test_verbatim_and_split_files(self, tmp_path):
+        """Test that tiny files skip the LLM and large files are documented by section."""
+        llm = FakeAsyncLLM()
+        processor = LLMCodeProcessor(llm)
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+
+        big = "def a():\n    return 1\n\n" * 50 + "def b():\n    return 2\n"
+        files = [RawRepositoryFile("__init__.py", "x = 1"), RawRepositoryFile("big.py", big)]
+        plan = plan_code_files(
+            [(f.filename, f.content) for f in files],
+            processor.code_instructions,
+            max_section_tokens=200,
+        )
+        sections = plan.files["big.py"].sections
+        assert len(sections) > 1
+
+        results = asyncio.run(aprocess_data(files, processor, cache, plan=plan))
+
+        assert results[0] == {"content": "x = 1", "filename": "__init__.py"}
+        assert results[1]["content"] == "\n\n".join(f"documented {s}" for s in sections)
+        # repeated sections are requested once
+        assert [call[1] for call in llm.calls] == list(dict.fromkeys(sections))
+        assert cache.contains(processor.code_cache_key(sections[0]))
+
+    def test_processor_plan(self, tmp_path):
+        """Test that the processor plans code files only, with its cache."""
+        processor = LLMCodeProcessor(FakeLLM())
+        cache = LLMCache(PetCache(str(tmp_path / "cache.sqlite")))
+        code = "y = 2\n" * 100
+        cache.set(processor.code_cache_key(code), "cached")
+
+        plan = processor.plan(
+            [RawRepositoryFile("a.py", code), RawRepositoryFile("README.md", "# hi")],
+            cache,
+        )
+
+        assert list(plan.files) == ["a.py"]
+        assert plan.files["a.py"].action == "cached"
@@ -0,0 +1,101 @@
+"""
+Tests for github_code.notebook module.
+
+This module contains unit tests for the notebook to markdown converter,
+which must produce the same markdown as nbconvert.
+"""
+
+import json
+
+import pytest
+
+from github_code.notebook import convert_notebooks, nbconvert_to_markdown, notebook_to_markdown
+from tests.github_code.notebooks import make_corpus
+
+
+def make_notebook_json(cells, language="python"):
+    return json.dumps({
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": {"language_info": {"name": language}},
+        "cells": cells,
+    })
+
+
+class TestNotebookToMarkdown:
+    """Test cases for notebook_to_markdown."""
+
+    @pytest.mark.parametrize("raw", make_corpus(40))
+    def test_same_as_nbconvert(self, raw):
+        """Test that the output is identical to nbconvert's on a generated corpus."""
+        assert notebook_to_markdown(raw) == nbconvert_to_markdown(raw)
+
+    def test_cells(self):
+        """Test markdown and code cells, with outputs dropped and list sources joined."""
+        raw = make_notebook_json([
+            {"cell_type": "markdown", "metadata": {}, "source": ["# Title\n", "text"]},
+            {
+                "cell_type": "code",
+                "metadata": {},
+                "execution_count": 1,
+                "source": "print(1)",
+                "outputs": [{"output_type": "stream", "name": "stdout", "text": "1\n"}],
+            },
+        ])
+
+        assert notebook_to_markdown(raw) == "# Title\ntext\n\n\n```python\nprint(1)\n```\n"
+
+    def test_cell_magic_language(self):
+        """Test that a cell magic decides the fence language."""
+        raw = make_notebook_json([
+            {"cell_type": "code", "metadata": {}, "execution_count": None, "source": "%%sql\nSELECT 1", "outputs": []},
+        ])
+
+        assert notebook_to_markdown(raw) == "```sql\n%%sql\nSELECT 1\n```\n"
+
+    def test_attachments(self):
+        """Test that links to attachments point at the file names, other links are kept."""
+        raw = make_notebook_json([{
+            "id": "attachments",
+            "cell_type": "markdown",
+            "metadata": {},
+            "source": "![a](attachment:img/a.png) ![b](attachment:b.png)",
+            "attachments": {"img/a.png": {"image/png": "iVBORw0KGgo="}},
+        }])
+
+        assert notebook_to_markdown(raw) == "![a](a.png) ![b](attachment:b.png)\n"
+        assert notebook_to_markdown(raw) == nbconvert_to_markdown(raw)
+
+    def test_old_notebook_format(self):
+        """Test that nbformat 3 notebooks are converted by nbconvert."""
+        raw = json.dumps({
+            "nbformat": 3,
+            "nbformat_minor": 0,
+            "metadata": {},
+            "worksheets": [{"cells": [
+                {"cell_type": "markdown", "metadata": {}, "source": "old"},
+                {"cell_type": "code", "metadata": {}, "input": "x = 1", "language": "python", "outputs": []},
+            ]}],
+        })
+
+        markdown = notebook_to_markdown(raw)
+        assert "old" in markdown
+        assert "x = 1" in markdown
+
+
+class TestConvertNotebooks:
+    """Test cases for convert_notebooks."""
+
+    def test_in_process(self):
+        """Test that small batches are converted in order."""
+        corpus = make_corpus(5, seed=1)
+
+        assert convert_notebooks(corpus) == [notebook_to_markdown(raw) for raw in corpus]
+
+    def test_process_pool(self):
+        """Test that worker processes return the same results in order."""
+        corpus = make_corpus(20, seed=2)
+
+        result = convert_notebooks(corpus, max_workers=2, min_parallel=1)
+
+        assert result == [notebook_to_markdown(raw) for raw in corpus]
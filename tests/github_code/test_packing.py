@@ -0,0 +1,66 @@
+"""
+Tests for github_code.packing module.
+
+This module contains unit tests for packing small files into one LLM
+request and splitting the answer back into per-file results.
+"""
+
+import pytest
+
+from github_code.packing import pack_sections, plan_packs, unpack_sections
+
+
+class TestPackSections:
+    """Test cases for pack_sections and unpack_sections."""
+
+    def test_pack(self):
+        """Test that every file is between numbered markers."""
+        content = pack_sections([("a.sql", "select 1"), ("b.py", "")])
+
+        assert content == (
+            "<<<FILE 1: a.sql>>>\nselect 1\n<<<END FILE 1>>>\n\n"
+            "<<<FILE 2: b.py>>>\n\n<<<END FILE 2>>>"
+        )
+
+    def test_unpack(self):
+        """Test that sections are returned in order, stripped."""
+        text = (
+            "<<<DOC 1>>>\n# a\n\ntext with <<<DOC 2>>> inline\n<<<END DOC 1>>>\n"
+            "<<<DOC 2>>>\n# b\n<<<END DOC 2>>>\n"
+        )
+
+        assert unpack_sections(text, 2) == ["# a\n\ntext with <<<DOC 2>>> inline", "# b"]
+
+    @pytest.mark.parametrize("text", [
+        "<<<DOC 1>>>\na\n<<<END DOC 1>>>",
+        "<<<DOC 2>>>\nb\n<<<END DOC 2>>>\n<<<DOC 1>>>\na\n<<<END DOC 1>>>",
+        "<<<DOC 1>>>\na\n<<<END DOC 1>>>\n<<<DOC 1>>>\na\n<<<END DOC 1>>>",
+        "<<<DOC 1>>>\na\n<<<END DOC 1>>>\n<<<DOC 2>>>\n\n<<<END DOC 2>>>",
+        "<<<DOC 1>>>\na\n<<<END DOC 2>>>\n<<<DOC 2>>>\nb\n<<<END DOC 2>>>",
+        "no sections at all",
+    ])
+    def test_invalid_answers(self, text):
+        """Test that missing, reordered, repeated, empty and unclosed sections are rejected."""
+        with pytest.raises(ValueError):
+            unpack_sections(text, 2)
+
+
+class TestPlanPacks:
+    """Test cases for plan_packs."""
+
+    def test_token_budget(self):
+        """Test that packs stay within the token budget, in input order."""
+        items = [("a", "x" * 400), ("b", "x" * 400), ("c", "x" * 400)]
+
+        # about 100 tokens each
+        assert plan_packs(items, max_tokens=250) == [["a", "b"], ["c"]]
+
+    def test_file_limit(self):
+        """Test that packs have at most max_files files."""
+        items = [(i, "") for i in range(5)]
+
+        assert plan_packs(items, max_files=2) == [[0, 1], [2, 3], [4]]
+
+    def test_oversized_item_gets_its_own_pack(self):
+        """Test that an item over the budget is still planned."""
+        assert plan_packs([("big", "x" * 4000)], max_tokens=10) == [["big"]]
@@ -0,0 +1,190 @@
+"""
+Tests for github_code.planning module.
+
+This module contains unit tests for the token plan that decides which code
+files are sent to the LLM, split into sections or indexed verbatim.
+"""
+
+from common.llm import estimate_tokens
+from github_code.planning import (
+    CACHED,
+    LLM,
+    OVER_BUDGET,
+    VERBATIM,
+    count_tokens,
+    estimate_cost,
+    plan_code_files,
+    split_code,
+)
+
+
+def count_lines(text):
+    """One token per line, to make section sizes easy to reason about."""
+    return len(text.splitlines())
+
+
+PYTHON = (
+    "import os\n"
+    "\n"
+    "@decorator\n"
+    "def a():\n"
+    "    return 1\n"
+    "\n"
+    "class B:\n"
+    "    x = 1\n"
+    "    y = 2\n"
+    "\n"
+    "def c():\n"
+    "    pass\n"
+)
+
+
+class TestCountTokens:
+    """Test cases for count_tokens."""
+
+    def test_counts_something(self):
+        """Test that longer text has more tokens, with or without tiktoken."""
+        assert 0 < count_tokens("def f(): pass") < count_tokens("def f(): pass\n" * 10)
+
+    def test_fallback_estimate(self, monkeypatch):
+        """Test that the estimate is used without a tokenizer."""
+        monkeypatch.setattr("github_code.planning._encoding", lambda model: None)
+        assert count_tokens("x" * 40) == estimate_tokens("x" * 40)
+
+
+class TestSplitCode:
+    """Test cases for split_code."""
+
+    def test_small_code_is_not_split(self):
+        assert split_code(PYTHON, "py", max_tokens=100, count=count_lines) == [PYTHON]
+
+    def test_python_definitions(self):
+        """Test that sections start at definitions, with their decorators."""
+        sections = split_code(PYTHON, "py", max_tokens=5, count=count_lines)
+
+        assert "".join(sections) == PYTHON
+        assert sections == [
+            "import os\n\n",
+            "@decorator\ndef a():\n    return 1\n\n",
+            "class B:\n    x = 1\n    y = 2\n\n",
+            "def c():\n    pass\n",
+        ]
+        assert all(count_lines(section) <= 5 for section in sections)
+
+    def test_definitions_are_packed(self):
+        """Test that consecutive definitions share a section while they fit."""
+        sections = split_code(PYTHON, "py", max_tokens=8, count=count_lines)
+
+        assert sections == [
+            "import os\n\n@decorator\ndef a():\n    return 1\n\n",
+            "class B:\n    x = 1\n    y = 2\n\ndef c():\n    pass\n",
+        ]
+
+    def test_sql_statements(self):
+        """Test that SQL is split after statements."""
+        sql = "SELECT 1\nFROM a;\nSELECT 2\nFROM b;\nSELECT 3;\n"
+
+        assert split_code(sql, "sql", max_tokens=2, count=count_lines) == [
+            "SELECT 1\nFROM a;\n",
+            "SELECT 2\nFROM b;\n",
+            "SELECT 3;\n",
+        ]
+
+    def test_oversized_definition_is_cut_between_lines(self):
+        """Test that a definition larger than the limit is still split."""
+        code = "def big():\n" + "    x = 1\n" * 9
+
+        sections = split_code(code, "py", max_tokens=4, count=count_lines)
+
+        assert "".join(sections) == code
+        assert [count_lines(section) for section in sections] == [4, 4, 2]
+
+
+class TestPlanCodeFiles:
+    """Test cases for plan_code_files."""
+
+    def test_actions(self):
+        """Test that tiny files are verbatim, cached files are free and large files are split."""
+        big = "def f():\n    return 1\n\n" * 2000
+        files = [
+            ("__init__.py", ""),
+            ("cached.py", "x = 1\n" * 100),
+            ("app.py", "y = 2\n" * 100),
+            ("big.py", big),
+        ]
+
+        plan = plan_code_files(
+            files,
+            "Document the code.",
+            is_cached=lambda section: section.startswith("x = 1"),
+            max_section_tokens=5000,
+        )
+
+        assert plan.files["__init__.py"].action == VERBATIM
+        assert plan.files["cached.py"].action == CACHED
+        assert plan.files["cached.py"].input_tokens == 0
+        assert plan.files["app.py"].action == LLM
+        assert plan.files["app.py"].sections == ["y = 2\n" * 100]
+        assert plan.files["big.py"].action == LLM
+        assert len(plan.files["big.py"].sections) > 1
+        assert "".join(plan.files["big.py"].sections) == big
+
+        assert plan.requests == 1 + len(plan.files["big.py"].sections)
+        assert plan.cost == estimate_cost("gpt-4o-mini", plan.input_tokens, plan.output_tokens) > 0
+
+    def test_token_budget(self):
+        """Test that files over the token budget are indexed verbatim, and smaller ones still fit."""
+        files = [("a.py", "a = 1\n" * 100), ("b.py", "b = 1\n" * 1000), ("c.py", "c = 1\n" * 100)]
+        single = plan_code_files(files[:1], "Doc.").files["a.py"]
+        budget = 2 * (single.input_tokens + single.output_tokens) + 10
+
+        plan = plan_code_files(files, "Doc.", max_tokens=budget)
+
+        assert [plan.files[name].action for name in ("a.py", "b.py", "c.py")] == [LLM, OVER_BUDGET, LLM]
+        assert plan.input_tokens + plan.output_tokens <= budget
+
+    def test_cost_budget(self):
+        """Test that the cost budget is enforced."""
+        files = [(f"{i}.py", f"x{i} = 1\n" * 500) for i in range(3)]
+        one_file = plan_code_files(files[:1], "Doc.").cost
+
+        plan = plan_code_files(files, "Doc.", max_cost=one_file * 1.5)
+
+        assert plan.count(LLM) == 1
+        assert plan.count(OVER_BUDGET) == 2
+        assert plan.cost <= one_file * 1.5
+
+    def test_report(self):
+        """Test that the dry-run report lists the counts, tokens and cost."""
+        plan = plan_code_files([("a.py", ""), ("b.py", "b = 1\n" * 100)], "Doc.", max_cost=1.0)
+        report = plan.report()
+
+        assert "indexed verbatim (tiny): 1" in report
+        assert "sent to the LLM: 1 (0 split into sections)" in report
+        assert "LLM requests: 1" in report
+        assert "Estimated cost: $" in report
+        assert "Budget: $1.00" in report
+        assert "Token counts: " in report
+
+    def test_report_says_when_tokens_are_estimated(self, monkeypatch):
+        """Test that the report states the fallback to estimated token counts."""
+        monkeypatch.setattr("github_code.planning._encoding", lambda model: None)
+        report = plan_code_files([("b.py", "b = 1\n" * 100)], "Doc.").report()
+
+        assert "Token counts: estimated from text length, tiktoken is not installed" in report
+
+    def test_each_file_is_counted_once(self, monkeypatch):
+        """Test that unsplit files are tokenized once, and split files once per line."""
+        counted = []
+
+        def count(text, model="gpt-4o-mini"):
+            counted.append(text)
+            return estimate_tokens(text)
+
+        monkeypatch.setattr("github_code.planning.count_tokens", count)
+        big = "def f():\n    return 1\n\n" * 200
+        plan = plan_code_files([("a.py", "a = 1\n" * 100), ("big.py", big)], "Doc.", max_section_tokens=200)
+
+        assert counted.count("a = 1\n" * 100) == 1
+        assert counted.count(big) == 1
+        assert not set(plan.files["big.py"].sections) & set(counted)
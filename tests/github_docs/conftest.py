@@ -0,0 +1,14 @@
+"""
+Pytest fixtures for github_docs tests.
+"""
+
+import pytest
+
+from tests.github_docs.http_server import ArchiveServer
+
+
+@pytest.fixture
+def server():
+    server = ArchiveServer()
+    yield server
+    server.close()
@@ -0,0 +1,97 @@
+"""
+A local HTTP server standing in for GitHub in tests.
+"""
+
+import hashlib
+import io
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_archive(files, prefix="repo-main"):
+    """Build a zip archive like the ones served by codeload, with fixed timestamps."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(zipfile.ZipInfo(f"{prefix}/", date_time=(2024, 1, 1, 0, 0, 0)), "")
+        for name, content in files.items():
+            info = zipfile.ZipInfo(f"{prefix}/{name}", date_time=(2024, 1, 1, 0, 0, 0))
+            zf.writestr(info, content, compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def parse_range(header, size):
+    """Parse a single "bytes=start-end" or "bytes=-suffix" range into (start, end)."""
+    start, end = header.removeprefix("bytes=").split("-")
+    if not start:
+        return max(size - int(end), 0), size - 1
+    return int(start), min(int(end), size - 1) if end else size - 1
+
+
+class ArchiveServer:
+    """A local HTTP server that serves fixed responses by path, with ETags and ranges."""
+
+    def __init__(self, supports_ranges=True):
+        self.routes = {}
+        self.delays = {}
+        self.requests = []
+        self.statuses = []
+        self.bytes_sent = 0
+        self.supports_ranges = supports_ranges
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                time.sleep(server.delays.get(self.path, 0))
+                if self.path not in server.routes:
+                    server.statuses.append(404)
+                    self.send_error(404)
+                    return
+
+                body = server.routes[self.path]
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                if server.supports_ranges and "Range" in self.headers:
+                    start, end = parse_range(self.headers["Range"], len(body))
+                    server.statuses.append(206)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                    body = body[start:end + 1]
+                else:
+                    server.statuses.append(200)
+                    self.send_response(200)
+                    if server.supports_ranges:
+                        self.send_header("Accept-Ranges", "bytes")
+
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+                server.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
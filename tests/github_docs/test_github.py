@@ -0,0 +1,356 @@
+"""
+Tests for github_docs.github module.
+
+This module contains unit tests for the GitHub repository reader, run
+against a local HTTP server that serves repository archives.
+"""
+
+import pickle
+import random
+import time
+import zipfile
+
+import pytest
+
+from github_docs.github import (
+    GithubRepositoryDataReader,
+    MultiRepositoryReader,
+    RawRepositoryFile,
+    RepositorySpec,
+)
+from tests.github_docs.http_server import ArchiveServer, make_archive
+
+
+FILES = {
+    "README.md": "# Project\n",
+    "docs/guide.md": "  Guide content  \n",
+    "src/app.py": "print('hello')\n",
+    ".hidden.md": "hidden",
+}
+
+
+def make_reader(server, files=FILES, **kwargs):
+    server.routes["/archive.zip"] = make_archive(files)
+    reader = GithubRepositoryDataReader("owner", "repo", **kwargs)
+    reader.url = server.url("/archive.zip")
+    return reader
+
+
+class TestGithubRepositoryDataReader:
+    """Test cases for downloading and extracting repository archives."""
+
+    def test_read_all_files(self, server):
+        """Test reading without an extension filter."""
+        reader = make_reader(server)
+        files = {f.filename: f.content for f in reader.read()}
+
+        assert files == {
+            "README.md": "# Project",
+            "docs/guide.md": "Guide content",
+            "src/app.py": "print('hello')",
+        }
+
+    def test_allowed_extensions_and_filter(self, server):
+        """Test filtering by extension and by path."""
+        reader = make_reader(
+            server,
+            allowed_extensions={"MD"},
+            filename_filter=lambda path: path.startswith("docs/"),
+        )
+
+        assert [f.filename for f in reader.read()] == ["docs/guide.md"]
+
+    @pytest.mark.parametrize("spool_threshold", [0, 16, 1024 * 1024])
+    def test_spool_threshold(self, server, spool_threshold):
+        """Test that archives are read the same way from memory and from disk."""
+        files = {f"file{i}.md": f"content {i} " * 200 for i in range(20)}
+        reader = make_reader(server, files=files, spool_threshold=spool_threshold)
+
+        result = reader.read()
+
+        assert [f.filename for f in result] == list(files)
+        assert result[3].content == files["file3.md"].strip()
+
+    def test_large_archive_is_spilled_to_disk(self, server):
+        """Test that an archive above the threshold is not kept in memory."""
+        files = {f"file{i}.md": f"content {i} " * 200 for i in range(20)}
+        reader = make_reader(server, files=files, spool_threshold=1024)
+
+        with reader._download() as archive:
+            assert archive._rolled
+            assert zipfile.ZipFile(archive).namelist()[1] == "repo-main/file0.md"
+
+    def test_failed_download(self, server):
+        """Test that a failed download raises an error."""
+        reader = GithubRepositoryDataReader("owner", "repo")
+        reader.url = server.url("/missing.zip")
+
+        with pytest.raises(Exception, match="Failed to download repository: 404"):
+            reader.read()
+
+
+class TestArchiveCache:
+    """Test cases for the on-disk archive cache."""
+
+    def test_unchanged_archive_is_not_downloaded_again(self, server, tmp_path):
+        """Test that a 304 response reuses the cached archive."""
+        reader = make_reader(server, cache_dir=tmp_path)
+        first = reader.read()
+        assert not reader.from_cache
+
+        second = reader.read()
+
+        assert reader.from_cache
+        assert server.statuses == [200, 304]
+        assert second == first
+        assert "If-None-Match" in server.requests[1][1]
+
+    def test_changed_archive_is_downloaded(self, server, tmp_path):
+        """Test that a new archive replaces the cached one."""
+        reader = make_reader(server, cache_dir=tmp_path)
+        reader.read()
+
+        server.routes["/archive.zip"] = make_archive({"new.md": "new"})
+        result = reader.read()
+
+        assert not reader.from_cache
+        assert server.statuses == [200, 200]
+        assert [f.filename for f in result] == ["new.md"]
+        assert reader.read() == result
+        assert server.statuses[-1] == 304
+
+    def test_cache_is_keyed_by_ref(self, server, tmp_path):
+        """Test that different refs are cached separately."""
+        reader = make_reader(server, cache_dir=tmp_path, ref="feature/x")
+        reader.read()
+
+        other = make_reader(server, cache_dir=tmp_path, ref="main")
+        other.read()
+
+        assert server.statuses == [200, 200]
+        assert (tmp_path / "owner" / "repo" / "feature%2Fx.zip").exists()
+        assert (tmp_path / "owner" / "repo" / "main.zip").exists()
+
+    def test_failed_download_keeps_cache(self, server, tmp_path):
+        """Test that a failed download leaves the cached archive intact."""
+        reader = make_reader(server, cache_dir=tmp_path)
+        expected = reader.read()
+
+        del server.routes["/archive.zip"]
+        with pytest.raises(Exception, match="404"):
+            reader.read()
+
+        server.routes["/archive.zip"] = make_archive(FILES)
+        assert reader.read() == expected
+        assert reader.from_cache
+        assert sorted(p.name for p in (tmp_path / "owner" / "repo").iterdir()) == ["main.json", "main.zip"]
+
+    def test_ref_in_url(self):
+        """Test that the ref selects the downloaded archive."""
+        reader = GithubRepositoryDataReader("owner", "repo", ref="v1.0")
+        assert reader.url == "https://codeload.github.com/owner/repo/zip/v1.0"
+
+
+class TestParallelExtraction:
+    """Test cases for extracting files in worker processes."""
+
+    FILES = {f"dir{i % 7}/file{i}.md": f"content {i} " * (1 + i % 50) for i in range(150)}
+
+    def test_parallel_matches_sequential(self, server, tmp_path):
+        """Test that parallel extraction returns the same files in the same order."""
+        sequential = make_reader(server, files=self.FILES).read()
+        parallel = make_reader(server, files=self.FILES, extract_workers=2).read()
+        cached = make_reader(server, files=self.FILES, extract_workers=2, cache_dir=tmp_path).read()
+
+        assert len(sequential) == 150
+        assert parallel == sequential
+        assert cached == sequential
+
+    def test_small_archives_are_extracted_sequentially(self, server, monkeypatch):
+        """Test that no worker processes are started for a handful of files."""
+        import github_docs.github as github
+
+        def fail(*args, **kwargs):
+            raise AssertionError("process pool should not be used")
+
+        monkeypatch.setattr(github, "spawn_process_pool", fail)
+        reader = make_reader(server, extract_workers=4)
+
+        assert len(reader.read()) == 3
+
+    def test_split_batches(self):
+        """Test that batches are contiguous, complete and balanced by size."""
+        from github_docs.github import _split_batches
+
+        members = []
+        for i, size in enumerate([100, 1, 1, 1, 100, 1, 1, 100]):
+            info = zipfile.ZipInfo(f"f{i}")
+            info.file_size = size
+            members.append(info)
+
+        batches = _split_batches(members, 3)
+
+        assert [m for batch in batches for m in batch] == members
+        assert [[m.filename for m in batch] for batch in batches] == [
+            ["f0", "f1", "f2"], ["f3", "f4", "f5"], ["f6", "f7"]
+        ]
+
+
+class TestRawRepositoryFile:
+    """Test cases for the RawRepositoryFile class."""
+
+    def test_lazy_decoding(self):
+        """Test that raw bytes are decoded and stripped on first access."""
+        f = RawRepositoryFile("a.md", raw="  caf\u00e9 \n".encode("utf-8"))
+
+        assert not f.is_decoded
+        assert f.content == "caf\u00e9"
+        assert f.is_decoded
+        assert f == RawRepositoryFile("a.md", "caf\u00e9")
+
+    def test_slots_and_pickle(self):
+        """Test that files have no instance dict and survive pickling."""
+        f = RawRepositoryFile("a.md", raw=b"text")
+
+        assert not hasattr(f, "__dict__")
+        assert pickle.loads(pickle.dumps(f)).content == "text"
+
+
+class TestIterFiles:
+    """Test cases for streaming files out of the archive."""
+
+    def test_iter_files_matches_read(self, server):
+        """Test that iterating yields the same files as read()."""
+        reader = make_reader(server)
+        assert list(reader.iter_files()) == reader.read()
+
+    def test_iter_files_lazy(self, server):
+        """Test that lazy files are decoded only when their content is used."""
+        reader = make_reader(server)
+        files = list(reader.iter_files(lazy=True))
+
+        assert not any(f.is_decoded for f in files)
+        assert [f.content for f in files] == [f.content for f in reader.read()]
+
+    def test_iter_files_downloads_on_first_use(self, server):
+        """Test that nothing is downloaded until the iterator is consumed."""
+        reader = make_reader(server)
+        files = reader.iter_files()
+        assert server.requests == []
+
+        assert next(files).filename == "README.md"
+        files.close()
+        assert len(server.requests) == 1
+
+
+class TestMultiRepositoryReader:
+    """Test cases for reading several repositories concurrently."""
+
+    def make_reader(self, server, delays, **kwargs):
+        specs = []
+        for i, delay in enumerate(delays):
+            server.routes[f"/repo{i}.zip"] = make_archive({f"file{i}.md": f"repo {i}", "other.py": "x"})
+            server.delays[f"/repo{i}.zip"] = delay
+            specs.append(RepositorySpec("owner", f"repo{i}", allowed_extensions={"md"}))
+
+        reader = MultiRepositoryReader(specs, **kwargs)
+        for i, repo_reader in enumerate(reader.readers):
+            repo_reader.url = server.url(f"/repo{i}.zip")
+        return reader
+
+    def test_files_are_tagged_with_their_repo(self, server):
+        """Test that every file is yielded with the spec of its repository."""
+        reader = self.make_reader(server, [0, 0, 0])
+
+        result = sorted((spec.name, f.filename, f.content) for spec, f in reader.read())
+
+        assert result == [
+            ("owner/repo0@main", "file0.md", "repo 0"),
+            ("owner/repo1@main", "file1.md", "repo 1"),
+            ("owner/repo2@main", "file2.md", "repo 2"),
+        ]
+
+    def test_downloads_run_concurrently(self, server):
+        """Test that wall time is close to the slowest download, not the sum."""
+        reader = self.make_reader(server, [0.6, 0.1, 0.3], max_workers=3)
+
+        start = time.time()
+        order = [spec.repo for spec, _ in reader.iter_files()]
+        elapsed = time.time() - start
+
+        assert order == ["repo1", "repo2", "repo0"]
+        assert elapsed < 0.9
+
+    def test_bounded_parallelism(self, server):
+        """Test that at most max_workers archives are downloaded at a time."""
+        reader = self.make_reader(server, [0.3, 0.3, 0.3], max_workers=1)
+
+        start = time.time()
+        assert len(reader.read()) == 3
+        assert time.time() - start >= 0.9
+
+    def test_shared_session(self, server):
+        """Test that all repositories are downloaded with one session."""
+        reader = self.make_reader(server, [0, 0])
+        assert all(r.session is reader.session for r in reader.readers)
+
+    def test_failed_repository_raises(self, server):
+        """Test that a failed download is reported."""
+        reader = self.make_reader(server, [0, 0])
+        del server.routes["/repo1.zip"]
+
+        with pytest.raises(Exception, match="404"):
+            reader.read()
+
+
+class TestRangeRequests:
+    """Test cases for fetching only the selected members with range requests."""
+
+    @pytest.fixture
+    def files(self):
+        rng = random.Random(1)
+        files = {f"other/file{i}.md": rng.randbytes(20_000).hex() for i in range(100)}
+        files.update({f"docs/page{i}.md": f"page {i} " * 100 for i in range(3)})
+        files["zz/last.md"] = "last"
+        return files
+
+    def test_only_selected_members_are_downloaded(self, server, files):
+        """Test that the result matches a full read with a fraction of the bytes."""
+        expected = make_reader(server, files=files, filename_filter=lambda p: p.startswith("docs/")).read()
+        archive_size = len(server.routes["/archive.zip"])
+        server.bytes_sent = 0
+
+        reader = make_reader(
+            server,
+            files=files,
+            filename_filter=lambda p: p.startswith("docs/"),
+            range_requests=True,
+        )
+        result = reader.read()
+
+        assert [f.filename for f in result] == ["docs/page0.md", "docs/page1.md", "docs/page2.md"]
+        assert result == expected
+        assert server.bytes_sent < archive_size / 10
+        # the tail with the listing, then one coalesced range for the three pages
+        assert server.statuses[-2:] == [206, 206]
+
+    def test_lazy(self, server, files):
+        """Test lazy decoding in range mode."""
+        reader = make_reader(server, files=files, allowed_extensions={"md"}, range_requests=True)
+        files_read = list(reader.iter_files(lazy=True))
+
+        assert not any(f.is_decoded for f in files_read)
+        assert len(files_read) == len(files)
+        assert files_read[-1].content == "last"
+
+    def test_fallback_without_range_support(self, files):
+        """Test that a server without range support is read with one full download."""
+        server = ArchiveServer(supports_ranges=False)
+        try:
+            reader = make_reader(server, files=files, filename_filter=lambda p: p.startswith("docs/"), range_requests=True)
+            result = reader.read()
+        finally:
+            server.close()
+
+        assert [f.filename for f in result] == ["docs/page0.md", "docs/page1.md", "docs/page2.md"]
+        assert server.statuses == [200]
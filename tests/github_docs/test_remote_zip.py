@@ -0,0 +1,140 @@
+"""
+Tests for github_docs.remote_zip module.
+
+This module contains unit tests for parsing zip archives from fetched
+byte ranges.
+"""
+
+import io
+import struct
+import zipfile
+
+import pytest
+
+from github_docs.remote_zip import (
+    UnsupportedArchive,
+    coalesce,
+    extract_member,
+    iter_members,
+    member_spans,
+    parse_central_directory,
+    parse_end_of_central_directory,
+    read_central_directory,
+)
+
+
+def build_archive(files, comment=b""):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, (content, method) in files.items():
+            zf.writestr(zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0)), content, compress_type=method)
+        zf.comment = comment
+    return buffer.getvalue()
+
+
+FILES = {
+    "repo/a.md": (b"alpha " * 100, zipfile.ZIP_DEFLATED),
+    "repo/b.txt": (b"stored", zipfile.ZIP_STORED),
+    "repo/über.md": ("unicode name".encode(), zipfile.ZIP_DEFLATED),
+    "repo/c.md": (b"gamma " * 100, zipfile.ZIP_DEFLATED),
+}
+
+
+def make_fetch(data, calls=None):
+    def fetch(start, end):
+        if calls is not None:
+            calls.append((start, end))
+        return data[start:end]
+    return fetch
+
+
+class TestCentralDirectory:
+    """Test cases for listing an archive from its last bytes."""
+
+    def test_listing_matches_zipfile(self):
+        """Test that entries match what zipfile reports."""
+        data = build_archive(FILES, comment=b"a comment")
+        directory = read_central_directory(data[-100:], len(data), make_fetch(data))
+
+        expected = zipfile.ZipFile(io.BytesIO(data)).infolist()
+        assert [(e.filename, e.header_offset, e.compress_size, e.file_size, e.crc) for e in directory.entries] == [
+            (i.filename, i.header_offset, i.compress_size, i.file_size, i.CRC) for i in expected
+        ]
+
+    def test_directory_outside_tail_is_fetched(self):
+        """Test that a central directory before the tail is fetched separately."""
+        data = build_archive(FILES)
+        calls = []
+        tail = data[-30:]
+
+        directory = read_central_directory(tail, len(data), make_fetch(data, calls))
+
+        assert len(directory.entries) == 4
+        assert calls == [(directory.offset, directory.offset + directory.size)]
+
+    def test_missing_end_record(self):
+        """Test that bytes without an end of central directory record are rejected."""
+        with pytest.raises(UnsupportedArchive):
+            parse_end_of_central_directory(b"not a zip file")
+
+    def test_zip64_is_unsupported(self):
+        """Test that zip64 markers are rejected."""
+        record = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, 1, 1, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+        with pytest.raises(UnsupportedArchive, match="zip64"):
+            parse_end_of_central_directory(record)
+
+
+class TestMembers:
+    """Test cases for fetching and inflating members."""
+
+    def test_extract_all_members(self):
+        """Test that stored and deflated members are extracted."""
+        data = build_archive(FILES)
+        fetch = make_fetch(data)
+        directory = read_central_directory(data, len(data), fetch)
+
+        result = {e.filename: content for e, content in iter_members(directory, directory.entries, fetch)}
+
+        assert result == {name: content for name, (content, _) in FILES.items()}
+
+    def test_adjacent_members_are_coalesced(self):
+        """Test that neighbouring members are fetched with one request."""
+        data = build_archive(FILES)
+        directory = read_central_directory(data, len(data), make_fetch(data))
+        a, b, u, c = directory.entries
+
+        calls = []
+        list(iter_members(directory, [a, b, c], make_fetch(data, calls), max_gap=0))
+        assert calls == [(0, u.header_offset), (c.header_offset, directory.offset)]
+
+        calls = []
+        list(iter_members(directory, [a, b, c], make_fetch(data, calls)))
+        assert calls == [(0, directory.offset)]
+
+    def test_spans_cover_members(self):
+        """Test that every span ends where the next member starts."""
+        data = build_archive(FILES)
+        directory = read_central_directory(data, len(data), make_fetch(data))
+        spans = member_spans(directory.entries, directory.offset)
+
+        ranges = coalesce(directory.entries, spans, max_gap=-1)
+        assert [(start, end) for start, end, _ in ranges] == [
+            spans[e.header_offset] for e in directory.entries
+        ]
+        assert ranges[-1][1] == directory.offset
+
+    def test_corrupted_member(self):
+        """Test that a CRC mismatch is reported."""
+        data = build_archive(FILES)
+        directory = read_central_directory(data, len(data), make_fetch(data))
+        entry = directory.entries[1]
+        entry.crc ^= 1
+
+        with pytest.raises(ValueError, match="CRC"):
+            extract_member(entry, data, entry.header_offset)
+
+    def test_parse_stops_at_end_record(self):
+        """Test parsing a central directory followed by other records."""
+        data = build_archive(FILES)
+        offset, _ = parse_end_of_central_directory(data)
+        assert len(parse_central_directory(data[offset:])) == 4
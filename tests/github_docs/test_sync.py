@@ -0,0 +1,183 @@
+"""
+Tests for github_docs.sync module.
+
+This module contains unit tests for incremental repository sync, run
+against a local HTTP server standing in for the GitHub API.
+"""
+
+import json
+
+import pytest
+
+from github_docs.github import GithubRepositoryDataReader
+from github_docs.sync import RepositorySync
+from tests.github_docs.http_server import make_archive
+
+
+FILES = {
+    "README.md": "# Project",
+    "docs/a.md": "A",
+    "docs/b.md": "B",
+    "src/app.py": "print()",
+}
+
+
+def make_sync(server, tmp_path, **kwargs):
+    reader = GithubRepositoryDataReader(
+        "owner",
+        "repo",
+        allowed_extensions={"md"},
+        base_url=server.url(""),
+        **kwargs,
+    )
+    return RepositorySync(
+        reader,
+        state_path=tmp_path / "state.json",
+        api_url=server.url("/api"),
+        raw_url=server.url("/raw"),
+    )
+
+
+def set_head(server, sha):
+    server.routes["/api/repos/owner/repo/commits/main"] = json.dumps({"sha": sha})
+
+
+def set_compare(server, base, head, files, status="ahead"):
+    data = {"status": status, "files": files}
+    server.routes[f"/api/repos/owner/repo/compare/{base}...{head}"] = json.dumps(data)
+
+
+@pytest.fixture
+def synced(server, tmp_path):
+    """A sync that has already done its first, full sync at commit 'sha1'."""
+    server.routes["/owner/repo/zip/sha1"] = make_archive(FILES)
+    set_head(server, "sha1")
+    sync = make_sync(server, tmp_path)
+    sync.sync()
+    return sync
+
+
+class TestRepositorySync:
+    """Test cases for the RepositorySync class."""
+
+    def test_first_sync_reads_full_archive(self, synced, tmp_path):
+        """Test that the first sync reads the archive and stores the commit."""
+        state = json.loads((tmp_path / "state.json").read_text())
+        assert state == {"repo": "owner/repo", "ref": "main", "sha": "sha1"}
+        assert synced.last_synced_sha() == "sha1"
+
+    def test_full_result(self, server, tmp_path):
+        """Test the result of a full sync."""
+        server.routes["/owner/repo/zip/sha1"] = make_archive(FILES)
+        set_head(server, "sha1")
+
+        result = make_sync(server, tmp_path).sync()
+
+        assert result.full
+        assert result.previous_sha is None
+        assert sorted(f.filename for f in result.files) == ["README.md", "docs/a.md", "docs/b.md"]
+
+    def test_unchanged_head_fetches_nothing(self, server, synced):
+        """Test that no files are fetched when the head has not moved."""
+        server.requests.clear()
+
+        result = synced.sync()
+
+        assert not result.changed
+        assert [path for path, _ in server.requests] == ["/api/repos/owner/repo/commits/main"]
+
+    def test_only_changed_files_are_fetched(self, server, synced):
+        """Test that an incremental sync fetches changed files and reports deletions."""
+        set_head(server, "sha2")
+        set_compare(server, "sha1", "sha2", [
+            {"filename": "docs/a.md", "status": "modified"},
+            {"filename": "docs/c.md", "status": "added"},
+            {"filename": "docs/b.md", "status": "removed"},
+            {"filename": "docs/new.md", "status": "renamed", "previous_filename": "README.md"},
+            {"filename": "src/app.py", "status": "modified"},
+        ])
+        server.routes["/raw/owner/repo/sha2/docs/a.md"] = " A2 \n"
+        server.routes["/raw/owner/repo/sha2/docs/c.md"] = "C"
+        server.routes["/raw/owner/repo/sha2/docs/new.md"] = "# Project"
+        server.requests.clear()
+
+        result = synced.sync()
+
+        assert not result.full
+        assert result.previous_sha == "sha1"
+        assert result.sha == "sha2"
+        assert [(f.filename, f.content) for f in result.files] == [
+            ("docs/a.md", "A2"),
+            ("docs/c.md", "C"),
+            ("docs/new.md", "# Project"),
+        ]
+        assert result.deleted == ["docs/b.md", "README.md"]
+        assert not any(path.endswith(".zip") or "/zip/" in path for path, _ in server.requests)
+        assert synced.last_synced_sha() == "sha2"
+
+    def test_missing_base_falls_back_to_full_sync(self, server, synced):
+        """Test that a base commit unknown to the compare API triggers a full sync."""
+        set_head(server, "sha3")
+        server.routes["/owner/repo/zip/sha3"] = make_archive(FILES)
+
+        result = synced.sync()
+
+        assert result.full
+        assert len(result.files) == 3
+
+    @pytest.mark.parametrize("status", ["diverged", "behind"])
+    def test_diverged_head_falls_back_to_full_sync(self, server, synced, status):
+        """Test that a head that isn't a descendant of the base triggers a full sync."""
+        set_head(server, "sha2")
+        set_compare(server, "sha1", "sha2", [{"filename": "docs/a.md", "status": "modified"}], status=status)
+        server.routes["/owner/repo/zip/sha2"] = make_archive({"docs/a.md": "A2"})
+
+        result = synced.sync()
+
+        assert result.full
+        assert [(f.filename, f.content) for f in result.files] == [("docs/a.md", "A2")]
+        assert synced.last_synced_sha() == "sha2"
+
+    def test_full_sync_reads_archive_at_head(self, server, synced):
+        """Test that a full sync reads the commit it stores, not the moving ref."""
+        set_head(server, "sha3")
+        server.routes["/owner/repo/zip/main"] = make_archive({"docs/moved.md": "newer"})
+        server.routes["/owner/repo/zip/sha3"] = make_archive(FILES)
+        server.requests.clear()
+
+        result = synced.sync()
+
+        assert len(result.files) == 3
+        assert "/owner/repo/zip/sha3" in [path for path, _ in server.requests]
+        assert synced.reader.ref == "main"
+
+    def test_failed_fetch_keeps_state(self, server, synced):
+        """Test that a failed sync is retried from the previous commit."""
+        set_head(server, "sha2")
+        set_compare(server, "sha1", "sha2", [{"filename": "docs/a.md", "status": "modified"}])
+
+        with pytest.raises(Exception, match="404"):
+            synced.sync()
+
+        assert synced.last_synced_sha() == "sha1"
+
+    def test_state_is_per_ref(self, server, synced, tmp_path):
+        """Test that a state file for another ref is not reused."""
+        other = GithubRepositoryDataReader("owner", "repo", ref="dev")
+        sync = RepositorySync(other, state_path=tmp_path / "state.json")
+
+        assert sync.last_synced_sha() is None
+
+    def test_token_is_sent(self, server, synced, tmp_path):
+        """Test that the API token is sent with requests."""
+        sync = RepositorySync(
+            synced.reader,
+            state_path=tmp_path / "state.json",
+            api_url=server.url("/api"),
+            token="secret",
+        )
+        server.requests.clear()
+
+        sync.sync()
+
+        assert server.requests[0][1]["Authorization"] == "Bearer secret"